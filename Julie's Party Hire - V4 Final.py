@@ -2,16 +2,27 @@
 # Author: Jack Compton
 # Purpose: GUI application for Julie's party hire store to keep track of currently hired items.
 
-import os
-import json
+import atexit
 from tkinter import *
 from tkinter import ttk
 from tkinter import messagebox
-import random
+from tkinter import filedialog
+from receipt_core import ITEM_LIST, ReceiptLoader, ReceiptService, ReceiptStore, validate_receipt_number
+from receipt_storage import ChangesDroppedError, StorageCorruptError, StorageWriteError, open_storage
+from receipt_watch import open_watcher
+from receipt_transfer import export_format, export_receipts
 
 
 # Function for quitting the program.
 def quit_program():
+    if receipt_loader is not None:
+        receipt_loader.cancel()  # Stop reading the receipts if the program is closed while they are still loading.
+    if file_watcher is not None:
+        file_watcher.stop()
+    try:
+        store.close()  # Save the receipt number pool and make sure every change is on the disk, e.g. by writing any queued changes and syncing the journal.
+    except StorageWriteError:
+        messagebox.showerror("File Error", "Some changes to the customer receipts couldn't be saved. Check file permissions or disk space.")
     main_window.destroy()
 
 
@@ -22,58 +33,178 @@ def clear_widget(column, row):
         widget.destroy()      # Destroy the widgets occupying the specified space.
 
 
-# Function for loading the "customer_details" list from the JSON file.
+# Function for loading the customer receipts from the JSON file (or the SQLite database if it is being used).
 def load_customer_details():
-        global data_loaded, customer_details
-
-        if not os.path.exists("customer_receipts.json"):
-            with open("customer_receipts.json", "w") as file:  # Create a new JSON file with an empty list if the file doesn't already exist.
-                json.dump([], file)         # Write an empty list to the new JSON file.
-            customer_details = []           # Initialise customer_details as an empty list.
-            data_loaded = True              # Set the "data_loaded" variable to True, so that the program doesn't reload data before printing.
-            counter["entry_number"] = 1     # Set the initial entry number.
         try:
-            with open("customer_receipts.json", "r") as file:  # Open the JSON file in read mode ("r").
-                customer_details.clear              # Clear the list to prevent duplicate entries.
-                customer_details = json.load(file)  # Load the details from the JSON file into the "customer_details" list.
-                data_loaded = True                  # Set the "data_loaded" variable to True, so that the program doesn't reload data before printing.
-                counter["entry_number"] = len(customer_details) + 1  # Update the entry number so the user knows what number of entry they will be submitting.
-        except json.JSONDecodeError:  # Error control for instances such as the JSON file having invalid data, having incorrect formatting, or being corrupted.
+            store.load()            # Load the receipts from the storage backend into the receipt store, which also rebuilds its indexes.
+            counter["entry_number"] = len(store) + 1  # Update the entry number so the user knows what number of entry they will be submitting.
+        except StorageCorruptError:  # Error control for instances such as the JSON file having invalid data, having incorrect formatting, being corrupted or missing.
+            try:
+                # Fall back to the previous version of the JSON file along with every journal written since it was replaced.
+                store.load_backup()
+                counter["entry_number"] = len(store) + 1
+                messagebox.showwarning("File Recovered", "The JSON file was corrupted or improperly formatted, so the customer receipts have been restored from the backup.")
+                return
+            except StorageCorruptError:
+                pass  # The backup is also unusable (or doesn't exist), so ask the user whether to replace the file.
+
             response = messagebox.askyesno("File Error", "Failed to decode JSON data. The file may be corrupted or improperly formatted. Do you want to replace it?")
             if response == True:
                 try:
-                        with open("customer_receipts.json", "w") as file:  # Open the "customer_receipts.json" file in write mode ("w").
-                            json.dump([], file)    # Overwrite the JSON file with an empty list.
-                        with open("customer_receipts.json", "r") as file:  # Open the JSON file in read mode ("r").
-                            customer_details.clear              # Clear the list to prevent duplicate entries.
-                            customer_details = json.load(file)  # Load the details from the JSON file into the "customer_details" list.
-                            data_loaded = True                  # Set the "data_loaded" variable to True, so that the program doesn't reload data before printing.
-                            counter["entry_number"] = len(customer_details) + 1  # Update the entry number so the user knows what number of entry they will be submitting.
+                        store.reset(keep_journal=True)  # Overwrite the JSON file with an empty list, keeping the journal.
+                        store.load()                    # Recover any receipts that were saved in the journal since the JSON file was last written.
+                        counter["entry_number"] = len(store) + 1  # Update the entry number so the user knows what number of entry they will be submitting.
                         messagebox.showinfo("File Replaced", "The JSON file has been successfully replaced with an empty list.")
                         
-                except IOError as io_error:  # Error control for instances such as the file being inaccessible or lacking the permission to read/write it.
+                except (IOError, StorageCorruptError) as io_error:  # Error control for instances such as the file being inaccessible or lacking the permission to read/write it.
                     messagebox.showerror("File Error", f"An error occurred while replacing the file: {io_error}")
 
 
-# Function for saving the customer details to the JSON file.
-def save_customer_details():
-    global data_loaded
+# Function for starting to load the customer receipts on a background thread, so that the window can be used while a large store is read.
+def start_loading_receipts():
+    global receipt_loader, loading_bar
+
+    # Show a progress bar below the entry section until every receipt has been loaded.
+    loading_bar = ttk.Progressbar(main_window, orient="horizontal", mode="determinate", maximum=1.0)
+    loading_bar.grid(column=1, row=8, columnspan=4, sticky=EW, pady=[0,20])
+
+    receipt_loader = ReceiptLoader(store)
+    receipt_loader.start()
+    main_window.after(10, poll_receipt_loader)
+
+
+# Function for adding the receipts read so far to the store, and updating the progress bar, entry counter and Treeview as they arrive.
+def poll_receipt_loader():
+    global receipt_loader
+    still_loading = receipt_loader.poll(max_chunks=2)  # Only add a couple of chunks each time so that the window stays responsive.
+    loading_bar["value"] = receipt_loader.progress
+    counter["entry_number"] = len(store) + 1
+    show_entry_counter()
+    show_availability()
+    render_receipt_table()  # Fill in any rows of the Treeview that are in view.
+
+    if still_loading:
+        main_window.after(10, poll_receipt_loader)  # Check for the next chunk shortly.
+        return
+
+    loading_bar.grid_remove()  # Remove the progress bar once loading has finished.
+    error = receipt_loader.error
+    receipt_loader = None
+    if error is not None:
+        load_customer_details()  # Load the receipts again the normal way, which restores them from the backup or offers to replace the file.
+        show_entry_counter()
+        show_availability()
+        render_receipt_table()
+
+
+# Function for starting to watch the receipt files for changes made by another program, e.g. another counter sharing the same files.
+def start_watching_files():
+    global file_watcher
+    file_watcher = open_watcher(storage.watched_paths())
+    file_watcher.start()
+    main_window.after(500, check_external_changes)
+
+
+# Function for regularly checking whether the watcher has seen the receipt files change, merging in any changes made by another program.
+def check_external_changes():
+    if receipt_loader is None and file_watcher.take_change():  # Changes are left until the receipts have finished loading.
+        merge_external_changes()
+    main_window.after(500, check_external_changes)
+
+
+# Function for bringing the receipts up to date with the changes made by another program, only refreshing the rows of the Treeview that changed.
+def merge_external_changes():
     try:
-        with open("customer_receipts.json", "w") as file:   # Open the "customer_receipts.json" file in write mode ("w"). If it doesn't exist, a new file will be created.
-            json.dump(customer_details, file, indent=4)     # Dump the entries from the "customer_details" list into the JSON file.
-        data_loaded = False  # Set the "data_loaded" variable to false, so that the program will reload data from JSON file when printing.
-    except IOError:
-        messagebox.showerror("File Error", "Failed to write to 'customer_receipts.json'. Check file permissions or disk space.")
-        quit_program()
+        merge_result = store.merge_external_changes()
+    except StorageWriteError:
+        storage_write_failed()
+        return
+    except StorageCorruptError:
+        load_customer_details()  # The files can't be read, so restore them from the backup or offer to replace them.
+        merge_result = None
+
+    if merge_result is None:
+        changed_receipts, receipts_moved = None, True  # Every receipt was loaded again.
+    else:
+        changed_receipts, receipts_moved = merge_result
+        if not changed_receipts:
+            return  # Nothing was changed by another program (e.g. the watcher saw this program's own changes).
+
+    counter["entry_number"] = len(store) + 1
+    show_entry_counter()
+    show_availability()  # Another counter may have hired out or returned items.
+    if receipts_moved:
+        render_receipt_table()  # Receipts were added or removed, which moves the rows after them.
+    else:
+        table_refresh_receipts(changed_receipts)
+
+
+# Function for checking whether the receipts are still loading, telling the user to wait if they are.
+def receipts_still_loading():
+    if receipt_loader is None:
+        return False
+    messagebox.showinfo("Loading Receipts", "The customer receipts are still loading. Please wait a moment before submitting or deleting receipts.")
+    return True
+
+
+# Function for showing the entry number of the next receipt.
+def show_entry_counter():
+    entry_counter_label.config(text=counter["entry_number"])
+
+
+# Function for showing how many of each item are left in stock in the availability panel, which only reads the running totals kept by the receipt store.
+def show_availability():
+    for item, label in availability_labels.items():
+        available = store.available(item)
+        if available is None:
+            label.config(text=f"{item}\nNot tracked", fg="white")
+        else:
+            stock_level = store.inventory.stock_levels[item]
+            label.config(text=f"{item}\n{max(0, available)} of {stock_level} left", fg="white" if available > 0 else "red")  # Show the item in red once it is out of stock.
+
+
+# Function for showing any error from the storage backend's background thread now that the program is back on the main thread.
+def show_background_storage_error():
+    background_error = store.take_error()
+    if isinstance(background_error, ChangesDroppedError):
+        messagebox.showerror("File Error", f"Failed to save the customer receipts: {background_error}\nThe receipts will be loaded again to show what was saved.")
+        main_window.after(0, reload_receipts)  # Reload once the current submit or delete has finished with the receipts it is showing.
+    elif isinstance(background_error, StorageWriteError):
+        messagebox.showerror("File Error", f"Failed to save the customer receipts: {background_error}\nCheck file permissions or disk space. The changes will be saved again once the problem is fixed.")
+    elif background_error is not None:
+        messagebox.showwarning("File Error", f"Failed to update 'customer_receipts.json' from the journal: {background_error}\nThe changes are still kept in the journal.")
+
+
+# Function for loading the receipts again after changes were left out of the files, as the store still has those changes.
+def reload_receipts():
+    if receipt_loader is not None:
+        return  # Receipts that are still loading are read from the files anyway.
+    load_customer_details()
+    show_entry_counter()
+    show_availability()
+    render_receipt_table()
+
+
+# Function for regularly checking for errors from the background writer, so that a failed save is shown without waiting for the next click.
+def check_storage_errors():
+    show_background_storage_error()
+    main_window.after(1000, check_storage_errors)
+
+
+# Function for handling a receipt change that couldn't be saved.
+def storage_write_failed():
+    messagebox.showerror("File Error", "Failed to save the customer receipts. Check file permissions or disk space.")
+    quit_program()
 
 
 # Function for handling the treeview items being selected.
 def on_item_selected(event):
-    global delkey_binded
+    global delkey_binded, table_selected_receipt
     selected_item = tree.selection()
     if selected_item:
         item_id = selected_item[0]                          # Set the "item_id" variable to the selected item's id.
         receipt_number = tree.item(item_id, "values")[1]    # Make the "receipt_number" equal to the receipt number of the entry selected.
+        table_selected_receipt = int(receipt_number)        # Remember the selected receipt so it stays selected while scrolling.
         delete_receipt_num.delete(0, "end")                 # Remove the value in the "delete_receipt_num" entry box (from the beginning (0) to the end).
         delete_receipt_num.insert(0, receipt_number)        # Update the "delete_receipt_num" entry box with the receipt number.
         tree.bind("<Delete>", delete_receipt)               # Bind the "del" key to the "delete_receipt" function so that the selected receipt can be deleted.
@@ -82,138 +213,419 @@ def on_item_selected(event):
 
 # Function for printing all the customer receipts inside a Treeview widget.
 def print_customer_details():
-    global tree, remove_treeview, counter, customer_details, data_loaded
+    global remove_treeview
 
-    # Clear the Treeview if it's already displayed.
+    # Hide the Treeview if it's already displayed.
     if remove_treeview == True:
-        for widget in main_window.grid_slaves():
-            if int(widget.grid_info()["row"]) > 7:  # Check if there are widgets in a row larger than 7, which is where the treeview is displayed.
-                widget.grid_forget()                # Remove the treeview from the grid by forgetting it.
-                remove_treeview = False             # Set "treeview_displayed" variable/flag to "False" so the treeview can be printed again next time the print function is run.
+        if tree_frame is not None:
+            tree_frame.grid_remove()    # Remove the treeview from the grid, keeping the widget and its rows so it can be shown again without rebuilding it.
+        remove_treeview = False         # Set "remove_treeview" variable/flag to "False" so the treeview can be printed again next time the print function is run.
 
     else:
-        if not data_loaded:
-            load_customer_details()  # Reload the "customer_details" list from the JSON file if not up-to-date.
+        # The receipt store is kept up to date with every change, so the receipts are only read again if another program has changed the file.
+        # Checking this only looks at the files' sizes and modified times, so printing after a change doesn't read the JSON file at all.
+        if receipt_loader is None and store.changed_on_disk():  # The receipts loaded so far are shown while they are still loading.
+            merge_external_changes()
+
+        # Receipts with an invalid layout are now found by the receipt store when loading, which offers to replace the file.
+        if len(store) <= 0:
+            messagebox.showwarning("No Data Available", "There are no customer details to print. Please submit a customer receipt.")
+            return  # Exit the function if there are no receipts.
+
+        else:
+            if tree is None:
+                setup_receipt_table()   # Create the Treeview the first time it is printed.
+            if table_generation != store.generation:
+                render_receipt_table()  # Refill the visible rows only if the receipts have changed since they were last shown.
+
+            tree_frame.grid()           # Show the frame in the grid position it was given when it was created.
+            remove_treeview = True      # Set "remove_treeview" variable/flag to "True" so that pressing the print button next time will remove the treeview.
+
+
+# Function for configuring the Treeview style shared by the receipt table and the statistics window.
+def setup_table_style():
+    treestyle = ttk.Style()
+    treestyle.theme_use("default")
+
+    # Configure the Treeview style for the field section.
+    treestyle.configure("custom.Treeview",
+                        background=main_canvas_colour,          # Background colour of the treeview field entries.
+                        foreground="white",                     # Text colour of the treeview headings.
+                        fieldbackground=main_canvas_colour,     # Main background colour of the treeview field.
+                        font=("Segoe UI", 10))                  # Font style of the treeview field text.
+    
+    # Configure the Treeview style for the headings.
+    treestyle.configure("custom.Treeview.Heading",
+                        background="#8183b2",           # Background colour of the treeview headings.
+                        foreground="white",             # Text colour of the treeview headings.
+                        font=("Segoe UI", 10,"bold"),   # Font style of the treeview heading text.
+                        relief="ridge")                 # Set the relief to "ridge" to give the header less of a button-look.
+
+    # Change entry selection colour using ".map()" for dynamic styling of the "selected" state.
+    treestyle.map("Treeview",
+                background=[("selected", "#9496c3")])  # Selection background colour of the treeview field entries.
+
+    # Change the highlight colour for the headers when the mouse hovers over them.
+    treestyle.map("custom.Treeview.Heading",
+                background=[("active", "#7678a3")],    # Background colour of the treeview headings when hovered over.
+                foreground=[("active", "white")])      # Text colour of the treeview headings when hovered over.
+
+
+# Function for creating the Treeview widget that the customer receipts are printed in. It is only created once and then updated row by row.
+def setup_receipt_table():
+    global tree, tree_frame, tree_scrollbar
+
+    # Create a frame to hold the Treeview and scrollbar.
+    tree_frame = Frame(main_window)
+    tree_frame.grid(column=0, row=9, columnspan=6, padx=20, pady=[0,20], sticky="nsew")
+
+    setup_table_style()
+
+    # Create a Treeview widget to display the customer receipts.
+    columns = ("Entry", "Receipt No.", "First Name", "Last Name", "Item Hired", "Amount Hired")
+    tree = ttk.Treeview(tree_frame, columns=columns, show="headings", style="custom.Treeview", height=table_visible_rows)
+    
+    # Define the Treeview column headings, which sort the receipts by their column when clicked.
+    for col in columns:
+        tree.heading(col, text=col, command=lambda heading=col: sort_receipt_table(heading))
+    
+    # Set individual Treeview column widths.
+    column_widths = {
+        "Entry": 50,
+        "Receipt No.": 100,
+        "First Name": 150,
+        "Last Name": 150,
+        "Item Hired": 150,
+        "Amount Hired": 100
+    }
+
+    # Configure the Treeview columns.
+    for col in columns:
+        tree.column(col, anchor=W, width=column_widths[col])
+
+    # Bind the treeview item selection event to the "on_item_selected" function.
+    tree.bind("<<TreeviewSelect>>", on_item_selected)
+
+    # Bind the mouse wheel and arrow keys so that the Treeview can be scrolled past its 8 visible rows.
+    tree.bind("<MouseWheel>", on_table_mousewheel)
+    tree.bind("<Button-4>", on_table_mousewheel)
+    tree.bind("<Button-5>", on_table_mousewheel)
+    tree.bind("<Up>", lambda e: on_table_arrow_key(e, -1))
+    tree.bind("<Down>", lambda e: on_table_arrow_key(e, 1))
+
+    # Create a vertical scrollbar for the Treeview, which is only shown if the list is higher than 8 entries.
+    # The scrollbar scrolls through the whole list of receipts rather than the rows inside the Treeview.
+    tree_scrollbar = Scrollbar(tree_frame, orient="vertical", command=scroll_receipt_table)
+
+    # Position the Treeview inside the frame by using ".pack()".
+    tree.pack(side=LEFT, fill=BOTH, expand=True)
+
+    # Make sure the frame resizes properly by setting the weight to 1.
+    tree_frame.grid_columnconfigure(0, weight=1)
+    tree_frame.grid_rowconfigure(0, weight=1)
+
+
+# Function for getting the values shown in the Treeview row for a receipt.
+def receipt_row_values(entry_number, receipt):
+    custom_firstname = receipt.first_name
+    custom_lastname = receipt.last_name
+
+    # Truncate the first name if it exceeds 16 characters.
+    if len(receipt.first_name) >= 16:
+        custom_firstname = receipt.first_name[:13] + "..."
+
+    # Truncate the last name if it exceeds 16 characters.
+    if len(receipt.last_name) >= 16:
+        custom_lastname = receipt.last_name[:13] + "..."
+
+    return (entry_number, receipt.receipt_number, custom_firstname, custom_lastname, receipt.item_hired, receipt.amount_hired)
+
+
+# Function for getting the number of receipts that can be scrolled through in the Treeview (only the search results while searching).
+def table_view_size():
+    if table_filter is not None:
+        return len(table_filter)
+    return len(store)
+
+
+# Function for getting a page of receipts to show in the Treeview, starting at the given position.
+def table_view_rows(start, count):
+    if table_filter is not None:
+        return table_filter[start:start + count]
+    if table_sort_column is not None:
+        return store.sorted_rows(table_sort_column, table_sort_descending, start, count)
+    return store.rows(start, count)
+
+
+# Function for getting the entry number shown for a receipt in the Treeview, given its position in the rows being scrolled through.
+def table_entry_number(position, receipt):
+    if table_filter is None and table_sort_column is None:
+        return position + 1
+    return store.position(receipt) + 1  # Search results and sorted rows are shown with their entry number in the full list, which is only looked up for the rows in view.
+
+
+# Function for searching the receipts for the text typed into the search box, in the order the Treeview is sorted by.
+def search_table_receipts():
+    receipts = store.search(table_search)
+    if table_sort_column is None:
+        return receipts  # Unsorted search results stay grouped by the name or item they matched.
+    return store.sort_receipts(receipts, table_sort_column, table_sort_descending)
+
+
+# Function for showing the visible page of receipts in the Treeview.
+# The Treeview only ever holds the 8 visible rows, which are refilled from the receipt store as it is scrolled, so it takes the same time for any number of receipts.
+def render_receipt_table():
+    global table_offset, table_generation, table_filter
+    if tree is None:
+        return
+    if table_filter is not None and table_generation != store.generation:
+        table_filter = search_table_receipts()  # Search again as the receipts have changed, using the indexes that were updated along with them.
+    table_generation = store.generation  # Remember which version of the receipts is shown.
+
+    # Keep the first visible row inside the list, e.g. after the last receipts are deleted.
+    total_rows = table_view_size()
+    table_offset = max(0, min(table_offset, total_rows - table_visible_rows))
+    rows = table_view_rows(table_offset, table_visible_rows)
+
+    # Refill the existing rows with the receipts in view, only adding or removing rows when there are fewer than 8 receipts.
+    row_ids = tree.get_children()
+    for i, receipt in enumerate(rows):
+        values = receipt_row_values(table_entry_number(table_offset + i, receipt), receipt)
+        if i < len(row_ids):
+            tree.item(row_ids[i], values=values)
+        else:
+            tree.insert("", "end", iid=f"row{i}", values=values)
+    if len(row_ids) > len(rows):
+        tree.delete(*row_ids[len(rows):])
+    table_row_receipts[:] = [receipt.receipt_number for receipt in rows]  # Remember which receipt is shown in each row.
+
+    # Keep the selected receipt selected while it is in view, as the rows are reused for other receipts when scrolling.
+    if table_selected_receipt in table_row_receipts:
+        selected_row = f"row{table_row_receipts.index(table_selected_receipt)}"
+        if tree.selection() != (selected_row,):
+            tree.selection_set(selected_row)
+    elif tree.selection():
+        tree.selection_remove(*tree.selection())
+
+    # Show the scrollbar only when there are more than 8 entries, with its position and size matching the whole list.
+    if total_rows > table_visible_rows:
+        tree_scrollbar.set(table_offset / total_rows, (table_offset + len(rows)) / total_rows)
+        tree_scrollbar.pack(side=RIGHT, fill=Y, before=tree)  # Position the scrollbar inside the frame by using ".pack()".
+    else:
+        tree_scrollbar.pack_forget()
+
+
+# Function for scrolling the Treeview when the scrollbar is dragged or its arrows/trough are clicked.
+def scroll_receipt_table(action, amount, unit=None):
+    global table_offset
+    if action == "moveto":
+        table_offset = int(float(amount) * table_view_size())       # Dragging the scrollbar moves to the same fraction of the whole list.
+    elif unit == "pages":
+        table_offset += int(amount) * table_visible_rows            # Clicking the trough moves by a page of 8 rows.
+    else:
+        table_offset += int(amount)                                 # Clicking an arrow moves by one row.
+    render_receipt_table()
+
+
+# Function for scrolling the Treeview with the mouse wheel.
+def on_table_mousewheel(event):
+    if getattr(event, "num", None) == 4:        # Linux sends the wheel as mouse buttons 4 (up) and 5 (down).
+        scroll_receipt_table("scroll", -3)
+    elif getattr(event, "num", None) == 5:
+        scroll_receipt_table("scroll", 3)
+    else:
+        scroll_receipt_table("scroll", -3 if event.delta > 0 else 3)  # Windows and macOS send the wheel direction in "delta".
+    return "break"
+
+
+# Function for scrolling the Treeview when the up/down arrow keys move the selection past the first or last visible row.
+def on_table_arrow_key(event, step):
+    global table_selected_receipt
+    selected_item = tree.selection()
+    if not selected_item:
+        return None
+    row = tree.index(selected_item[0]) + step
+    if 0 <= row < len(table_row_receipts):
+        return None  # Let the Treeview move the selection within the visible rows.
+
+    # Select the next receipt outside of the visible rows, which scrolls it into view.
+    position = table_offset + row
+    if 0 <= position < table_view_size():
+        table_selected_receipt = table_view_rows(position, 1)[0].receipt_number
+        scroll_receipt_table("scroll", step)
+    return "break"
+
+
+# Function for updating the amount hired shown for a single receipt in the Treeview.
+def table_update_receipt(receipt):
+    global table_generation
+    if table_sort_column == "amount_hired":
+        render_receipt_table()  # The receipt has moved to its new place in the order, so fill in every row again.
+        return
+    if tree is None or receipt.receipt_number not in table_row_receipts:
+        return  # The receipt isn't in view, so it will be shown with its new amount once it is scrolled to.
+    tree.set(f"row{table_row_receipts.index(receipt.receipt_number)}", "Amount Hired", receipt.amount_hired)
+    table_generation = store.generation  # The rest of the visible rows are unchanged, so the table is up to date.
 
-        try:
-            if len(customer_details) <= 0:
-                messagebox.showwarning("No Data Available", "There are no customer details to print. Please submit a customer receipt.")
-                return  # Exit the function if the "customer_details" list is empty.
-
-            else:
-                for widget in main_window.grid_slaves():
-                    if int(widget.grid_info()["row"]) > 7:  # Check if there are widgets in a row larger than 7, which is where the treeview is displayed.
-                        widget.grid_forget()                # Remove the old treeview from the grid by forgetting it.
-
-                # Create a frame to hold the Treeview and scrollbar.
-                tree_frame = Frame(main_window)
-                tree_frame.grid(column=0, row=9, columnspan=6, padx=20, pady=[0,20], sticky="nsew")
-
-                treestyle = ttk.Style()
-                treestyle.theme_use("default")
-
-                # Configure the Treeview style for the field section.
-                treestyle.configure("custom.Treeview",
-                                    background=main_canvas_colour,          # Background colour of the treeview field entries.
-                                    foreground="white",                     # Text colour of the treeview headings.
-                                    fieldbackground=main_canvas_colour,     # Main background colour of the treeview field.
-                                    font=("Segoe UI", 10))                  # Font style of the treeview field text.
-                
-                # Configure the Treeview style for the headings.
-                treestyle.configure("custom.Treeview.Heading",
-                                    background="#8183b2",           # Background colour of the treeview headings.
-                                    foreground="white",             # Text colour of the treeview headings.
-                                    font=("Segoe UI", 10,"bold"),   # Font style of the treeview heading text.
-                                    relief="ridge")                 # Set the relief to "ridge" to give the header less of a button-look.
-
-                # Change entry selection colour using ".map()" for dynamic styling of the "selected" state.
-                treestyle.map("Treeview",
-                            background=[("selected", "#9496c3")])  # Selection background colour of the treeview field entries.
-
-                # Change the highlight colour for the headers when the mouse hovers over them.
-                treestyle.map("custom.Treeview.Heading",
-                            background=[("active", "#7678a3")],    # Background colour of the treeview headings when hovered over.
-                            foreground=[("active", "white")])      # Text colour of the treeview headings when hovered over.
-
-
-                # Create a Treeview widget to display the customer receipts.
-                columns = ("Entry", "Receipt No.", "First Name", "Last Name", "Item Hired", "Amount Hired")
-                tree = ttk.Treeview(tree_frame, columns=columns, show="headings", style="custom.Treeview", height=8)
-                
-                # Define the Treeview column headings.
-                for col in columns:
-                    tree.heading(col, text=col)
-                
-                # Set individual Treeview column widths.
-                column_widths = {
-                    "Entry": 50,
-                    "Receipt No.": 100,
-                    "First Name": 150,
-                    "Last Name": 150,
-                    "Item Hired": 150,
-                    "Amount Hired": 100
-                }
-
-                # Configure the Treeview columns.
-                for col in columns:
-                    tree.column(col, anchor=W, width=column_widths[col])
-
-                # Add each item in the list into the Treeview.
-                for index, details in enumerate(customer_details):
-                    custom_firstname = details[1]
-                    custom_lastname = details[2]
-
-                    # Truncate the first name if it exceeds 16 characters.
-                    if len(details[1]) >= 16:
-                        custom_firstname = details[1][:13] + "..."
-
-                    # Truncate the last name if it exceeds 16 characters.
-                    if len(details[2]) >= 16:
-                        custom_lastname = details[2][:13] + "..."
-
-                    tree.insert("", "end", values=(index + 1, details[0], custom_firstname, custom_lastname, details[3], details[4]))
-
-                # Bind the treeview item selection event to the "on_item_selected" function.
-                tree.bind("<<TreeviewSelect>>", on_item_selected)
-
-                # Create a vertical scrollbar for the Treeview if the list is higher than 8 entries.
-                if int(len(customer_details)) > 8:
-                    scrollbar = Scrollbar(tree_frame, orient="vertical", command=tree.yview)  
-                    tree.configure(yscrollcommand=scrollbar.set)
-                    scrollbar.pack(side=RIGHT, fill=Y)  # Position the scrollbar inside the frame by using ".pack()".
-
-                # Position the Treeview inside the frame by using ".pack()".
-                tree.pack(side=LEFT, fill=BOTH, expand=True)
-
-                # Make sure the frame resizes properly by setting the weight to 1.
-                tree_frame.grid_columnconfigure(0, weight=1)
-                tree_frame.grid_rowconfigure(0, weight=1)
-
-                remove_treeview = True  # Set "treeview_displayed" variable/flag to "True" so that pressing the print button next time will remove the treeview.
-
-        except IndexError:
-            for widget in main_window.grid_slaves():
-                if int(widget.grid_info()["row"]) > 7:  # Check if there are widgets in a row larger than 7, which is where the treeview is displayed.
-                    widget.grid_forget()                # Remove the treeview from the grid by forgetting it.
-                    remove_treeview = False             # Set "treeview_displayed" variable/flag to "False" so the treeview can be printed again next time the print function is run.
-            response = messagebox.askyesno("Replace JSON File", "Invalid JSON data: The JSON file may have been modified or improperly formatted. Do you want to replace it?")
-            if response == True:
-                try:
-                    with open("customer_receipts.json", "w") as file:
-                        json.dump([], file)         # Overwrite the JSON file with an empty list.
-                        load_customer_details()     # Reload the "customer_details" list.
-                        Label(main_canvas, text=counter["entry_number"], font=("Segoe UI", 10, "bold"), bg=main_canvas_colour, fg="white").grid(column=1, row=0, pady=[15,0])
-                    messagebox.showinfo("File Replaced", "The JSON file has been successfully replaced with an empty list.")
-                    
-                except IOError as io_error:  # Error control for instances such as the file not existing or lacking the permission to read/write it.
-                    messagebox.showerror("File Error", f"An error occurred while replacing the file: {io_error}")
-                    
 
-# Function for checking if there are any invalid entries inside the entry boxes.
+# Function for refreshing only the rows of the Treeview that show the given receipts, e.g. after another program changed them.
+def table_refresh_receipts(receipt_numbers):
+    global table_generation
+    if tree is None:
+        return
+    if table_filter is not None or table_sort_column is not None:
+        render_receipt_table()  # The changed receipts may no longer match the search or may have moved in the sorted order, so fill in every row again.
+        return
+    for i, receipt_number in enumerate(table_row_receipts):
+        if receipt_number in receipt_numbers:
+            tree.item(f"row{i}", values=receipt_row_values(table_offset + i + 1, store.get(receipt_number)))
+    table_generation = store.generation
+
+
+# Function for filtering the Treeview to the receipts matching the search box each time a key is typed into it.
+# Each word is matched against the start of the first names, last names and items, or against a whole receipt number.
+def search_receipts(event=None):
+    global table_search, table_filter, table_offset, remove_treeview
+    search_text = search_box.get().strip()
+    if search_text == table_search:
+        return  # The search hasn't changed (e.g. an arrow key was pressed).
+    table_search = search_text
+    table_filter = search_table_receipts() if search_text else None  # Show every receipt again once the search box is cleared.
+    table_offset = 0
+
+    # Show the Treeview with the search results, creating it if it hasn't been printed yet.
+    if search_text and len(store) > 0:
+        if tree is None:
+            setup_receipt_table()
+        tree_frame.grid()
+        remove_treeview = True
+    render_receipt_table()
+
+
+# Function for sorting the Treeview by a column when its heading is clicked, clicking the same heading again reverses the order.
+# The receipt store keeps each column's order up to date as receipts change, so only the visible rows are filled in again.
+def sort_receipt_table(heading):
+    global table_sort_column, table_sort_descending, table_filter, table_offset
+    column = table_sort_columns[heading]
+    table_sort_descending = column == table_sort_column and not table_sort_descending
+    table_sort_column = column
+
+    # Show an arrow on the sorted column's heading pointing up for ascending or down for descending.
+    for col, col_key in table_sort_columns.items():
+        arrow = (" \u25bc" if table_sort_descending else " \u25b2") if col_key == column else ""
+        tree.heading(col, text=col + arrow)
+
+    if table_filter is not None:
+        table_filter = search_table_receipts()  # Sort the search results too.
+    table_offset = 0  # Go back to the top of the list.
+    render_receipt_table()
+
+
+# Function for opening the statistics window, showing the totals hired for each item, the biggest customers and the totals for each day.
+# Bringing the window to the front if it is already open.
+def open_statistics_window():
+    global statistics_window, statistics_tables
+    if statistics_window is not None and statistics_window.winfo_exists():
+        statistics_window.lift()
+        return
+
+    statistics_window = Toplevel(main_window)
+    statistics_window.title("Hire Statistics")
+    statistics_window.configure(bg=main_window_bg)
+    statistics_window.resizable(False, False)
+    statistics_window.protocol("WM_DELETE_WINDOW", close_statistics_window)
+    setup_table_style()
+
+    # Create a table for each set of totals, with a heading label above it.
+    statistics_layouts = {
+        "items": ("Items Hired", ("Item", "Receipts", "Amount Hired", "In Stock"), len(item_list)),
+        "customers": (f"Top {statistics_top_customers} Customers", ("First Name", "Last Name", "Receipts", "Amount Hired"), statistics_top_customers),
+        "days": ("Hired Each Day", ("Date", "Receipts", "Amount Hired"), 8),
+    }
+    statistics_tables = {}
+    for row, (name, (title, columns, height)) in enumerate(statistics_layouts.items()):
+        Label(statistics_window, text=title, bg=main_window_bg, fg="white", font=("Segoe UI", 10, "bold")).grid(column=0, row=row * 2, sticky=W, padx=20, pady=[10,2])
+        table_frame = Frame(statistics_window)
+        table_frame.grid(column=0, row=row * 2 + 1, padx=20, pady=[0,10], sticky=EW)
+        table = ttk.Treeview(table_frame, columns=columns, show="headings", style="custom.Treeview", height=height)
+        for col in columns:
+            table.heading(col, text=col)
+            table.column(col, anchor=W, width=120)
+        table.pack(side=LEFT, fill=BOTH, expand=True)
+        if name == "days":
+            day_scrollbar = Scrollbar(table_frame, orient="vertical", command=table.yview)  # There can be more days than fit in the table.
+            table.configure(yscrollcommand=day_scrollbar.set)
+            day_scrollbar.pack(side=RIGHT, fill=Y)
+        statistics_tables[name] = table
+
+    refresh_statistics()
+    statistics_window.after(1000, check_statistics)
+
+
+# Function for filling in the statistics window from the totals kept by the receipt store, which are updated with every change rather than counted here.
+def refresh_statistics():
+    global statistics_generation
+    statistics = store.statistics
+
+    item_rows = []
+    for item, receipt_count, amount in statistics.item_totals():
+        available = store.available(item)
+        item_rows.append((item, receipt_count, amount, "Not tracked" if available is None else max(0, available)))
+    customer_rows = statistics.top_customers(statistics_top_customers)
+    day_rows = [(day or "Unknown", receipt_count, amount) for day, receipt_count, amount in statistics.day_totals()]  # Receipts added before hire dates were kept have no date.
+
+    for name, rows in (("items", item_rows), ("customers", customer_rows), ("days", day_rows)):
+        table = statistics_tables[name]
+        table.delete(*table.get_children())
+        for values in rows:
+            table.insert("", "end", values=values)
+    statistics_generation = store.generation
+
+
+# Function for regularly refreshing the statistics window while it is open, only when the receipts have changed since it was last filled in.
+def check_statistics():
+    if statistics_window is None or not statistics_window.winfo_exists():
+        return  # Stop checking once the window has been closed.
+    if statistics_generation != store.generation:
+        refresh_statistics()
+    statistics_window.after(1000, check_statistics)
+
+
+# Function for closing the statistics window.
+def close_statistics_window():
+    global statistics_window
+    statistics_window.destroy()
+    statistics_window = None
+
+
+# Function for exporting the receipts in the Treeview (only the search results while searching, in the order it is sorted by) to a CSV or JSON Lines file.
+def export_customer_details():
+    if table_view_size() <= 0:
+        messagebox.showwarning("No Data Available", "There are no customer receipts to export. Please submit a customer receipt or clear the search.")
+        return
+
+    path = filedialog.asksaveasfilename(title="Export Receipts", defaultextension=".csv", filetypes=[("CSV file", "*.csv"), ("JSON Lines file", "*.jsonl")])
+    if not path:
+        return  # The user cancelled the dialog.
+    try:
+        count = export_receipts(table_export_rows(), path, export_format(path) or "csv")  # Export anything that isn't a JSON Lines file as CSV.
+    except IOError as io_error:  # Error control for instances such as the folder being read-only or the disk being full.
+        messagebox.showerror("File Error", f"An error occurred while exporting the receipts: {io_error}")
+        return
+    messagebox.showinfo("Receipts Exported", f"{count} customer receipts have been exported to '{path}'.")
+
+
+# Function for yielding the receipts in the Treeview as stored receipt lists a page at a time, so the export never copies every receipt at once.
+def table_export_rows(page_size=5000):
+    for start in range(0, table_view_size(), page_size):
+        for receipt in table_view_rows(start, page_size):
+            yield receipt.to_list()
+
+
+# Function for checking if there are any invalid entries inside the entry boxes, and submitting the receipt if they are all valid.
 def validate_customer_details():
-    details_error_detected = False
-    error_messages = []  # List to store error messages so that they can be joined into the warning message box after error control is completed.
-    entry_clear = []     # List to store entry box variable names so that the box can be cleared.
+    if receipts_still_loading():
+        return  # Duplicate receipts and receipt numbers can't be checked until every receipt has been loaded.
 
     # Clear any previous error messages by using the "clear_widget(column, row)" function.
     clear_widget(2, 1)
@@ -221,191 +633,66 @@ def validate_customer_details():
     clear_widget(2, 3)
     clear_widget(2, 4)
 
-    # First Name error control.
-    # Check if the "first_name" entry is blank.
-    if first_name.get().strip() == "":
-        Label(main_canvas, text="Required", bg=main_canvas_colour, fg="red").grid(column=2, row=1, sticky=W)
-        error_messages.append("First Name is required and cannot be left blank.")
-        details_error_detected = True
-
-    # Check if the "first_name" entry is above 50 characters long.
-    elif len(first_name.get().strip().replace(" ", "")) > 50:
-        Label(main_canvas, text="Invalid Entry", bg=main_canvas_colour, fg="red").grid(column=2, row=1, sticky=W)
-        error_messages.append("First Name cannot be longer than 50 characters.")
-        entry_clear.append(first_name)  # Allow the entry to be cleared after closing the warning box by placing it in a list till the end of the function.
-        details_error_detected = True        
-
-    # Check if the "first_name" entry only contains digits.
-    elif first_name.get().strip().replace(" ", "").isdigit():
-        Label(main_canvas, text="Invalid Entry", bg=main_canvas_colour, fg="red").grid(column=2, row=1, sticky=W)
-        error_messages.append("First Name cannot only contain numbers.\n     - Please include at least one letter.")
-        entry_clear.append(first_name)  # Allow the entry to be cleared after closing the warning box by placing it in a list till the end of the function.
-        details_error_detected = True
-
-    # Check if "first_name" entry contains a combination of letters and numbers, as well as at least one letter.
-    else:
-        if not (first_name.get().strip().replace(" ", "").isalnum() and any(char.isalpha() for char in first_name.get())):
-            Label(main_canvas, text="Invalid Entry", bg=main_canvas_colour, fg="red").grid(column=2, row=1, sticky=W)
-            error_messages.append("First Name can only include letters or letters with numbers.\n     - No symbols or non-alphanumeric characters.")
-            entry_clear.append(first_name)  # Allow the entry to be cleared after closing the warning box by placing it in a list till the end of the function.
-            details_error_detected = True
-
-    # Last Name error control.
-    # Check if the "last_name" entry is blank.
-    if last_name.get().strip() == "":
-        Label(main_canvas, text="Required", bg=main_canvas_colour, fg="red").grid(column=2, row=2, sticky=W)
-        error_messages.append("Last Name is required and cannot be left blank.")
-        details_error_detected = True
-
-    # Check if the "last_name" entry is above 50 characters long.
-    elif len(last_name.get().strip().replace(" ", "")) > 50:
-        Label(main_canvas, text="Invalid Entry", bg=main_canvas_colour, fg="red").grid(column=2, row=2, sticky=W)
-        error_messages.append("Last Name cannot be longer than 50 characters.")
-        entry_clear.append(last_name)  # Allow the entry to be cleared after closing the warning box by placing it in a list till the end of the function.
-        details_error_detected = True
-
-    # Check if the "last_name" entry only contains digits.
-    elif last_name.get().strip().replace(" ", "").isdigit():
-        Label(main_canvas, text="Invalid Entry", bg=main_canvas_colour, fg="red").grid(column=2, row=2, sticky=W)
-        error_messages.append("Last Name cannot only contain numbers.\n     - Please include at least one letter.")
-        entry_clear.append(last_name)  # Allow the entry to be cleared after closing the warning box by placing it in a list till the end of the function.
-        details_error_detected = True
-
-    # Check if "last_name" contains a combination of letters and numbers, as well as at least one letter.
-    else:
-        if not (last_name.get().strip().replace(" ", "").isalnum() and any(char.isalpha() for char in last_name.get())):
-            Label(main_canvas, text="Invalid Entry", bg=main_canvas_colour, fg="red").grid(column=2, row=2, sticky=W)
-            error_messages.append("Last Name can only include letters or letters with numbers.\n     - No symbols or non-alphanumeric characters.")
-            entry_clear.append(last_name)  # Allow the entry to be cleared after closing the warning box by placing it in a list till the end of the function.
-            details_error_detected = True
-
-    # Item Hired error control.
-    # Check if the "item_hired" entry is blank.
-    if len(item_hired.get()) == 0:
-        Label(main_canvas, text="Required", bg=main_canvas_colour, fg="red").grid(column=2, row=3, sticky=W)
-        error_messages.append("Item Hired is required and cannot be left blank.")
-        details_error_detected = True
-
-    # Amount Hired error control.
-    # Check if the "amount_hired" entry is blank.
-    if amount_hired.get().strip() == "":
-        Label(main_canvas, text="Required", bg=main_canvas_colour, fg="red").grid(column=2, row=4, sticky=W)
-        error_messages.append("Amount Hired is required and cannot be left blank.")
-        details_error_detected = True
-
-    # Check if the "amount_hired" entry contains any alphabetic characters.
-    elif any(char.isalpha() for char in amount_hired.get().strip().replace(" ", "")):
-            Label(main_canvas, text="Invalid Entry", bg=main_canvas_colour, fg="red").grid(column=2, row=4, sticky=W)
-            error_messages.append("Amount Hired must only include numbers, no letters.")
-            entry_clear.append(amount_hired)  # Allow the entry to be cleared after closing the warning box by placing it in a list till the end of the function.
-            details_error_detected = True
-    
-    # Check if the "amount_hired" entry is a negative number (starting with a minus sign) and has at least one numeric value after it.
-    elif amount_hired.get().strip().replace(" ", "").startswith("-") and any(char.isnumeric() for char in amount_hired.get()):
-            Label(main_canvas, text="Between 1-500", bg=main_canvas_colour, fg="red").grid(column=2, row=4, sticky=W)
-            error_messages.append("Amount Hired must be a positive number between 1 and 500.")
-            entry_clear.append(amount_hired)  # Allow the entry to be cleared after closing the warning box by placing it in a list till the end of the function.
-            details_error_detected = True
-
-    # Check if the "amount_hired" entry only contains digits and if so, whether the value is below/equal to zero or above 500.
-    elif amount_hired.get().strip().replace(" ", "").isdigit():
-        if int(amount_hired.get().replace(" ", "")) <= 0 or int(amount_hired.get().replace(" ", "")) > 500:
-            Label(main_canvas, text="Between 1-500", bg=main_canvas_colour, fg="red").grid(column=2, row=4, sticky=W)
-            error_messages.append("Amount Hired must be between 1 and 500.")
-            entry_clear.append(amount_hired)  # Allow the entry to be cleared after closing the warning box by placing it in a list till the end of the function.
-            details_error_detected = True
-    else:
-        try:
-            # Check if the "amount_hired" entry is a decimal number.
-            amount_float = float(amount_hired.get().strip().replace(" ", ""))   # Convert "amount_hired" to a float and store the value in "amount_float".
-            amount_int = int(amount_float)                                      # Convert "amount_float" to an integer and store the value in "amount_int".
-
-            # Check if the float and integer are not equal, meaning the entry would be a decimal. Otherwise check if ".0" is in the entry, also suggesting a decimal.
-            if amount_float != amount_int or ".0" in amount_hired.get() and amount_float == amount_int: 
-                Label(main_canvas, text="Invalid Entry", bg=main_canvas_colour, fg="red").grid(column=2, row=4, sticky=W)
-                error_messages.append("Amount Hired cannot be a decimal.\n     - Must be an integer between 1 and 500.")
-                entry_clear.append(amount_hired)  # Allow the entry to be cleared after closing the warning box by placing it in a list till the end of the function.
-                details_error_detected = True
-            
-            # Check if the "amount_hired" entry doesn't only consist of digits.
-            elif not amount_hired.get().strip().replace(" ", "").isdigit():
-                Label(main_canvas, text="Invalid Entry", bg=main_canvas_colour, fg="red").grid(column=2, row=4, sticky=W)
-                error_messages.append("Amount Hired must only include numbers.\n     - Cannot include symbols or non-numeric characters.")
-                entry_clear.append(amount_hired)  # Allow the entry to be cleared after closing the warning box by placing it in a list till the end of the function.
-                details_error_detected = True
-
-        except ValueError:
-            Label(main_canvas, text="Invalid Entry", bg=main_canvas_colour, fg="red").grid(column=2, row=4, sticky=W)
-            error_messages.append("Amount Hired must only include numbers.\n     - Cannot include symbols or non-numeric characters.")
-            entry_clear.append(amount_hired)  # Allow the entry to be cleared after closing the warning box by placing it in a list till the end of the function.
-            details_error_detected = True
+    # Check the entries with the receipt service, which also submits the receipt if they are all valid (without changing anything if the receipt matches an existing one).
+    try:
+        result = service.submit(first_name.get(), last_name.get(), item_hired.get(), amount_hired.get())
+    except StorageWriteError:
+        storage_write_failed()
+        return
 
     # If there are any invalid inputs, show a message box with all errors.
-    if details_error_detected == True:
-        ordered_errors = [f"{i + 1}. {error_messages[i]}" for i in range(len(error_messages))]  # Create an ordered list version of the errors to display in the warning message box.
-        messagebox.showwarning("Invalid Entries", "\n".join(ordered_errors))
-        
-        # Clear any invalid entries inside the entry boxes after the user closes the message box.
-        for entry in entry_clear:
-            entry.delete(0, "end")  # Remove the invalid entries from their entry boxes (from the beginning (0) to the end).
+    if result.status == "invalid":
+        show_entry_errors(result.errors)
     else:
-        submit_receipt()
+        submit_receipt(result)
 
 
-# Function for adding the next customer to the list.
-def submit_receipt():
-    global remove_treeview
+# Function for showing the errors for invalid entries, with a label next to each invalid entry box and a message box listing every error.
+def show_entry_errors(errors):
+    entry_rows = {"first_name": 1, "last_name": 2, "item_hired": 3, "amount_hired": 4}                      # Row that each entry box is in, for placing its error label.
+    entry_boxes = {"first_name": first_name, "last_name": last_name, "item_hired": item_hired, "amount_hired": amount_hired}
+    for error in errors:
+        Label(main_canvas, text=error.label, bg=main_canvas_colour, fg="red").grid(column=2, row=entry_rows[error.field], sticky=W)
 
-    existing_receipt_numbers = [customer[0] for customer in customer_details]  # Get the existing receipt numbers.
+    ordered_errors = [f"{i + 1}. {errors[i].message}" for i in range(len(errors))]  # Create an ordered list version of the errors to display in the warning message box.
+    messagebox.showwarning("Invalid Entries", "\n".join(ordered_errors))
 
-    # Check if the maximum number of unique receipt numbers has been reached.
-    if len(existing_receipt_numbers) >= 9000:  # 9000 possible unique 4-digit receipt numbers from 1000 to 9999.
-        messagebox.showwarning("Maximum Entries Reached", "No more unique receipt numbers can be generated. Please delete old entries to add new ones.")
-        return  # Exit the function if no more receipt numbers can be generated.
+    # Clear any invalid entries inside the entry boxes after the user closes the message box.
+    for error in errors:
+        if error.clear_entry:
+            entry_boxes[error.field].delete(0, "end")  # Remove the invalid entries from their entry boxes (from the beginning (0) to the end).
 
-    while True:
-        receipt_number = random.randint(1000, 9999)  # Generate a random number from 1000 to 9999 and put this value into the "receipt_number" variable.
-        if receipt_number not in existing_receipt_numbers:  # Check that the generated receipt number doesn't already exist.
-            break
 
-    # Remove any leading and trailing spaces from the "amount_hired", "first_name", and "last_name" entries, as well as any spaces in between characters in "amount_hired".
-    stripped_amounthired = amount_hired.get().strip().replace(" ", "")
-    stripped_firstname = first_name.get().strip()
-    stripped_lastname = last_name.get().strip()
+# Function for showing the result of submitting a receipt, asking whether to update the existing receipt if the new one matches it.
+def submit_receipt(result):
+    show_background_storage_error()
 
-    # Split the names into a list of separate word strings if there are multiple words, so that they can be individually capitalised.
-    fname_words = stripped_firstname.split()
-    lname_words = stripped_lastname.split()
+    try:
+        # Check if the new entry matches an existing receipt and update the latest matching receipt if the user chooses to do so.
+        if result.status == "duplicate":
+            # Ask user if they want to update the existing receipt. The message box returns True if the answer is "Yes" and False otherwise.
+            response = messagebox.askyesno("Update Existing Receipt", "A receipt with the same customer full name and item already exists. Do you want to update the latest existing receipt?")
+            result = service.submit(first_name.get(), last_name.get(), item_hired.get(), amount_hired.get(), on_duplicate="update" if response == True else "add")
+    except StorageWriteError:
+        storage_write_failed()
+        return
 
-    # Capitalise the first letter of all words in the "first_name" and "last_name" entries while joining the listed words for both entries and adding a space between them.
-    formatted_firstname = " ".join(fname_word.capitalize() for fname_word in fname_words)
-    formatted_lastname = " ".join(lname_word.capitalize() for lname_word in lname_words)
+    # Show the error if there aren't enough of the item left in stock for the updated or new receipt.
+    if result.status == "invalid":
+        show_entry_errors(result.errors)
+        return
+
+    # Check if the maximum number of unique receipt numbers has been reached.
+    if result.status == "full":
+        messagebox.showwarning("Maximum Entries Reached", "No more unique receipt numbers can be generated. Please delete old entries to add new ones.")
+        return  # Exit the function if no more receipt numbers can be generated.
 
-    # Create a temporary new entry list.
-    new_entry = [receipt_number, formatted_firstname, formatted_lastname, item_hired.get(), stripped_amounthired]
+    if result.status == "updated":
+        table_update_receipt(result.receipt)  # Update the receipt's amount in the Treeview.
+    else:
+        render_receipt_table()  # Refresh the visible rows and scrollbar, as the new receipt is only added as a row if it is in view.
 
-    # Check if the new entry matches any existing entry and replace the latest matching entry with the updated entry if the user chooses to do so.
-    receipt_replaced = False
-    for i in reversed(range(len(customer_details))):  # Use "reversed" so that the newest receipt for the customer can be updated.
-        customer = customer_details[i]
-        if (customer[1] == formatted_firstname and customer[2] == formatted_lastname and customer[3] == item_hired.get()):
-            # Ask user if they want to update the existing receipt. The message box returns True if the answer is "Yes" and False otherwise.
-            response = messagebox.askyesno("Update Existing Receipt", "A receipt with the same customer full name and item already exists. Do you want to update the latest existing receipt?")
-            if response == True:
-                # Replace the old entry with the new one, using [start:stop] slicing technique.
-                customer_details[i][4:5] = new_entry[4:5]  # Update just the amount hired (4th item in list).
-                receipt_replaced = True
-                new_entry = []              # Clear the new entry list so it can be used again.
-                save_customer_details()     # Save the "customer_details" list data to the JSON file after appending by using the "save_customer_details()" function.
-                break
-            else:
-                break
-
-    if receipt_replaced == False:
-        # If no match was found, add the new entry.
-        customer_details.append(new_entry)
-        new_entry = []
-        save_customer_details()  # Save the "customer_details" list data to the JSON file after appending.
+    show_availability()  # Update the number left in stock for the item.
 
     # Clear the input boxes.
     first_name.delete(0, "end")
@@ -414,21 +701,15 @@ def submit_receipt():
     amount_hired.delete(0, "end")
 
     # Update the entry counter.
-    if receipt_replaced == False:
+    if result.status == "added":
         counter["entry_number"] += 1  # Update the entry number so the user knows what number of entry they will be submitting.
-        Label(main_canvas, text=counter["entry_number"], font=("Segoe UI", 10, "bold"), bg=main_canvas_colour, fg="white").grid(column=1, row=0, pady=[15,0])
-
-    # Print customer details only if they are already printed, so that the printed list can be updated.
-    for widget in main_window.grid_slaves():
-        grid = widget.grid_info()
-        if "row" in grid and int(grid["row"]) > 7:  # Check if there are widgets in a row larger than 7, which is where the treeview is displayed.
-            remove_treeview = False                 # Set "treeview_displayed" variable/flag to "False" so the treeview can be updated if already printed rather than removing it.
-            print_customer_details()                # Print the customer list again to update the treeview with the latest entries.
+        show_entry_counter()
 
 
 # Function for checking that the entry inside the receipt deletion entry box is valid.
 def validate_receipt_deletion():
-    receipt_error_detected = False
+    if receipts_still_loading():
+        return  # The receipt may not have been loaded yet.
 
     # Clear any previous error messages by using the "clear_widget(column, row)" function.
     clear_widget(2, 1)
@@ -436,63 +717,12 @@ def validate_receipt_deletion():
     clear_widget(2, 3)
     clear_widget(2, 4)
 
-    # Check if the "delete_receipt_num" entry is blank.
-    if delete_receipt_num.get().strip() == "":
-        Label(main_canvas, text="Required", bg=main_canvas_colour, fg="red").grid(column=2, row=4, sticky=E)
-        messagebox.showwarning("Invalid Entry", "Receipt Number is required and cannot be left blank.")
-        delete_receipt_num.delete(0, "end")  # Clear the delete_receipt_num entry box.
-        receipt_error_detected = True
-
-    # Check if the "delete_receipt_num" entry contains any alphabetic characters and doesn't only consist of digits.
-    elif any(char.isalpha() for char in delete_receipt_num.get().strip().replace(" ", "")) and not delete_receipt_num.get().strip().replace(" ", "").isdigit():
-        Label(main_canvas, text="Invalid Entry", bg=main_canvas_colour, fg="red").grid(column=2, row=4, sticky=E)
-        messagebox.showwarning("Invalid Entry", "Receipt Number must only include numbers.\nPlease don't use letters or symbols/non-numeric characters.")
+    # If there is an invalid input, show the error and exit the function.
+    error = validate_receipt_number(delete_receipt_num.get(), store.receipt_digits)
+    if error is not None:
+        Label(main_canvas, text=error.label, bg=main_canvas_colour, fg="red").grid(column=2, row=4, sticky=E)
+        messagebox.showwarning("Invalid Entry", error.message)
         delete_receipt_num.delete(0, "end")  # Clear the delete_receipt_num entry box.
-        receipt_error_detected = True
-
-    # Check if the "delete_receipt_num" entry is a negative number (starting with a minus sign) and has at least one numeric value after it.
-    elif delete_receipt_num.get().strip().replace(" ", "").startswith("-") and any(char.isnumeric() for char in delete_receipt_num.get()):
-            Label(main_canvas, text="Invalid Entry", bg=main_canvas_colour, fg="red").grid(column=2, row=4, sticky=E)
-            messagebox.showwarning("Invalid Entry", "Receipt Number can only be a positive number.")
-            delete_receipt_num.delete(0, "end")  # Clear the delete_receipt_num entry box.
-            receipt_error_detected = True
-
-    # Check if the "delete_receipt_num" entry only contains digits and if so, whether the total number of digits is not equal to 4.
-    elif delete_receipt_num.get().strip().replace(" ", "").isdigit():
-        if not len(delete_receipt_num.get().strip().replace(" ", "")) == 4:
-            Label(main_canvas, text="Invalid Entry", bg=main_canvas_colour, fg="red").grid(column=2, row=4, sticky=E)
-            messagebox.showwarning("Invalid Entry", "Receipt Number must only be 4 digits long.")
-            delete_receipt_num.delete(0, "end")  # Clear the delete_receipt_num entry box.
-            receipt_error_detected = True
-
-    else:
-        try:
-            # Check if the "delete_receipt_num" entry is a decimal number.
-            receipt_num_float = float(delete_receipt_num.get().strip().replace(" ", ""))  # Convert "delete_receipt_num" to a float and store the value in "receipt_num_float".
-            receipt_num_int = int(receipt_num_float)                                      # Convert "receipt_num_float" to an integer and store the value in "receipt_num_int".
-
-            # Check if the float and integer are not equal, meaning the input would be a decimal. Otherwise check if ".0" is in the entry, also suggesting a decimal.
-            if receipt_num_float != receipt_num_int or ".0" in delete_receipt_num.get() and receipt_num_float == receipt_num_int: 
-                Label(main_canvas, text="Invalid Entry", bg=main_canvas_colour, fg="red").grid(column=2, row=4, sticky=E)
-                messagebox.showwarning("Invalid Entry", "Receipt Number cannot be a decimal and must\nbe an existing receipt number/integer.")
-                delete_receipt_num.delete(0, "end")  # Clear the delete_receipt_num entry box.
-                receipt_error_detected = True
-            
-            # Check if the "delete_receipt_num" entry doesn't only consist of digits.
-            elif not delete_receipt_num.get().strip().replace(" ", "").isdigit():
-                Label(main_canvas, text="Invalid Entry", bg=main_canvas_colour, fg="red").grid(column=2, row=4, sticky=E)
-                messagebox.showwarning("Invalid Entry", "Receipt Number must only include numbers.\nPlease don't use symbols/non-numeric characters.")
-                delete_receipt_num.delete(0, "end")  # Clear the delete_receipt_num entry box.
-                receipt_error_detected = True 
-
-        except ValueError:
-            Label(main_canvas, text="Invalid Entry", bg=main_canvas_colour, fg="red").grid(column=2, row=4, sticky=E)
-            messagebox.showwarning("Invalid Entry", "Receipt Number must only include numbers.\nPlease don't use symbols/non-numeric characters.")
-            delete_receipt_num.delete(0, "end")  # Clear the delete_receipt_num entry box.
-            receipt_error_detected = True
-
-    # If there is an invalid input, exit the function (error message is already displayed).
-    if receipt_error_detected == True:
         return
     else:
         delete_receipt()
@@ -500,49 +730,54 @@ def validate_receipt_deletion():
 
 # Function for deleting a receipt from the list.
 def delete_receipt(event=None):
-    global data_loaded, remove_treeview, delkey_binded
-
-    # Remove any leading, in-between, and trailing spaces from the "delete_receipt_num" variable entry.
-    stripped_receiptnum = int(delete_receipt_num.get().strip().replace(" ", ""))
-
-    # Enumerate through the customer entries in the "customer_details" list to find the matching receipt number.
-    # "i" represents the index of the current customer entry in the "customer_details" list, and "customer" is the current customer entry.
-    customer_found = False
-    for i, customer in enumerate(customer_details):
-        if customer[0] == stripped_receiptnum:  # Check if the receipt number stored in the first element "[0]" of each "customer" list entry matches the stripped user-entered receipt number.
-            del customer_details[i]             # If a match is found, delete the customer at index "i" from "customer_details".
-            customer_found = True
-            if delkey_binded == True:       # If "delkey_binded" variable/flag is True, unbind the "del" key so that it doesn't work when no treeview item is selected.
-                tree.unbind("<Delete>")
-            delkey_binded = False           # Set "delkey_binded" variable/flag to False so program won't try to unbind the "del" key if it hasn't been binded already.
-            data_loaded = False             # Set the "data_loaded" variable to false, so that the program will reload data from JSON file when printing.
-            counter["entry_number"] -= 1    # Update the entry number so the user knows what number of entry they will be submitting.
-            Label(main_canvas, text=counter["entry_number"], font=("Segoe UI", 10, "bold"), bg=main_canvas_colour, fg="white").grid(column=1, row=0, pady=[15,0])
-            delete_receipt_num.delete(0, "end")             # Remove the value in the "delete_receipt_num" entry box (from the beginning (0) to the end).
-            save_customer_details()                         # Update the JSON file with the latest customer list.         
-            if len(customer_details) <= 0:                  # Check if the "customer_details" list is empty so that the printed list can be removed after.
-                for widget in main_window.grid_slaves():
-                    if int(widget.grid_info()["row"]) > 7:  # Check if there are widgets in a row larger than 7, which is where the treeview is displayed.
-                        widget.grid_forget()                # Remove the treeview from the grid by forgetting it.
-                        remove_treeview = False             # Set "remove_treeview" variable/flag to "False" so the treeview can be printed again next time the print function is run.
-            else:
-                remove_treeview = False     # Set "remove_treeview" variable/flag to "False" so the treeview can be updated if already printed rather than removing it.
-                print_customer_details()    # Print the customer list again to update the treeview with the latest entries.
+    global remove_treeview, delkey_binded
+    if receipts_still_loading():
+        return
+
+    show_background_storage_error()
+
+    # Delete the receipt through the receipt service, which looks it up in the receipt number index rather than searching through the list.
+    try:
+        result = service.delete(delete_receipt_num.get())
+    except StorageWriteError:
+        storage_write_failed()
+        return
+
+    customer_found = result.status == "deleted"
+    if customer_found:
+        if delkey_binded == True:       # If "delkey_binded" variable/flag is True, unbind the "del" key so that it doesn't work when no treeview item is selected.
+            tree.unbind("<Delete>")
+        delkey_binded = False           # Set "delkey_binded" variable/flag to False so program won't try to unbind the "del" key if it hasn't been binded already.
+        counter["entry_number"] -= 1    # Update the entry number so the user knows what number of entry they will be submitting.
+        show_entry_counter()
+        show_availability()             # The receipt's items are back in stock.
+        delete_receipt_num.delete(0, "end")                 # Remove the value in the "delete_receipt_num" entry box (from the beginning (0) to the end).
+        render_receipt_table()          # Refresh the visible rows, which shifts the rows after the deleted receipt up and renumbers them.
+        if len(store) <= 0 and tree_frame is not None:  # Check if there are no receipts left so that the printed list can be removed after.
+            tree_frame.grid_remove()    # Remove the treeview from the grid.
+            remove_treeview = False     # Set "remove_treeview" variable/flag to "False" so the treeview can be printed again next time the print function is run.
 
     # Display an error label if the customer receipt entered wasn't found in the list of existing customer receipts.
     if not customer_found:
         Label(main_canvas, text="Receipt not found", bg=main_canvas_colour, fg="red").grid(column=2, row=4, sticky=E)
 
+# Function for getting an image from the "Images" folder, only decoding the file the first time it is needed.
+# The same PhotoImage is shared by every widget showing the image, and the cache keeps a reference to it so that it doesn't disappear.
+def load_image(name):
+    image = image_cache.get(name)
+    if image is None:
+        image = image_cache[name] = PhotoImage(file=f"Images/{name}")
+    return image
+
+
 # Function for adding the banner image to the canvas.
 def setup_banner(canvas):
-    global banner  # Keep a reference to the image object so that it appears.
-    banner = PhotoImage(file="Images/Banner_V2.png")    # Add the banner image file directory.
-    canvas.create_image(0, 0, anchor=NW, image=banner)  # Add the image to the canvas.
+    canvas.create_image(0, 0, anchor=NW, image=load_image("Banner_V2.png"))  # Add the image to the canvas.
 
 
 # Function for setting up the UI elements consisting of images, labels, entry boxes, combo boxes, spin boxes, and buttons.
 def setup_elements():
-    global main_canvas, main_canvas_colour, canvas_image, first_name, last_name, item_hired, amount_hired, delete_receipt_num, left_image, right_image
+    global main_canvas, main_canvas_colour, first_name, last_name, item_hired, amount_hired, delete_receipt_num, search_box, entry_counter_label
 
     # Create a canvas for the main entry section.
     main_canvas_colour = "#a7acd0"  # Set the colour of the main canvas so that other elements can use it.
@@ -550,8 +785,7 @@ def setup_elements():
     main_canvas.grid(row=1, column=1, columnspan=4, rowspan=7, pady=[0, 20])
 
     # Add the image as a background for the main canvas.
-    canvas_image = PhotoImage(file="Images/Main_Canvas_Image.png")  # Add the canvas image file directory.
-    main_canvas.create_image(0, 0, anchor=NW, image=canvas_image)  # Add the image to the canvas.
+    main_canvas.create_image(0, 0, anchor=NW, image=load_image("Main_Canvas_Image.png"))  # Add the image to the canvas.
 
     # Set width for columns 0-3 (4 total) in the main canvas.
     main_canvas.columnconfigure(0, weight=0, minsize=150)
@@ -567,22 +801,20 @@ def setup_elements():
     right_canvas = Canvas(main_window, bg="#B4B9DE", width=150, height=278, bd=0, highlightthickness=0)
     right_canvas.grid(row=1, column=5, rowspan=7, sticky=NSEW)
 
-    # Add the image to the left-side canvas.
-    left_image = PhotoImage(file="Images/Balloons.png")
-    left_canvas.create_image(0, 0, anchor=NW, image=left_image)
-
-    # Add the image to the left-side canvas.
-    right_image = PhotoImage(file="Images/Balloons.png")
-    right_canvas.create_image(0, 0, anchor=NW, image=right_image)    
+    # Add the balloons image to the left-side and right-side canvases, which share the image so that it is only decoded once.
+    left_canvas.create_image(0, 0, anchor=NW, image=load_image("Balloons.png"))
+    right_canvas.create_image(0, 0, anchor=NW, image=load_image("Balloons.png"))
 
     # Create the labels to be placed next to their relevant entry boxes.
     Label(main_canvas, text="Entry Number", bg=main_canvas_colour, font=("Segoe UI", 10, "bold"), fg="white").grid(column=0, row=0, sticky=E, padx=5, pady=[15,0])
-    Label(main_canvas, text=counter["entry_number"], bg=main_canvas_colour, fg="white", font=("Segoe UI", 10, "bold")).grid(column=1, row=0, pady=[15,0])
+    entry_counter_label = Label(main_canvas, text=counter["entry_number"], bg=main_canvas_colour, fg="white", font=("Segoe UI", 10, "bold"))
+    entry_counter_label.grid(column=1, row=0, pady=[15,0])  # Keep the label so that the entry counter can be updated without creating a new label each time.
     Label(main_canvas, text="First Name", bg=main_canvas_colour, font=("Segoe UI", 10, "bold"), fg="white").grid(column=0, row=1, sticky=E, padx=5, pady=5)
     Label(main_canvas, text="Last Name", bg=main_canvas_colour, font=("Segoe UI", 10, "bold"), fg="white").grid(column=0, row=2, sticky=E, padx=5, pady=5)
     Label(main_canvas, text="Item Hired", bg=main_canvas_colour, font=("Segoe UI", 10, "bold"), fg="white").grid(column=0, row=3, sticky=E, padx=5, pady=5)
     Label(main_canvas, text="Amount Hired", bg=main_canvas_colour, font=("Segoe UI", 10, "bold"), fg="white").grid(column=0, row=4, sticky=E, padx=5, pady=5)
     Label(main_canvas, text="Receipt No.", bg=main_canvas_colour, font=("Segoe UI", 10, "bold"), fg="white").grid(column=3, row=3, sticky=EW, padx=[5,15])
+    Label(main_canvas, text="Search", bg=main_canvas_colour, font=("Segoe UI", 10, "bold"), fg="white").grid(column=3, row=1, sticky=EW, padx=[5,15])
 
     # Create a style for the Combobox and Spinbox.
     combostyle = ttk.Style()
@@ -635,16 +867,17 @@ def setup_elements():
     delete_receipt_num = Entry(main_canvas, bg="#979BBA", fg="white", selectbackground="#faf1c0", selectforeground="black", insertwidth=2)
     delete_receipt_num.grid(column=3, row=4, padx=[5,15], sticky=EW)
     delete_receipt_num.config(insertbackground="white")
-
-    # Specify the images to use for each button in normal and clicked states.
-    main_canvas.btn_img1_normal = PhotoImage(file="Images/Buttons/Exit.png")
-    main_canvas.btn_img1_clicked = PhotoImage(file="Images/Buttons/Exit_Clicked.png")
-    main_canvas.btn_img2_normal = PhotoImage(file="Images/Buttons/Delete.png")
-    main_canvas.btn_img2_clicked = PhotoImage(file="Images/Buttons/Delete_Clicked.png")
-    main_canvas.btn_img3_normal = PhotoImage(file="Images/Buttons/Submit.png")
-    main_canvas.btn_img3_clicked = PhotoImage(file="Images/Buttons/Submit_Clicked.png")
-    main_canvas.btn_img4_normal = PhotoImage(file="Images/Buttons/Print.png")
-    main_canvas.btn_img4_clicked = PhotoImage(file="Images/Buttons/Print_Clicked.png")
+    search_box = Entry(main_canvas, bg="#979BBA", fg="white", selectbackground="#faf1c0", selectforeground="black", insertwidth=2)
+    search_box.grid(column=3, row=2, padx=[5,15], sticky=EW)
+    search_box.config(insertbackground="white")
+    search_box.bind("<KeyRelease>", search_receipts)  # Filter the Treeview as each key is typed, e.g. a customer's name, an item or a receipt number.
+
+    # Specify the images to use for each button in its normal state. The clicked images are only decoded the first time the mouse moves over
+    # or presses their button, so they don't hold up the window appearing.
+    main_canvas.btn_img1_normal = load_image("Buttons/Exit.png")
+    main_canvas.btn_img2_normal = load_image("Buttons/Delete.png")
+    main_canvas.btn_img3_normal = load_image("Buttons/Submit.png")
+    main_canvas.btn_img4_normal = load_image("Buttons/Print.png")
 
     # Create frames for each image button to be packed into.
     img_frame1 = Frame(main_canvas, width=23, bg=main_canvas_colour)
@@ -656,7 +889,8 @@ def setup_elements():
     img_frame4 = Frame(main_canvas, width=23, bg=main_canvas_colour)
     img_frame4.grid(column=1, row=6, sticky=EW, pady=[5,15])
 
-    def on_button_press(button, clicked_img):  # Define the "on_button_press" function to handle button presses for the clicked button image to appear.
+    def on_button_press(button, clicked_name):  # Define the "on_button_press" function to handle button presses for the clicked button image to appear.
+        clicked_img = load_image(clicked_name)  # Decode the clicked image if the button is pressed without the mouse moving over it first (e.g. on a touch screen).
         button.config(image=clicked_img)
         button.image = clicked_img
         button._is_pressed = True
@@ -666,7 +900,8 @@ def setup_elements():
         button.image = normal_img
         button._is_pressed = False
 
-    def on_button_enter(button, clicked_img, normal_img):   # Define the "on_button_enter" function to handle the mouse entering the button while clicked for the clicked button image to appear.
+    def on_button_enter(button, clicked_name, normal_img):  # Define the "on_button_enter" function to handle the mouse entering the button while clicked for the clicked button image to appear.
+        clicked_img = load_image(clicked_name)              # Decode the clicked image the first time the mouse moves over the button, so it is ready before the button is pressed.
         if getattr(button, "_is_pressed", True):            # Check if the button is being pressed/held down.
             button.config(image=clicked_img)
             button.image = clicked_img
@@ -689,9 +924,9 @@ def setup_elements():
                         bg=main_canvas_colour, fg="white", borderwidth=0, compound="center", relief="flat",
                         activebackground=main_canvas_colour, activeforeground=main_canvas_colour)
     img_button1.image = main_canvas.btn_img1_normal  # Store the image reference to prevent garbage collection from causing it to disappear.
-    img_button1.bind("<Button-1>", lambda e: on_button_press(img_button1, main_canvas.btn_img1_clicked))                            # Bind button press to left mouse click event to change image to the clicked version.
+    img_button1.bind("<Button-1>", lambda e: on_button_press(img_button1, "Buttons/Exit_Clicked.png"))                            # Bind button press to left mouse click event to change image to the clicked version.
     img_button1.bind("<ButtonRelease-1>", lambda e: on_button_release(img_button1, main_canvas.btn_img1_normal))                    # Bind button release to left click release event to revert the image.
-    img_button1.bind("<Enter>", lambda e: on_button_enter(img_button1, main_canvas.btn_img1_clicked, main_canvas.btn_img1_normal))  # Bind the mouse enter event while clicked to change image to clicked version.
+    img_button1.bind("<Enter>", lambda e: on_button_enter(img_button1, "Buttons/Exit_Clicked.png", main_canvas.btn_img1_normal))  # Bind the mouse enter event while clicked to change image to clicked version.
     img_button1.bind("<Leave>", lambda e: on_button_leave(img_button1, main_canvas.btn_img1_normal))                                # Bind the mouse leave event while clicked to revert the image.
     img_button1.pack()                  # Pack the Exit button into its frame/container.
     img_button1._is_pressed = False     # Set the initial pressed state variable to "False" so that it isn't automatically set to "True" and doesn't cause the button image to be a clicked state when hovered over.
@@ -701,9 +936,9 @@ def setup_elements():
                         bg=main_canvas_colour, fg="white", font=("Helvetica 10 bold"), borderwidth=0, compound="center", relief="flat",
                         activebackground=main_canvas_colour, activeforeground=main_canvas_colour)
     img_button2.image = main_canvas.btn_img2_normal  # Store the image reference to prevent garbage collection from causing it to disappear.
-    img_button2.bind("<Button-1>", lambda e: on_button_press(img_button2, main_canvas.btn_img2_clicked))                            # Bind button press to left mouse click event to change image to the clicked version.
+    img_button2.bind("<Button-1>", lambda e: on_button_press(img_button2, "Buttons/Delete_Clicked.png"))                            # Bind button press to left mouse click event to change image to the clicked version.
     img_button2.bind("<ButtonRelease-1>", lambda e: on_button_release(img_button2, main_canvas.btn_img2_normal))                    # Bind button release to left click release event to revert the image.
-    img_button2.bind("<Enter>", lambda e: on_button_enter(img_button2, main_canvas.btn_img2_clicked, main_canvas.btn_img2_normal))  # Bind the mouse enter event while clicked to change image to clicked version.
+    img_button2.bind("<Enter>", lambda e: on_button_enter(img_button2, "Buttons/Delete_Clicked.png", main_canvas.btn_img2_normal))  # Bind the mouse enter event while clicked to change image to clicked version.
     img_button2.bind("<Leave>", lambda e: on_button_leave(img_button2, main_canvas.btn_img2_normal))                                # Bind the mouse leave event while clicked to revert the image.
     img_button2.pack()                  # Pack the Delete Receipt button into its frame/container.
     img_button2._is_pressed = False     # Set the initial pressed state variable to "False" so that it isn't automatically set to "True" and doesn't cause the button image to be a clicked state when hovered over.
@@ -713,9 +948,9 @@ def setup_elements():
                         bg=main_canvas_colour, fg="white", borderwidth=0, compound="center", relief="flat",
                         activebackground=main_canvas_colour, activeforeground=main_canvas_colour)
     img_button3.image = main_canvas.btn_img3_normal  # Store the image reference to prevent garbage collection from causing it to disappear.
-    img_button3.bind("<Button-1>", lambda e: on_button_press(img_button3, main_canvas.btn_img3_clicked))                            # Bind button press to left mouse click event to change image to the clicked version.
+    img_button3.bind("<Button-1>", lambda e: on_button_press(img_button3, "Buttons/Submit_Clicked.png"))                            # Bind button press to left mouse click event to change image to the clicked version.
     img_button3.bind("<ButtonRelease-1>", lambda e: on_button_release(img_button3, main_canvas.btn_img3_normal))                    # Bind button release to left click release event to revert the image.
-    img_button3.bind("<Enter>", lambda e: on_button_enter(img_button3, main_canvas.btn_img3_clicked, main_canvas.btn_img3_normal))  # Bind the mouse enter event while clicked to change image to clicked version.
+    img_button3.bind("<Enter>", lambda e: on_button_enter(img_button3, "Buttons/Submit_Clicked.png", main_canvas.btn_img3_normal))  # Bind the mouse enter event while clicked to change image to clicked version.
     img_button3.bind("<Leave>", lambda e: on_button_leave(img_button3, main_canvas.btn_img3_normal))                                # Bind the mouse leave event while clicked to revert the image.
     img_button3.pack()                  # Pack the Submit Details button into its frame/container.
     img_button3._is_pressed = False     # Set the initial pressed state variable to "False" so that it isn't automatically set to "True" and doesn't cause the button image to be a clicked state when hovered over.
@@ -725,32 +960,61 @@ def setup_elements():
                         bg=main_canvas_colour, fg="white", borderwidth=0, compound="center", relief="flat",
                         activebackground=main_canvas_colour, activeforeground=main_canvas_colour)
     img_button4.image = main_canvas.btn_img4_normal  # Store the image reference to prevent garbage collection from causing it to disappear.
-    img_button4.bind("<Button-1>", lambda e: on_button_press(img_button4, main_canvas.btn_img4_clicked))                            # Bind button press to left mouse click event to change image to the clicked version.
+    img_button4.bind("<Button-1>", lambda e: on_button_press(img_button4, "Buttons/Print_Clicked.png"))                            # Bind button press to left mouse click event to change image to the clicked version.
     img_button4.bind("<ButtonRelease-1>", lambda e: on_button_release(img_button4, main_canvas.btn_img4_normal))                    # Bind button release to left click release event to revert the image.
-    img_button4.bind("<Enter>", lambda e: on_button_enter(img_button4, main_canvas.btn_img4_clicked, main_canvas.btn_img4_normal))  # Bind the mouse enter event while clicked to change image to clicked version.
+    img_button4.bind("<Enter>", lambda e: on_button_enter(img_button4, "Buttons/Print_Clicked.png", main_canvas.btn_img4_normal))  # Bind the mouse enter event while clicked to change image to clicked version.
     img_button4.bind("<Leave>", lambda e: on_button_leave(img_button4, main_canvas.btn_img4_normal))                                # Bind the mouse leave event while clicked to revert the image.
     img_button4.pack()                  # Pack the Print Details button into its frame/container.
     img_button4._is_pressed = False     # Set the initial pressed state variable to "False" so that it isn't automatically set to "True" and doesn't cause the button image to be a clicked state when hovered over.
 
-
-# Main function for starting the program.
-def main(): 
+    # Create the availability panel below the receipt table, with a label for each item showing how many are left in stock.
+    availability_frame = Frame(main_window, bg=main_window_bg)
+    availability_frame.grid(column=0, row=10, columnspan=6, padx=20, pady=[0,20], sticky=EW)
+    for i, item in enumerate(item_list):
+        availability_frame.columnconfigure(i, weight=1, uniform="availability")  # Give every item the same width.
+        availability_labels[item] = Label(availability_frame, text=item, bg=main_canvas_colour, fg="white", font=("Segoe UI", 9, "bold"))
+        availability_labels[item].grid(column=i, row=0, padx=2, sticky=EW)
+
+    # Statistics Button, which opens the statistics window.
+    statistics_button = Button(main_canvas, text="Statistics", command=lambda: handle_button_click(open_statistics_window), width=14,
+                        bg="#8183b2", fg="white", font=("Segoe UI", 10, "bold"), borderwidth=0, relief="flat",
+                        activebackground="#7678a3", activeforeground="white")
+    statistics_button.grid(column=3, row=6, padx=[5,15], pady=[5,15])
+
+    # Export Button, which exports the receipts in the Treeview to a file.
+    export_button = Button(main_canvas, text="Export", command=lambda: handle_button_click(export_customer_details), width=14,
+                        bg="#8183b2", fg="white", font=("Segoe UI", 10, "bold"), borderwidth=0, relief="flat",
+                        activebackground="#7678a3", activeforeground="white")
+    export_button.grid(column=2, row=6, padx=5, pady=[5,15])
+
+
+# Function for setting up everything shown in the main window when the program starts.
+def setup_window():
     banner_canvas = Canvas(main_window, bg="#B4B9DE", width=917, height=232, bd=0, highlightthickness=0)  # Create a canvas for the banner image.
     banner_canvas.grid(row=0, column=0, columnspan=6, sticky=EW, pady=(2,20))
     setup_banner(banner_canvas)  # Call the setup_banner function to add the banner image.
-
-    # Start the primary GUI functions.
-    load_customer_details()
     setup_elements()
 
+
+# Main function for starting the program.
+def main(): 
+    # Start the primary GUI functions, loading the receipts in the background so that the window appears straight away.
+    atexit.register(store.close)  # Also save every change and the receipt number pool if the program stops without "quit_program()" (e.g. Ctrl+C or an error).
+    setup_window()
+    start_loading_receipts()
+    start_watching_files()
+    check_storage_errors()
+
     main_window.mainloop()
 
 
 #Initialise the main window.
+image_cache = {}                            # Images decoded from the "Images" folder so far, keyed by their file name (see "load_image()").
 main_window = Tk()
 main_window.title("Julie's Party Hire Store")  # Set the title of the window.
-main_window.iconphoto(False, PhotoImage(file="Images/Pgm_Icon.png"))  # Set the title bar icon.
+main_window.iconphoto(False, load_image("Pgm_Icon.png"))  # Set the title bar icon.
 main_window.resizable(False, False)         # Set the resizable property for height and width to False.
+main_window.protocol("WM_DELETE_WINDOW", quit_program)  # Save every change when the window is closed with the title bar's X, as with the Exit button.
 main_window_bg = "#B4B9DE"                  # Set the background colour of the main window.
 main_window.configure(bg=main_window_bg)    # Configure the main window to use the background colour (value) of the "main_window_bg variable".
 
@@ -764,11 +1028,41 @@ main_window.columnconfigure(5, weight=0, minsize=150)
 
 # Initialise global lists and variables.
 counter = {"entry_number": 1}   # Initialise the entry number counter at 1.
-customer_details = []           # Create empty list for customer details so that the entered details can be stored inside.
-item_list = ["Knives", "Forks", "Spoons", "Paper Plates", "Paper Bowls", "Paper Cups", "Balloons", "Party Hats"]  # Create a list of all the available items for hire.
-data_loaded = False         # Initialise a flag to track whether the JSON file data has been loaded, setting it to False so that the program will reload data from the file when printing.
+receipt_digits = 4              # Number of digits in each new receipt number, can be increased (e.g. to 6 or 8) so that more receipts can be stored.
+receipt_pool_file = "customer_receipts.pool.json"  # File that the receipt number pool is saved to.
+stock_levels_file = "stock_levels.json"            # File with the number of each item the store owns, created with the default stock levels if it doesn't exist.
+item_list = ITEM_LIST           # List of all the available items for hire.
 remove_treeview = False     # Initialise a flag to track whether the Treeview is displayed so that the print button can alternate between printing and removing the treeview.
+tree = None                 # Treeview that the customer receipts are printed in, created the first time the print button is pressed.
+tree_frame = None           # Frame holding the Treeview and its scrollbar.
+tree_scrollbar = None       # Scrollbar for the Treeview.
+table_visible_rows = 8      # Number of rows shown in the Treeview at once.
+table_offset = 0            # Position in the list of the receipt shown in the first row of the Treeview.
+table_row_receipts = []     # Receipt number shown in each row of the Treeview.
+table_generation = None     # Generation of the receipt store that the Treeview rows were last filled from.
+table_selected_receipt = None  # Receipt number of the selected receipt, which may be scrolled out of view.
+table_search = ""           # Text typed into the search box that the Treeview is filtered by, or "" to show every receipt.
+table_filter = None         # List of the receipts matching "table_search" that the Treeview scrolls through, or None to show every receipt.
+table_sort_column = None    # Column the Treeview is sorted by (a key of "SORT_KEYS" or "entry"), or None for the order the receipts were added in.
+table_sort_descending = False  # Whether the Treeview is sorted from highest to lowest.
+table_sort_columns = {"Entry": "entry", "Receipt No.": "receipt_number", "First Name": "first_name", "Last Name": "last_name", "Item Hired": "item_hired", "Amount Hired": "amount_hired"}  # Column each Treeview heading sorts by.
 delkey_binded = False       # Initialise a flag to track if the "del" key is binded to the "delete_receipt" function so that it only binds when a treeview item is selected.
+receipt_loader = None       # Loader reading the receipts on a background thread when the program starts, set back to None once they are all loaded.
+loading_bar = None          # Progress bar shown while the receipts are loading.
+file_watcher = None         # Watcher for changes to the receipt files made by another program, started once the window is set up.
+availability_labels = {}    # Label in the availability panel for each item, showing how many are left in stock.
+statistics_window = None    # Window showing the hire statistics, or None if it isn't open.
+statistics_tables = {}      # Treeview in the statistics window for each set of totals ("items", "customers" and "days").
+statistics_generation = None  # Generation of the receipt store that the statistics window was last filled in from.
+statistics_top_customers = 10  # Number of customers shown in the statistics window's list of the biggest customers.
+
+# Initialise the storage backend and the receipt store and service that the GUI works through.
+storage_engine = "json"     # Storage backend for the receipts, set to "sqlite" to keep them in "customer_receipts.db" (migrated from the JSON file on first use).
+storage_write_delay = 0.25  # Seconds that changes are held for on the background writer thread, so that a burst of changes is saved in one write.
+storage = open_storage(storage_engine, receipts_source=lambda: store.receipt_lists(), write_delay=storage_write_delay)  # The JSON backend copies the current receipts when compacting its journal.
+store = ReceiptStore(storage, receipt_pool_file, receipt_digits, stock_levels_file)  # Receipts with their indexes, the receipt number pool and the stock levels.
+service = ReceiptService(store)                                    # Validation and duplicate handling for submitting and deleting receipts.
 
 # Run the main function.
-main()
\ No newline at end of file
+if __name__ == "__main__":  # Only start the program when this file is run, so that it can be imported by the benchmark without opening the window.
+    main()
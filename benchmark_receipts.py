@@ -0,0 +1,363 @@
+# Date Created: 18/10/2026
+# Author: Jack Compton
+# Purpose: Benchmark for timing how the receipt functions of Julie's party hire store scale with the number of stored receipts.
+# Usage: python benchmark_receipts.py --sizes 1000 10000 100000 --output bench_output.json
+
+import os
+import sys
+import csv
+import json
+import time
+import types
+import random
+import datetime
+import shutil
+import gc
+import io
+import contextlib
+import tracemalloc
+import argparse
+import tempfile
+import platform
+import importlib.util
+
+program_directory = os.path.dirname(os.path.abspath(__file__))
+program_file = os.path.join(program_directory, "Julie's Party Hire - V4 Final.py")
+first_names = ["Julie", "Jack", "Aroha", "Mele", "Sam", "Priya", "Liam", "Ana", "Tane", "Grace"]
+last_names = ["Smith", "Compton", "Ngata", "Fifita", "Lee", "Patel", "Brown", "Silva", "Walker", "Chen"]
+item_list = ["Knives", "Forks", "Spoons", "Paper Plates", "Paper Bowls", "Paper Cups", "Balloons", "Party Hats"]
+
+
+# Class for a stand-in Tk widget that accepts any method call, so the program can run without a display.
+class StubWidget:
+    def __init__(self, *args, **kwargs):
+        self.text = ""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: None
+
+    # Entry box, Combobox and Spinbox methods, so that the benchmark can type into them.
+    def get(self):
+        return self.text
+
+    def insert(self, index, text, *args, **kwargs):
+        self.text += str(text)
+        return text
+
+    def delete(self, *args):
+        self.text = ""
+
+    def set(self, *args):
+        self.text = str(args[-1]) if args else ""
+
+    # Treeview methods that return values.
+    def get_children(self, *args):
+        return ()
+
+    def selection(self):
+        return ()
+
+    def grid_slaves(self, *args, **kwargs):
+        return []
+
+
+# Function for creating stand-in "tkinter", "tkinter.ttk" and "tkinter.messagebox" modules for running without a display.
+def install_stub_tkinter():
+    tkinter = types.ModuleType("tkinter")
+    for name in ("Tk", "Toplevel", "Frame", "Canvas", "Label", "Button", "Entry", "Scrollbar", "PhotoImage", "Menu", "StringVar"):
+        setattr(tkinter, name, type(name, (StubWidget,), {}))
+    for name in ("N", "S", "E", "W", "NW", "NE", "SW", "SE", "NS", "EW", "NSEW", "LEFT", "RIGHT", "TOP", "BOTTOM", "BOTH", "X", "Y", "END"):
+        setattr(tkinter, name, name.lower())
+    ttk = types.ModuleType("tkinter.ttk")
+    for name in ("Style", "Treeview", "Combobox", "Spinbox", "Progressbar", "Entry", "Label", "Button", "Frame"):
+        setattr(ttk, name, type(name, (StubWidget,), {}))
+    messagebox = types.ModuleType("tkinter.messagebox")
+    filedialog = types.ModuleType("tkinter.filedialog")
+    tkinter.ttk, tkinter.messagebox, tkinter.filedialog = ttk, messagebox, filedialog
+    tkinter.__all__ = [name for name in vars(tkinter) if not name.startswith("_")]
+    sys.modules.update({"tkinter": tkinter, "tkinter.ttk": ttk, "tkinter.messagebox": messagebox, "tkinter.filedialog": filedialog})
+
+
+# Class for a stand-in message box that answers "Yes" to every question, so the benchmark never waits for a click.
+class AutoMessageBox:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: True
+
+
+# Function for checking whether a real Tk window can be opened (needs a display on Linux).
+def real_tk_available():
+    try:
+        import tkinter
+        root = tkinter.Tk()
+        root.destroy()
+        return True
+    except Exception:
+        return False
+
+
+# Function for creating a list of synthetic receipts with unique receipt numbers, hired on days spread over a year.
+def make_receipts(size, digits):
+    receipt_numbers = random.sample(range(10 ** (digits - 1), 10 ** digits), size)
+    hire_dates = [(datetime.date(2026, 1, 1) + datetime.timedelta(days=day)).isoformat() for day in range(365)]
+    return [[number, random.choice(first_names), random.choice(last_names) + str(i), random.choice(item_list), str(random.randint(1, 500)), random.choice(hire_dates)]
+            for i, number in enumerate(receipt_numbers)]
+
+
+# Function for importing a fresh copy of the program, so that each store size starts with clean global variables.
+def import_program():
+    spec = importlib.util.spec_from_file_location("party_hire_program", program_file)
+    program = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(program)
+    program.messagebox = AutoMessageBox()
+    program.main_window.withdraw()  # Keep a real window hidden while benchmarking.
+    return program
+
+
+# Function for timing a function a number of times, returning the average time in milliseconds.
+def time_operation(function, repeats):
+    start = time.perf_counter()
+    for i in range(repeats):
+        function(i)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+# Function for measuring the memory taken by the result of a function, in bytes.
+def traced_bytes(function):
+    gc.collect()
+    tracemalloc.start()
+    value = function()
+    size = tracemalloc.get_traced_memory()[0]  # Measure while the value is still in use.
+    tracemalloc.stop()
+    del value
+    return size
+
+
+# Function for measuring how many bytes each receipt takes in memory, as the lists loaded from the JSON file and as receipt records.
+def measure_receipt_memory(receipts):
+    from receipt_core import Receipt
+
+    text = json.dumps(receipts)
+    list_bytes = traced_bytes(lambda: json.loads(text))
+    record_bytes = traced_bytes(lambda: [Receipt.from_list(details) for details in json.loads(text)])
+    return {"list_bytes_per_receipt": list_bytes / len(receipts), "record_bytes_per_receipt": record_bytes / len(receipts)}
+
+
+# Function for running every benchmark against a synthetic store of the given size.
+def benchmark_size(size, operations, engine, digits):
+    from receipt_storage import migrate_json_to_sqlite, write_json_atomically
+    from receipt_transfer import export_receipts, export_rows, import_file
+    from receipt_cli import run_batch
+
+    receipts = make_receipts(size, digits)
+    write_json_atomically("customer_receipts.json", receipts, keep_backup=False)  # Seed the store before the program opens it.
+    write_json_atomically("stock_levels.json", {item: 10 ** 9 for item in item_list}, keep_backup=False)  # Enough stock that no synthetic receipt is turned away.
+    if engine == "sqlite":
+        migrate_json_to_sqlite("customer_receipts.json", "customer_receipts.db")
+
+    program = import_program()
+    program.storage.close()
+    program.storage = program.open_storage(engine, receipts_source=lambda: program.store.receipt_lists(), write_delay=program.storage_write_delay)
+    program.store = program.ReceiptStore(program.storage, program.receipt_pool_file, digits, program.stock_levels_file)
+    program.service = program.ReceiptService(program.store)
+    result = {"size": size}
+    result.update(measure_receipt_memory(receipts))
+
+    # Time loading the store a chunk at a time on a background thread, as the program does when it starts.
+    # This runs before the normal load so that, like the program starting up, there aren't already thousands of receipts in memory.
+    loader = program.ReceiptLoader(program.ReceiptStore(program.storage, program.receipt_pool_file, digits, program.stock_levels_file))
+    start = time.perf_counter()
+    loader.start()
+    while loader.poll(timeout=1) and len(loader.store) == 0:
+        pass
+    result["stream_first_chunk_ms"] = (time.perf_counter() - start) * 1000  # How long until the first receipts can be shown.
+    while loader.poll(timeout=1):
+        pass
+    result["stream_load_ms"] = (time.perf_counter() - start) * 1000
+    del loader
+
+    start = time.perf_counter()
+    program.load_customer_details()
+    result["load_ms"] = (time.perf_counter() - start) * 1000
+    program.setup_elements()
+
+    # Fill in the entry boxes and press Submit, with a new customer each time.
+    def submit(i, first_name="Bench", last_name=None, item="Knives"):
+        program.first_name.delete(0, "end")
+        program.first_name.insert(0, first_name)
+        program.last_name.delete(0, "end")
+        program.last_name.insert(0, last_name or f"Customer{i}")
+        program.item_hired.set(item)
+        program.amount_hired.delete(0, "end")
+        program.amount_hired.insert(0, str(i % 500 + 1))
+        program.validate_customer_details()
+
+    # Submit a receipt matching an existing customer and item, which updates the existing receipt.
+    def update_existing(i):
+        receipt = program.store.receipts[i % len(program.store)]
+        submit(i, receipt.first_name, receipt.last_name, receipt.item_hired)
+
+    # Type an existing receipt number and press Delete.
+    def delete(i):
+        program.delete_receipt_num.delete(0, "end")
+        program.delete_receipt_num.insert(0, str(program.store.receipts[len(program.store) // 2].receipt_number))
+        program.validate_receipt_deletion()
+
+    # Press Print to show the table, then press it again to hide it.
+    def render_table(i):
+        program.print_customer_details()
+        program.print_customer_details()
+
+    result["submit_ms"] = time_operation(submit, operations)
+    result["update_existing_ms"] = time_operation(update_existing, operations)
+    result["delete_ms"] = time_operation(delete, operations)
+    result["first_table_render_ms"] = time_operation(render_table, 1)
+    result["table_render_ms"] = time_operation(render_table, operations)
+
+    # Type a few customers' names, an item and a receipt number into the search box one key at a time, timing each key.
+    search_texts = [f"{receipt.first_name} {receipt.last_name}" for receipt in program.store.receipts[:3]]
+    search_texts += ["Paper Plates", str(program.store.receipts[-1].receipt_number)]
+    keystrokes = [text[:length] for text in search_texts for length in range(1, len(text) + 1)]
+
+    def type_search(i):
+        program.search_box.delete(0, "end")
+        program.search_box.insert(0, keystrokes[i % len(keystrokes)])
+        program.search_receipts()
+
+    result["search_keystroke_ms"] = time_operation(type_search, len(keystrokes))
+    program.search_box.delete(0, "end")
+    program.search_receipts()  # Clear the search so the rest of the benchmark works with every receipt.
+    result["save_ms"] = time_operation(lambda i: program.store.save("update", program.store.receipts[i % len(program.store)]), operations)
+    result["flush_ms"] = time_operation(lambda i: program.storage.flush(), 1)  # Time writing every change queued on the background writer.
+
+    # Time the same submit and delete through the receipt service directly, without any widget work.
+    service = program.service
+    result["core_submit_ms"] = time_operation(lambda i: service.submit("Core", f"Customer{i}", "Forks", str(i % 500 + 1)), operations)
+    result["core_update_existing_ms"] = time_operation(lambda i: service.submit("Core", f"Customer{i}", "Forks", "1", on_duplicate="update"), operations)
+    result["core_delete_ms"] = time_operation(lambda i: service.delete(program.store.receipts[len(program.store) // 2].receipt_number), operations)
+
+    # Time importing a CSV file of new receipts, which are checked like submitted receipts but saved together in one write.
+    import_rows = operations * 20
+    with open("import.csv", "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["first_name", "last_name", "item_hired", "amount_hired"])
+        writer.writerows(["Import", f"Customer{i}", item_list[i % len(item_list)], i % 500 + 1] for i in range(import_rows))
+    result["import_row_ms"] = time_operation(lambda i: import_file(service, "import.csv"), 1) / import_rows
+
+    # Time exporting every stored receipt to a CSV file, reading them from the storage backend a chunk at a time.
+    result["export_ms"] = time_operation(lambda i: export_receipts(export_rows(program.storage.scan()), "export.csv", "csv"), 1)
+
+    # Time the command line's batch mode on a mix of added and updated receipts, as sent by the end-of-day reconciliation script.
+    batch_lines = [f"add Batch Customer{i} {item_list[i % len(item_list)]} {i % 500 + 1}" for i in range(operations * 10)]
+    batch_lines += [f"update {program.store.receipts[i % len(program.store)].receipt_number} {i % 500 + 1}" for i in range(operations * 10)]
+    with contextlib.redirect_stdout(io.StringIO()):  # The results printed for each line aren't needed.
+        result["cli_batch_op_ms"] = time_operation(lambda i: run_batch(service, batch_lines, True), 1) / len(batch_lines)
+
+    # Time clicking the Last Name heading (which sorts every receipt the first time) and then reversing it, and submitting while sorted.
+    # This runs after the other timings, as the sorted order is then kept up to date on every change.
+    result["first_sort_ms"] = time_operation(lambda i: program.sort_receipt_table("Last Name"), 1)
+    result["sort_ms"] = time_operation(lambda i: program.sort_receipt_table("Last Name"), operations)
+    result["sorted_submit_ms"] = time_operation(lambda i: submit(i, last_name=f"Sorted{i}"), operations)
+
+    # Time opening the statistics window (and closing it again), which reads the totals kept up to date by the receipt store.
+    def open_statistics(i):
+        program.open_statistics_window()
+        program.close_statistics_window()
+
+    result["statistics_open_ms"] = time_operation(open_statistics, operations)
+
+    # Time writing a full snapshot of the store, which is what the JSON backend does when it compacts its journal.
+    if engine == "json":
+        result["snapshot_write_ms"] = time_operation(lambda i: write_json_atomically("customer_receipts.json", program.store.receipt_lists()), 1)
+
+    start = time.perf_counter()
+    program.store.close()
+    result["close_ms"] = (time.perf_counter() - start) * 1000
+    program.main_window.destroy()
+    return result
+
+
+# Function for timing how long the program takes from starting until its window is set up and drawn, counting the images it decodes on the way.
+# The receipts are loaded in the background once the window is shown, so this doesn't depend on the store size.
+def measure_startup():
+    import tkinter
+
+    decoded_images = []
+    original_photo_image = tkinter.PhotoImage
+
+    # Class for a PhotoImage that records each image file decoded.
+    class CountingPhotoImage(original_photo_image):
+        def __init__(self, *args, **kwargs):
+            decoded_images.append(kwargs.get("file"))
+            super().__init__(*args, **kwargs)
+
+    tkinter.PhotoImage = CountingPhotoImage  # The program picks this up with "from tkinter import *".
+    try:
+        start = time.perf_counter()
+        program = import_program()
+        program.setup_window()
+        program.main_window.update()  # Draw the window, as the main loop does before anything else.
+        first_window_ms = (time.perf_counter() - start) * 1000
+    finally:
+        tkinter.PhotoImage = original_photo_image
+    program.storage.close()
+    program.main_window.destroy()
+    return {"first_window_ms": first_window_ms, "startup_images_decoded": len(decoded_images)}
+
+
+# Function for running the benchmark for each store size inside its own temporary folder.
+def run_benchmark(sizes, operations, engine, digits, headless):
+    if headless or not real_tk_available():
+        install_stub_tkinter()
+        tk_mode = "stub"
+    else:
+        tk_mode = "real"
+    sys.path.insert(0, program_directory)  # Let the program import "receipt_core.py" and "receipt_storage.py" from its own folder.
+
+    report = {
+        "program": os.path.basename(program_file),
+        "engine": engine,
+        "tk": tk_mode,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "operations": operations,
+        "receipt_digits": digits,
+        "results": [],
+    }
+    original_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as store_directory:
+        shutil.copytree(os.path.join(program_directory, "Images"), os.path.join(store_directory, "Images"))
+        os.chdir(store_directory)
+        try:
+            report["startup"] = measure_startup()
+        finally:
+            os.chdir(original_directory)
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as store_directory:
+            shutil.copytree(os.path.join(program_directory, "Images"), os.path.join(store_directory, "Images"))
+            os.chdir(store_directory)
+            try:
+                report["results"].append(benchmark_size(size, operations, engine, digits))
+            finally:
+                os.chdir(original_directory)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the receipt functions of Julie's party hire store against synthetic stores.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Numbers of receipts to seed the store with.")
+    parser.add_argument("--operations", type=int, default=50, help="Number of times to repeat each timed operation.")
+    parser.add_argument("--engine", choices=["json", "sqlite"], default="json", help="Storage backend to benchmark.")
+    parser.add_argument("--digits", type=int, default=8, help="Receipt number width, which needs to be wide enough for the largest store size.")
+    parser.add_argument("--headless", action="store_true", help="Use the stand-in Tk even when a display is available.")
+    parser.add_argument("--output", help="File to write the JSON results to, instead of printing them.")
+    arguments = parser.parse_args()
+
+    random.seed(0)  # Use the same synthetic receipts every run so that results can be compared between versions.
+    report = run_benchmark(arguments.sizes, arguments.operations, arguments.engine, arguments.digits, arguments.headless)
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(report, file, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
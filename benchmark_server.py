@@ -0,0 +1,195 @@
+# Date Created: 18/10/2026
+# Author: Jack Compton
+# Purpose: Load generator for the local HTTP service in "receipt_server.py", timing how many requests a second it answers and how long each kind of request takes.
+# Usage: python benchmark_server.py --size 10000 --connections 20 --seconds 10 --output server_bench.json
+#        python benchmark_server.py --port 8080 --seconds 10   (load an already running server, which changes its receipts)
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import platform
+import subprocess
+from receipt_storage import write_json_atomically
+from benchmark_receipts import first_names, item_list, last_names, make_receipts, program_directory
+
+# Share of each kind of request sent, roughly what the booking website and the warehouse tablet send: mostly looking up receipts and some changes.
+REQUEST_MIX = {"search": 30, "get": 25, "add": 20, "update": 10, "list": 5, "stats": 5, "delete": 5}
+
+
+# Class for a client connection that is kept open for every request it sends, as the website and tablet do.
+class KeepAliveClient:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    # Method for sending a request and reading the response, returning (HTTP status code, output).
+    async def request(self, method, path, details=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = b"" if details is None else json.dumps(details).encode("utf-8")
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+        self.writer.write(head.encode("latin-1") + body)
+        status = int((await self.reader.readline()).split()[1])
+        length, keep_alive = 0, True
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, separator, value = line.decode("latin-1").partition(":")
+            name = name.strip().casefold()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection":
+                keep_alive = value.strip().casefold() != "close"
+        output = json.loads(await self.reader.readexactly(length))
+        if not keep_alive:
+            self.close()  # The server closed the connection, so open a new one for the next request.
+        return status, output
+
+    # Method for closing the connection.
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = self.reader = None
+
+
+# Class for choosing the requests to send, keeping track of the receipt numbers that exist so that most lookups and changes find a receipt.
+class RequestMaker:
+    def __init__(self, receipt_numbers):
+        self.receipt_numbers = list(receipt_numbers)
+        self.kinds = list(REQUEST_MIX)
+        self.weights = list(REQUEST_MIX.values())
+
+    # Method for choosing a request, returning (kind, method, path, details).
+    def next_request(self):
+        kind = random.choices(self.kinds, self.weights)[0]
+        if kind in ("get", "update", "delete") and not self.receipt_numbers:
+            kind = "add"  # Every receipt has been deleted, so add some more.
+        if kind == "search":
+            return kind, "GET", f"/search?q={random.choice(first_names)}+{random.choice(last_names)[:3]}&limit=20", None
+        if kind == "get":
+            return kind, "GET", f"/receipts/{random.choice(self.receipt_numbers)}", None
+        if kind == "add":
+            details = {"first_name": random.choice(first_names), "last_name": f"{random.choice(last_names)}{random.randint(0, 10 ** 6)}",
+                       "item_hired": random.choice(item_list), "amount_hired": random.randint(1, 500)}
+            return kind, "POST", "/receipts", details
+        if kind == "update":
+            return kind, "PATCH", f"/receipts/{random.choice(self.receipt_numbers)}", {"amount_hired": random.randint(1, 500)}
+        if kind == "list":
+            return kind, "GET", f"/receipts?item={random.choice(item_list).replace(' ', '+')}&limit=20", None
+        if kind == "stats":
+            return kind, "GET", "/stats?top=10&days=7", None
+        position = random.randrange(len(self.receipt_numbers))
+        self.receipt_numbers[position] = self.receipt_numbers[-1]  # Stop choosing the receipt being deleted, without shifting the whole list.
+        receipt_number = self.receipt_numbers.pop()
+        return kind, "DELETE", f"/receipts/{receipt_number}", None
+
+    # Method for remembering the receipt number of a receipt that was added.
+    def added(self, output):
+        if output.get("status") == "added":
+            self.receipt_numbers.append(output["receipt"]["receipt_number"])
+
+
+# Function for sending requests one after another on a single connection until the time is up, recording how long each kind of request took.
+async def run_client(host, port, maker, finish_time, latencies, failures):
+    client = KeepAliveClient(host, port)
+    try:
+        while time.perf_counter() < finish_time:
+            kind, method, path, details = maker.next_request()
+            start = time.perf_counter()
+            status, output = await client.request(method, path, details)
+            latencies[kind].append(time.perf_counter() - start)
+            if status >= 500:
+                failures.append(f"{method} {path}: {status} {output}")
+            if kind == "add":
+                maker.added(output)
+    finally:
+        client.close()
+
+
+# Function for getting a percentile of a sorted list of times, in milliseconds.
+def percentile_ms(times, fraction):
+    return times[min(len(times) - 1, int(len(times) * fraction))] * 1000 if times else None
+
+
+# Function for loading the server from several connections at once for a number of seconds, returning the results.
+async def run_load(host, port, connections, seconds):
+    first_client = KeepAliveClient(host, port)
+    status, output = await first_client.request("GET", f"/receipts?limit={10 ** 6}")  # Find the receipt numbers to look up, update and delete.
+    first_client.close()
+    maker = RequestMaker(receipt["receipt_number"] for receipt in output["receipts"])
+
+    latencies = {kind: [] for kind in REQUEST_MIX}
+    failures = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(host, port, maker, start + seconds, latencies, failures) for i in range(connections)))
+    elapsed = time.perf_counter() - start
+
+    requests = sum(len(times) for times in latencies.values())
+    result = {"connections": connections, "seconds": elapsed, "requests": requests, "requests_per_second": requests / elapsed,
+              "server_errors": len(failures), "first_server_errors": failures[:5], "requests_by_kind": {}}
+    for kind, times in latencies.items():
+        times.sort()
+        result["requests_by_kind"][kind] = {"count": len(times), "p50_ms": percentile_ms(times, 0.5), "p95_ms": percentile_ms(times, 0.95), "p99_ms": percentile_ms(times, 0.99)}
+    return result
+
+
+# Function for starting the server on a synthetic store inside a temporary folder, loading it, and stopping it again.
+def benchmark_new_server(size, digits, engine, connections, seconds):
+    original_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as store_directory:
+        os.chdir(store_directory)
+        try:
+            write_json_atomically("customer_receipts.json", make_receipts(size, digits), keep_backup=False)
+            write_json_atomically("stock_levels.json", {item: 10 ** 9 for item in item_list}, keep_backup=False)  # Enough stock that no synthetic receipt is turned away.
+            start = time.perf_counter()
+            server_process = subprocess.Popen([sys.executable, os.path.join(program_directory, "receipt_server.py"), "--port", "0", "--engine", engine, "--digits", str(digits)],
+                                              stdout=subprocess.PIPE, text=True)
+            try:
+                ready_line = server_process.stdout.readline()  # e.g. "Serving the customer receipts on http://127.0.0.1:53124"
+                if not ready_line:
+                    raise RuntimeError("The server stopped before it started serving.")
+                startup_ms = (time.perf_counter() - start) * 1000  # How long the server takes to load the store and start answering.
+                port = int(ready_line.rsplit(":", 1)[1])
+                result = asyncio.run(run_load("127.0.0.1", port, connections, seconds))
+                result["startup_ms"] = startup_ms
+            finally:
+                server_process.terminate()
+                server_process.wait()
+        finally:
+            os.chdir(original_directory)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load the local HTTP service of Julie's party hire store and time its answers.")
+    parser.add_argument("--size", type=int, default=10000, help="Number of receipts to seed a new server's store with.")
+    parser.add_argument("--connections", type=int, default=20, help="Number of keep-alive connections sending requests at once.")
+    parser.add_argument("--seconds", type=float, default=10, help="Number of seconds to send requests for.")
+    parser.add_argument("--engine", choices=["json", "sqlite"], default="json", help="Storage backend for a new server.")
+    parser.add_argument("--digits", type=int, default=8, help="Receipt number width, which needs to be wide enough for the store size.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address of an already running server.")
+    parser.add_argument("--port", type=int, help="Port of an already running server to load, instead of starting a new one on a synthetic store.")
+    parser.add_argument("--output", help="File to write the JSON results to, instead of printing them.")
+    arguments = parser.parse_args()
+
+    random.seed(0)  # Use the same synthetic receipts and requests every run so that results can be compared between versions.
+    if arguments.port is None:
+        report = {"size": arguments.size, "engine": arguments.engine}
+        report.update(benchmark_new_server(arguments.size, arguments.digits, arguments.engine, arguments.connections, arguments.seconds))
+    else:
+        report = asyncio.run(run_load(arguments.host, arguments.port, arguments.connections, arguments.seconds))
+    report["python"] = platform.python_version()
+    report["platform"] = platform.platform()
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(report, file, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
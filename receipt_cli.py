@@ -0,0 +1,231 @@
+# Date Created: 18/10/2026
+# Author: Jack Compton
+# Purpose: Adding, updating, deleting, listing and searching the customer receipts for Julie's party hire store from the command line, without the GUI.
+#          Uses the same receipt logic and files as the window, so changes show up in a window that is open at the same time.
+# Usage: python receipt_cli.py add Jane Smith Knives 3
+#        python receipt_cli.py --json search "jane smi"
+#        python receipt_cli.py batch < end_of_day_changes.txt
+
+import sys
+import json
+import time
+import shlex
+import argparse
+from receipt_core import MIN_RECEIPT_DIGITS, ReceiptService, open_receipt_store
+from receipt_storage import StorageCorruptError, StorageWriteError
+from receipt_transfer import DUPLICATE_CHOICES, field_error_text, receipt_matches, receipt_record
+
+BATCH_WRITE_DELAY = 0.25    # Seconds that changes are held on the background writer thread in batch mode, so that a burst of changes is saved in one write.
+BATCH_CHECK_INTERVAL = 0.5  # Seconds between checks in batch mode for changes made by another program (e.g. the window), as often as the window checks.
+FAILED_STATUSES = {"invalid", "full", "not_found"}  # Result statuses that count as a failed operation in the exit code.
+
+
+# Class for a command in batch mode that can't be parsed, so that the rest of the batch still runs.
+class CommandError(Exception):
+    pass
+
+
+# Class for the argument parser used for each line in batch mode, which raises CommandError rather than exiting the program.
+class CommandParser(argparse.ArgumentParser):
+    def error(self, message):
+        raise CommandError(message)
+
+    def exit(self, status=0, message=None):
+        raise CommandError((message or "").strip())
+
+
+# Function for adding the parsers for each receipt operation to a set of subcommands, shared by the command line and the lines in batch mode.
+def add_operation_parsers(commands):
+    add_parser = commands.add_parser("add", help="Add a receipt.")
+    add_parser.add_argument("first_name")
+    add_parser.add_argument("last_name")
+    add_parser.add_argument("item_hired")
+    add_parser.add_argument("amount_hired")
+    add_parser.add_argument("--date", dest="hire_date", help="Hire date as YYYY-MM-DD (default: today).")
+    add_parser.add_argument("--duplicates", choices=list(DUPLICATE_CHOICES), default="skip",
+                            help="What to do if the customer already has a receipt for the item (default: skip it and report the existing receipt).")
+    update_parser = commands.add_parser("update", help="Change the amount hired on a receipt.")
+    update_parser.add_argument("receipt_number")
+    update_parser.add_argument("amount_hired")
+    delete_parser = commands.add_parser("delete", help="Delete a receipt.")
+    delete_parser.add_argument("receipt_number")
+    list_parser = commands.add_parser("list", help="List the receipts in the order they were added.")
+    list_parser.add_argument("--item", help="Only list receipts for this item.")
+    list_parser.add_argument("--name", help="Only list receipts for this customer (a first, last or full name).")
+    list_parser.add_argument("--limit", type=int, help="Only list this many receipts.")
+    search_parser = commands.add_parser("search", help="Search the receipts as the window's search box does, where each word must match the start of a first or last name, "
+                                                          "the start of a word of an item or a whole receipt number.")
+    search_parser.add_argument("text", help="Words to search for, e.g. \"jane smi\", \"knives\" or a receipt number.")
+    search_parser.add_argument("--limit", type=int, help="Only list this many receipts.")
+    stats_parser = commands.add_parser("stats", help="Show the totals hired for each item, the biggest customers and the totals for each day.")
+    stats_parser.add_argument("--top", type=int, default=10, help="Number of customers to show (default: 10).")
+    stats_parser.add_argument("--days", type=int, default=7, help="Number of days to show, newest first (default: 7).")
+
+
+# Function for building the parser for the command line.
+def build_parser():
+    parser = argparse.ArgumentParser(description="Add, update, delete, list and search the customer receipts of Julie's party hire store.")
+    parser.add_argument("--engine", choices=["json", "sqlite"], default="json", help="Storage backend the receipts are kept in.")
+    parser.add_argument("--digits", type=int, default=MIN_RECEIPT_DIGITS, help="Number of digits in each new receipt number.")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per result instead of text, e.g. for a script to read.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add_operation_parsers(commands)
+    commands.add_parser("batch", help="Run one command per line from the standard input (e.g. 'update 12345 4'), saving the changes together.")
+    return parser
+
+
+# Function for building the parser for each line in batch mode, which takes the same commands apart from "batch" itself.
+def build_line_parser():
+    parser = CommandParser(prog="batch", add_help=False)
+    add_operation_parsers(parser.add_subparsers(dest="command", required=True))
+    return parser
+
+
+# Function for getting a receipt record (from "receipt_record()") as text, e.g. "12345: Jane Smith, 3 x Knives on 2026-10-18".
+def receipt_text(record):
+    hire_date = f" on {record['hire_date']}" if record["hire_date"] is not None else ""
+    return f"{record['receipt_number']}: {record['first_name']} {record['last_name']}, {record['amount_hired']} x {record['item_hired']}{hire_date}"
+
+
+# Function for running a single receipt operation, returning a dictionary describing the result.
+# Each result has the command and its "status", along with the receipt it changed, the receipts it found or the error messages.
+def run_operation(service, arguments):
+    store = service.store
+    command = arguments.command
+    if command in ("add", "update"):
+        if command == "add":
+            result = service.submit(arguments.first_name, arguments.last_name, arguments.item_hired, arguments.amount_hired,
+                                    DUPLICATE_CHOICES[arguments.duplicates], arguments.hire_date)
+        else:
+            result = service.update(arguments.receipt_number, arguments.amount_hired)
+        output = {"command": command, "status": result.status}
+        if result.receipt is not None:
+            output["receipt"] = receipt_record(result.receipt.to_list())
+        if result.errors:
+            output["errors"] = [field_error_text(error) for error in result.errors]
+        return output
+
+    if command == "delete":
+        result = service.delete(arguments.receipt_number)
+        output = {"command": command, "status": result.status}
+        if result.receipt is not None:
+            output["receipt"] = receipt_record(result.receipt.to_list())
+        if result.error is not None:
+            output["errors"] = [field_error_text(result.error)]
+        return output
+
+    if command == "list":
+        receipts = []
+        for receipt in store.receipts:
+            if arguments.limit is not None and len(receipts) >= arguments.limit:
+                break
+            receipt_list = receipt.to_list()
+            if receipt_matches(receipt_list, arguments.item, arguments.name):
+                receipts.append(receipt_list)
+        return {"command": command, "status": "found", "receipts": [receipt_record(receipt) for receipt in receipts]}
+
+    if command == "search":
+        matches = sorted(store.search(arguments.text), key=lambda receipt: receipt.receipt_number)
+        return {"command": command, "status": "found", "receipts": [receipt_record(receipt.to_list()) for receipt in matches[:arguments.limit]]}
+
+    # The statistics are kept up to date by the receipt store, so they are read straight off its totals.
+    statistics = store.statistics
+    return {"command": command, "status": "found",
+            "items": [{"item_hired": item, "receipts": receipt_count, "amount_hired": amount} for item, receipt_count, amount in statistics.item_totals()],
+            "customers": [{"first_name": first_name, "last_name": last_name, "receipts": receipt_count, "amount_hired": amount}
+                          for first_name, last_name, receipt_count, amount in statistics.top_customers(max(0, arguments.top))],
+            "days": [{"hire_date": day, "receipts": receipt_count, "amount_hired": amount} for day, receipt_count, amount in statistics.day_totals()[:max(0, arguments.days)]]}
+
+
+# Function for printing the result of an operation, either as text or as a single line of JSON.
+def print_result(output, as_json):
+    if as_json:
+        print(json.dumps(output))
+        return
+    status = output["status"]
+    if "receipt" in output:
+        descriptions = {"added": "Added", "updated": "Updated", "deleted": "Deleted", "duplicate": "Skipped, the customer already has"}
+        print(f"{descriptions[status]} receipt {receipt_text(output['receipt'])}")
+    elif status == "not_found":
+        print("No receipt has that receipt number.")
+    elif status == "full":
+        print("There are no more unique receipt numbers available.")
+    line = f"Line {output['line']}: " if "line" in output else ""  # Batch results say which line they are for.
+    for error in output.get("errors", []):
+        print(f"{line}Error: {error}")
+    for receipt in output.get("receipts", []):
+        print(receipt_text(receipt))
+    if "items" in output:
+        print("Items:")
+        for total in output["items"]:
+            print(f"  {total['item_hired']}: {total['amount_hired']} hired on {total['receipts']} receipts")
+        print("Top customers:")
+        for total in output["customers"]:
+            print(f"  {total['first_name']} {total['last_name']}: {total['amount_hired']} hired on {total['receipts']} receipts")
+        print("Days:")
+        for total in output["days"]:
+            print(f"  {total['hire_date'] or 'Unknown'}: {total['amount_hired']} hired on {total['receipts']} receipts")
+
+
+# Function for running one command per line from the standard input, returning the number of commands that failed.
+# Blank lines and lines starting with "#" are skipped. A line that can't be parsed is reported and the rest of the batch still runs.
+# Changes made by another program (e.g. the window) are merged in as often as the window checks for them, so they aren't overwritten.
+def run_batch(service, lines, as_json):
+    line_parser = build_line_parser()
+    failures = 0
+    next_check = time.monotonic() + BATCH_CHECK_INTERVAL
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if time.monotonic() >= next_check:
+            if service.store.changed_on_disk():
+                service.store.merge_external_changes()
+            next_check = time.monotonic() + BATCH_CHECK_INTERVAL
+        try:
+            output = run_operation(service, line_parser.parse_args(shlex.split(line)))
+        except (CommandError, ValueError) as error:  # ValueError is raised by "shlex" for unmatched quotes.
+            output = {"command": None, "status": "invalid", "errors": [str(error)]}
+        output["line"] = line_number
+        if output["status"] in FAILED_STATUSES:
+            failures += 1
+        print_result(output, as_json)
+    return failures
+
+
+# Main function for the command line.
+def main(arguments=None):
+    arguments = build_parser().parse_args(arguments)
+    try:
+        # In batch mode changes are written on a background thread, so that hundreds of changes a second are saved in a few writes rather than one each.
+        store = open_receipt_store(arguments.engine, arguments.digits, write_delay=BATCH_WRITE_DELAY if arguments.command == "batch" else None)
+    except StorageCorruptError as error:
+        print(f"Failed to load the customer receipts: {error}\nOpen the program to restore or replace them.", file=sys.stderr)
+        return 2
+
+    service = ReceiptService(store)
+    try:
+        try:
+            if arguments.command == "batch":
+                failures = run_batch(service, sys.stdin, arguments.json)
+            else:
+                output = run_operation(service, arguments)
+                print_result(output, arguments.json)
+                failures = 1 if output["status"] in FAILED_STATUSES else 0
+            store.close()  # Save the receipt number pool and make sure every change is on the disk, which also reports changes that couldn't be saved.
+        except StorageWriteError as error:
+            print(f"Failed to save the customer receipts: {error}", file=sys.stderr)
+            return 2
+        except StorageCorruptError as error:  # Raised if the files can't be read when merging in another program's changes.
+            print(f"Failed to load the customer receipts: {error}\nOpen the program to restore or replace them.", file=sys.stderr)
+            return 2
+        return 1 if failures else 0
+    finally:
+        try:
+            store.close()  # Does nothing if the store was closed above, otherwise saves what it can after an error.
+        except StorageWriteError as error:
+            print(f"Failed to save the customer receipts: {error}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1160 @@
+# Date Created: 18/10/2026
+# Author: Jack Compton
+# Purpose: Receipt records, validation and business rules for Julie's party hire store, kept separate from the GUI so they can run without Tk.
+
+import sys
+import json
+import bisect
+import itertools
+import queue
+import random
+import datetime
+import threading
+from receipt_storage import StorageCorruptError, StorageWriteError, coalesce_changes, open_storage, shared_file_lock, write_json_atomically
+
+ITEM_LIST = ["Knives", "Forks", "Spoons", "Paper Plates", "Paper Bowls", "Paper Cups", "Balloons", "Party Hats"]  # List of all the available items for hire.
+DEFAULT_STOCK_LEVELS = {"Knives": 2000, "Forks": 2000, "Spoons": 2000, "Paper Plates": 5000, "Paper Bowls": 5000, "Paper Cups": 5000,
+                        "Balloons": 10000, "Party Hats": 3000}  # Number of each item the store owns, used until the stock levels file is edited.
+MAX_NAME_LENGTH = 50        # Longest first or last name allowed (not counting spaces).
+MAX_AMOUNT_HIRED = 500      # Largest amount of an item that can be hired on one receipt.
+MIN_RECEIPT_DIGITS = 4      # Receipt numbers have always been at least 4 digits long.
+ITEM_NAMES = {item: item for item in ITEM_LIST}     # Maps each item name to the string in "ITEM_LIST", so every receipt shares the same item strings.
+AMOUNT_VALUES = tuple(range(MAX_AMOUNT_HIRED + 1))  # Every valid amount as an integer, so every receipt shares the same integer objects.
+
+# Functions for getting the value each column of the receipt table is sorted by, with the (unique) receipt number to break ties.
+# The amount hired is kept as an integer, so amounts sort as numbers (e.g. 5 before 40) rather than as the strings they are saved as.
+SORT_KEYS = {
+    "receipt_number": lambda receipt: receipt.receipt_number,
+    "first_name": lambda receipt: (receipt.first_name.casefold(), receipt.receipt_number),
+    "last_name": lambda receipt: (receipt.last_name.casefold(), receipt.receipt_number),
+    "item_hired": lambda receipt: (receipt.item_hired, receipt.receipt_number),
+    "amount_hired": lambda receipt: (receipt.amount_hired, receipt.receipt_number),
+}
+
+
+# Error raised when every receipt number is in use, so no more receipts can be added.
+class StoreFullError(Exception):
+    pass
+
+
+# Class for a single customer receipt.
+# Receipts use "__slots__" rather than a list or a "__dict__", and share their name, item and amount objects with other receipts,
+# so that a large store takes far less memory per receipt. The amount hired is kept as an integer.
+class Receipt:
+    __slots__ = ("receipt_number", "first_name", "last_name", "item_hired", "amount_hired", "hire_date")
+
+    def __init__(self, receipt_number, first_name, last_name, item_hired, amount_hired, hire_date=None):
+        self.receipt_number = receipt_number
+        self.first_name = sys.intern(first_name)    # Many customers share a first or last name, so each name is only stored once.
+        self.last_name = sys.intern(last_name)
+        self.item_hired = ITEM_NAMES.get(item_hired) or sys.intern(item_hired)
+        self.amount_hired = amount_value(amount_hired)
+        self.hire_date = sys.intern(hire_date) if hire_date is not None else None  # Date the receipt was added ("YYYY-MM-DD"), or None for receipts added before dates were kept.
+
+    # Method for creating a receipt from its stored list of [receipt_number, first_name, last_name, item_hired, amount_hired, hire_date],
+    # where receipts saved before hire dates were kept don't have the date.
+    @classmethod
+    def from_list(cls, details):
+        return cls(details[0], details[1], details[2], details[3], details[4], details[5] if len(details) > 5 else None)
+
+    # Method for getting the receipt as a list in the same layout as "customer_receipts.json", where the amount hired is a string.
+    def to_list(self):
+        if self.hire_date is None:
+            return [self.receipt_number, self.first_name, self.last_name, self.item_hired, str(self.amount_hired)]
+        return [self.receipt_number, self.first_name, self.last_name, self.item_hired, str(self.amount_hired), self.hire_date]
+
+    # Method for getting the key used to find receipts with the same customer full name and item, ignoring letter case.
+    def duplicate_key(self):
+        return duplicate_key(self.first_name, self.last_name, self.item_hired)
+
+
+# Class for an invalid entry found when validating, with the short label shown next to the entry box and the full message.
+class FieldError:
+    def __init__(self, field, label, message, clear_entry):
+        self.field = field              # Name of the invalid field ("first_name", "last_name", "item_hired", "amount_hired", "hire_date" or "receipt_number").
+        self.label = label              # Short label, e.g. "Required" or "Invalid Entry".
+        self.message = message          # Full message explaining the problem.
+        self.clear_entry = clear_entry  # Whether the invalid entry should be cleared from its entry box.
+
+
+# Class for the result of submitting a receipt.
+# "status" is "added", "updated", "duplicate" (a matching receipt exists and wasn't updated), "invalid" (including not enough stock), "full"
+# or "not_found" (when updating a receipt by its receipt number).
+class SubmitResult:
+    def __init__(self, status, receipt=None, errors=None):
+        self.status = status
+        self.receipt = receipt          # The added or updated receipt, or the existing matching receipt for "duplicate".
+        self.errors = errors or []      # List of FieldErrors for "invalid".
+
+
+# Class for the result of deleting a receipt.
+# "status" is "deleted", "not_found" or "invalid".
+class DeleteResult:
+    def __init__(self, status, receipt=None, error=None):
+        self.status = status
+        self.receipt = receipt          # The deleted receipt.
+        self.error = error              # FieldError for "invalid".
+
+
+# Class for the result of importing a list of receipts, counting what happened to the rows and keeping the errors for each invalid row.
+class ImportResult:
+    def __init__(self):
+        self.added = 0          # Number of rows added as new receipts.
+        self.updated = 0        # Number of rows that updated the amount on an existing receipt.
+        self.skipped = 0        # Number of rows left out because the customer already has a receipt for the item.
+        self.errors = []        # List of (row number, list of FieldErrors) for the rows that couldn't be imported.
+        self.full = False       # Whether the import stopped early because there were no receipt numbers left.
+
+    # Method for counting the result of submitting a row.
+    def count(self, row_number, submit_result):
+        if submit_result.status == "added":
+            self.added += 1
+        elif submit_result.status == "updated":
+            self.updated += 1
+        elif submit_result.status == "duplicate":
+            self.skipped += 1
+        elif submit_result.status == "invalid":
+            self.errors.append((row_number, submit_result.errors))
+        else:
+            self.full = True
+
+
+# Function for converting an amount hired (a string or integer) to an integer, using the shared integer objects for valid amounts.
+def amount_value(amount):
+    amount = int(amount)
+    if 0 <= amount <= MAX_AMOUNT_HIRED:
+        return AMOUNT_VALUES[amount]
+    return amount
+
+
+# Function for getting the key used to find receipts with the same customer full name and item, ignoring letter case.
+def duplicate_key(first_name, last_name, item_hired):
+    return (first_name.casefold(), last_name.casefold(), item_hired)
+
+
+# Function for joining groups of receipts (as {receipt number: receipt}) into one, where a receipt may be in more than one group.
+def join_groups(groups):
+    if len(groups) <= 1:
+        return groups[0] if groups else {}  # Nothing to join, so don't copy the group.
+    largest = max(groups, key=len)
+    joined = largest.copy()  # Copying a whole dictionary is much quicker than adding its receipts one at a time.
+    for receipts in groups:
+        if receipts is not largest:
+            joined.update(receipts)
+    return joined
+
+
+# Function for capitalising the first letter of every word in a name, with a single space between the words.
+def format_name(name):
+    return " ".join(word.capitalize() for word in name.strip().split())
+
+
+# Function for removing any leading, in-between and trailing spaces from an amount hired.
+def format_amount(amount):
+    return amount.strip().replace(" ", "")
+
+
+# Function for checking a first or last name, returning a FieldError or None if it is valid.
+def validate_name(name, field, field_name):
+    stripped_name = name.strip().replace(" ", "")
+
+    # Check if the name is blank.
+    if name.strip() == "":
+        return FieldError(field, "Required", f"{field_name} is required and cannot be left blank.", False)
+
+    # Check if the name is above 50 characters long.
+    elif len(stripped_name) > MAX_NAME_LENGTH:
+        return FieldError(field, "Invalid Entry", f"{field_name} cannot be longer than {MAX_NAME_LENGTH} characters.", True)
+
+    # Check if the name only contains digits.
+    elif stripped_name.isdigit():
+        return FieldError(field, "Invalid Entry", f"{field_name} cannot only contain numbers.\n     - Please include at least one letter.", True)
+
+    # Check if the name contains a combination of letters and numbers, as well as at least one letter.
+    elif not (stripped_name.isalnum() and any(char.isalpha() for char in name)):
+        return FieldError(field, "Invalid Entry", f"{field_name} can only include letters or letters with numbers.\n     - No symbols or non-alphanumeric characters.", True)
+    return None
+
+
+# Function for checking the item hired, returning a FieldError or None if it is valid.
+def validate_item(item_hired):
+    # Check if the item hired is blank.
+    if len(item_hired) == 0:
+        return FieldError("item_hired", "Required", "Item Hired is required and cannot be left blank.", False)
+
+    # Check if the item is one of the items available for hire.
+    elif item_hired not in ITEM_LIST:
+        return FieldError("item_hired", "Invalid Entry", "Item Hired must be one of the items available for hire.", True)
+    return None
+
+
+# Function for checking the amount hired, returning a FieldError or None if it is valid.
+def validate_amount(amount_hired):
+    stripped_amount = format_amount(amount_hired)
+
+    # Check if the amount hired is blank.
+    if amount_hired.strip() == "":
+        return FieldError("amount_hired", "Required", "Amount Hired is required and cannot be left blank.", False)
+
+    # Check if the amount hired contains any alphabetic characters.
+    elif any(char.isalpha() for char in stripped_amount):
+        return FieldError("amount_hired", "Invalid Entry", "Amount Hired must only include numbers, no letters.", True)
+
+    # Check if the amount hired is a negative number (starting with a minus sign) and has at least one numeric value after it.
+    elif stripped_amount.startswith("-") and any(char.isnumeric() for char in amount_hired):
+        return FieldError("amount_hired", "Between 1-500", f"Amount Hired must be a positive number between 1 and {MAX_AMOUNT_HIRED}.", True)
+
+    # Check if the amount hired only contains digits and if so, whether the value is below/equal to zero or above 500.
+    # "isdecimal()" is used rather than "isdigit()", which is also true for characters that "int()" can't convert (e.g. "²").
+    elif stripped_amount.isdecimal():
+        if int(stripped_amount) <= 0 or int(stripped_amount) > MAX_AMOUNT_HIRED:
+            return FieldError("amount_hired", "Between 1-500", f"Amount Hired must be between 1 and {MAX_AMOUNT_HIRED}.", True)
+        return None
+
+    try:
+        # Check if the amount hired is a decimal number.
+        amount_float = float(stripped_amount)
+        amount_int = int(amount_float)
+
+        # Check if the float and integer are not equal, meaning the entry would be a decimal. Otherwise check if ".0" is in the entry, also suggesting a decimal.
+        if amount_float != amount_int or ".0" in amount_hired and amount_float == amount_int:
+            return FieldError("amount_hired", "Invalid Entry", f"Amount Hired cannot be a decimal.\n     - Must be an integer between 1 and {MAX_AMOUNT_HIRED}.", True)
+    except ValueError:
+        pass
+
+    # The amount hired doesn't only consist of digits.
+    return FieldError("amount_hired", "Invalid Entry", "Amount Hired must only include numbers.\n     - Cannot include symbols or non-numeric characters.", True)
+
+
+# Function for checking all the customer details, returning a list of FieldErrors (empty if they are all valid).
+# The hire date is only checked if one is given, as receipts typed into the window are dated when they are added.
+def validate_receipt_details(first_name, last_name, item_hired, amount_hired, hire_date=None):
+    errors = [validate_name(first_name, "first_name", "First Name"),
+              validate_name(last_name, "last_name", "Last Name"),
+              validate_item(item_hired),
+              validate_amount(amount_hired),
+              validate_hire_date(hire_date) if hire_date is not None else None]
+    return [error for error in errors if error is not None]
+
+
+# Function for checking a hire date (e.g. from an imported file), returning a FieldError or None if it is a valid "YYYY-MM-DD" date.
+def validate_hire_date(hire_date):
+    try:
+        if len(hire_date) == 10 and datetime.date.fromisoformat(hire_date):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return FieldError("hire_date", "Invalid Entry", "Hire Date must be a date written as YYYY-MM-DD.", True)
+
+
+# Function for checking a receipt number typed in for deletion, returning a FieldError or None if it is valid.
+def validate_receipt_number(receipt_number, receipt_digits=MIN_RECEIPT_DIGITS):
+    stripped_number = receipt_number.strip().replace(" ", "")
+
+    # Check if the receipt number is blank.
+    if receipt_number.strip() == "":
+        return FieldError("receipt_number", "Required", "Receipt Number is required and cannot be left blank.", True)
+
+    # Check if the receipt number contains any alphabetic characters and doesn't only consist of digits.
+    elif any(char.isalpha() for char in stripped_number) and not stripped_number.isdecimal():
+        return FieldError("receipt_number", "Invalid Entry", "Receipt Number must only include numbers.\nPlease don't use letters or symbols/non-numeric characters.", True)
+
+    # Check if the receipt number is a negative number (starting with a minus sign) and has at least one numeric value after it.
+    elif stripped_number.startswith("-") and any(char.isnumeric() for char in receipt_number):
+        return FieldError("receipt_number", "Invalid Entry", "Receipt Number can only be a positive number.", True)
+
+    # Check if the receipt number only contains digits and if so, whether the total number of digits is outside of 4 and the configured receipt number width.
+    # "isdecimal()" is used rather than "isdigit()", which is also true for characters that "int()" can't convert (e.g. "²").
+    elif stripped_number.isdecimal():
+        if not MIN_RECEIPT_DIGITS <= len(stripped_number) <= max(MIN_RECEIPT_DIGITS, receipt_digits):  # Receipts issued before the width was increased keep their 4-digit numbers.
+            if receipt_digits <= MIN_RECEIPT_DIGITS:
+                return FieldError("receipt_number", "Invalid Entry", "Receipt Number must only be 4 digits long.", True)
+            return FieldError("receipt_number", "Invalid Entry", f"Receipt Number must be between 4 and {receipt_digits} digits long.", True)
+        return None
+
+    try:
+        # Check if the receipt number is a decimal number.
+        receipt_num_float = float(stripped_number)
+        receipt_num_int = int(receipt_num_float)
+
+        # Check if the float and integer are not equal, meaning the input would be a decimal. Otherwise check if ".0" is in the entry, also suggesting a decimal.
+        if receipt_num_float != receipt_num_int or ".0" in receipt_number and receipt_num_float == receipt_num_int:
+            return FieldError("receipt_number", "Invalid Entry", "Receipt Number cannot be a decimal and must\nbe an existing receipt number/integer.", True)
+    except ValueError:
+        pass
+
+    # The receipt number doesn't only consist of digits.
+    return FieldError("receipt_number", "Invalid Entry", "Receipt Number must only include numbers.\nPlease don't use symbols/non-numeric characters.", True)
+
+
+# Class for the pool of unused receipt numbers, which hands out each number once in a shuffled order and reuses returned numbers.
+# Programs sharing the pool file (e.g. several counters) reserve blocks of the shuffled order from it while holding its lock file,
+# and take the returned numbers from it when they load it, so no two programs ever issue the same receipt number.
+# Once every number has been issued, the shuffled order is gone round again in the same reserved blocks, issuing the numbers that have been freed since.
+class ReceiptPool:
+    block_size = 64  # Number of positions in the shuffled order reserved from the pool file at a time.
+
+    def __init__(self, digits=MIN_RECEIPT_DIGITS, seed=None, cursor=0, returned=None, path=None):
+        self.digits = digits                                                    # Number of digits in each receipt number.
+        self.seed = random.getrandbits(32) if seed is None else seed            # Seed that decides the shuffled order the numbers are issued in.
+        self.cursor = cursor                                                    # How many positions of the shuffled order have been used, counting each time round it.
+        self.returned = returned if returned is not None else []                # Numbers that were freed (e.g. by deleting a receipt) and can be issued again.
+        self.path = path                                                        # Pool file shared with other programs, or None if the pool isn't shared.
+        self.start = 10 ** (digits - 1)                                         # The first receipt number with the configured width, e.g. 1000.
+        self.size = 9 * self.start                                              # Number of receipt numbers with the configured width, e.g. 9000 for 1000 to 9999.
+        self.half_bits = ((self.size - 1).bit_length() + 1) // 2               # Number of bits in each half of a position when it is shuffled.
+        self.round_keys = random.Random(self.seed).getrandbits(32).to_bytes(4, "big")  # Four round keys taken from the seed.
+        self.block_end = cursor                                                 # End of the block of the shuffled order reserved by this program (if the pool is shared).
+
+    # Method for loading the pool from its file, or starting a new pool if there isn't one for the configured width.
+    # The returned numbers are taken out of the file, so that another program loading the pool doesn't issue them as well.
+    @classmethod
+    def load(cls, path, digits):
+        try:
+            with shared_file_lock(path + ".lock"):
+                saved_pool = cls.read_file(path)
+                if saved_pool is not None and saved_pool["digits"] == digits:
+                    pool = cls(digits, saved_pool["seed"], saved_pool["cursor"], saved_pool["returned"], path)
+                    if pool.going_round_again():
+                        pool.returned = []  # The freed numbers are issued by going round the shuffled order again instead.
+                else:
+                    pool = cls(digits, path=path)  # Start a new pool if the file is missing or damaged, numbers that are already in use are skipped when issued.
+                write_json_atomically(path, {"digits": digits, "seed": pool.seed, "cursor": pool.cursor, "returned": []}, keep_backup=False)
+            return pool
+        except IOError:
+            return cls(digits)  # The pool can't be shared, so only this program uses it.
+
+    # Method for reading the saved pool from its file, or None if the file is missing or damaged.
+    @staticmethod
+    def read_file(path):
+        try:
+            with open(path, "r") as file:
+                saved_pool = json.load(file)
+        except (IOError, json.JSONDecodeError):
+            return None
+        if not isinstance(saved_pool, dict) or not all(key in saved_pool for key in ("digits", "seed", "cursor", "returned")):
+            return None  # Part of the pool is missing.
+        return saved_pool
+
+    # Method for reserving the next block of the shuffled order from the pool file, which the other programs sharing it then skip past.
+    # A larger block can be reserved when many receipts are about to be added at once (e.g. by an import), so the pool file is only written once.
+    def reserve(self, count=0):
+        try:
+            with shared_file_lock(self.path + ".lock"):  # Only reading and writing the small pool file, so the lock is held for a moment.
+                saved_pool = self.read_file(self.path)
+                if saved_pool is not None and saved_pool["digits"] == self.digits:
+                    if saved_pool["seed"] != self.seed:
+                        # Another program started a new pool (e.g. the file was damaged), so carry on from its shuffled order instead.
+                        self.__init__(self.digits, saved_pool["seed"], saved_pool["cursor"], self.returned, self.path)
+                    self.cursor = max(self.cursor, saved_pool["cursor"])
+                    returned = saved_pool["returned"]
+                else:
+                    returned = []
+                self.block_end = self.cursor + max(self.block_size, count)
+                if self.block_end > self.size:
+                    # Going round the shuffled order again issues every freed number, so stop the returned numbers from also being issued.
+                    returned = self.returned = []
+                write_json_atomically(self.path, {"digits": self.digits, "seed": self.seed, "cursor": self.block_end, "returned": returned}, keep_backup=False)
+        except IOError:
+            self.block_end = self.cursor + max(self.block_size, count)  # Carry on without sharing, numbers already in use are still skipped.
+
+    # Method for making sure at least "count" numbers are reserved before they are issued, reserving them in one block if they aren't.
+    def reserve_ahead(self, count):
+        if self.path is not None and self.block_end - self.cursor < count - len(self.returned):
+            self.reserve(count)
+
+    # Method for saving the pool next to the receipts, adding this program's returned numbers to any that other programs have saved.
+    def save(self, path):
+        try:
+            with shared_file_lock(path + ".lock"):
+                saved_pool = self.read_file(path)
+                cursor, returned = self.cursor, self.returned
+                if saved_pool is not None and saved_pool["digits"] == self.digits and saved_pool["seed"] == self.seed:
+                    cursor = max(cursor, saved_pool["cursor"])  # Never go back over numbers another program has reserved.
+                    returned = saved_pool["returned"] + returned
+                if cursor >= self.size:
+                    returned = []  # The freed numbers are issued by going round the shuffled order again instead.
+                write_json_atomically(path, {"digits": self.digits, "seed": self.seed, "cursor": cursor, "returned": returned}, keep_backup=False)
+        except IOError:
+            pass  # The pool can always be rebuilt, as issued numbers are checked against the receipts in use.
+
+    # Method for getting the position in the shuffled order for the given issue count, using a seeded Feistel permutation.
+    # The order is worked out on demand, so even an 8-digit pool doesn't need a list of every number kept in memory.
+    def shuffle_position(self, position):
+        half_mask = (1 << self.half_bits) - 1
+
+        # Mix the halves together over four rounds, repeating if the result lands outside of the pool (which stays a one-to-one shuffle).
+        while True:
+            left, right = position >> self.half_bits, position & half_mask
+            for round_key in self.round_keys:
+                left, right = right, left ^ (((right + round_key) * 0x9E3779B1 >> 7) & half_mask)
+            position = (left << self.half_bits) | right
+            if position < self.size:
+                return position
+
+    # Method for issuing the next unused receipt number, or None if all of them are in use.
+    def issue(self, in_use):
+        # Reuse a returned receipt number first, picking one at random by swapping it with the last number so it can be removed in one step.
+        while self.returned:
+            i = random.randrange(len(self.returned))
+            self.returned[i], self.returned[-1] = self.returned[-1], self.returned[i]
+            receipt_number = self.returned.pop()
+            if receipt_number not in in_use:
+                return receipt_number
+
+        # Otherwise take the next receipt number in the shuffled order, going round it again once every number has been issued.
+        # Going all the way round without finding a number that isn't in use means every number is in use.
+        if self.going_round_again() and len(in_use) >= self.size:
+            return None  # Every number is in use, so don't go round looking for one.
+        for i in range(self.size):
+            if self.path is not None and self.cursor >= self.block_end:
+                self.reserve()  # Reserve the next block of numbers from the pool file shared with other programs.
+            receipt_number = self.start + self.shuffle_position(self.cursor % self.size)
+            self.cursor += 1
+            if receipt_number not in in_use:  # Skip numbers that are already in use, e.g. receipts from before the pool was created.
+                return receipt_number
+        return None
+
+    # Method for checking whether every number has been issued once, so the shuffled order is being gone round again for the freed numbers.
+    def going_round_again(self):
+        return self.cursor >= self.size
+
+    # Method for returning a receipt number to the pool so that it can be issued again.
+    def give_back(self, receipt_number):
+        if self.going_round_again():
+            return  # The number is issued again when the shuffled order comes round to it.
+        if self.start <= receipt_number < self.start + self.size:  # Only numbers with the configured width belong to the pool.
+            self.returned.append(receipt_number)
+
+
+# Class for the indexes used to search the receipts as the user types, which are updated as each receipt is added, changed or removed rather than rebuilt.
+# Each word typed is matched against the start of the customers' first and last names and the words of the item names (ignoring letter case),
+# or against a whole receipt number, and only receipts matching every word are found.
+class SearchIndex:
+    def __init__(self):
+        self.by_name = {}           # Dictionary mapping each first or last name (casefolded) to its receipts, as {receipt number: receipt} from oldest to newest.
+        self.by_item = {}           # Dictionary mapping each item to its receipts, as {receipt number: receipt} from oldest to newest.
+        self.names = []             # Sorted list of the names in "by_name", searched with bisect to find the names starting with a typed word.
+        self.names_sorted = True    # Whether "names" is up to date. It is left out of date while a store is loading and sorted once on the next search.
+
+    # Method for adding a receipt to the indexes.
+    def add(self, receipt):
+        for name in (receipt.first_name, receipt.last_name):
+            key = name.casefold()
+            receipts = self.by_name.get(key)
+            if receipts is None:
+                receipts = self.by_name[key] = {}
+                if self.names_sorted:
+                    bisect.insort(self.names, key)  # Only new names are added to the sorted list, which is far shorter than the list of receipts.
+            receipts[receipt.receipt_number] = receipt
+        self.by_item.setdefault(receipt.item_hired, {})[receipt.receipt_number] = receipt
+
+    # Method for removing a receipt from the indexes, using the name and item it was added with.
+    def remove(self, receipt):
+        for name in (receipt.first_name, receipt.last_name):
+            key = name.casefold()
+            receipts = self.by_name.get(key)
+            if receipts is None or receipts.pop(receipt.receipt_number, None) is None or receipts:
+                continue  # The name was already removed (e.g. the first and last names are the same), or other receipts still have it.
+            del self.by_name[key]
+            if self.names_sorted:
+                del self.names[bisect.bisect_left(self.names, key)]
+        receipts = self.by_item.get(receipt.item_hired)
+        if receipts is not None:
+            receipts.pop(receipt.receipt_number, None)
+            if not receipts:
+                del self.by_item[receipt.item_hired]
+
+    # Method for sorting the list of names after a store has been loaded.
+    def sort_names(self):
+        if not self.names_sorted:
+            self.names = sorted(self.by_name)
+            self.names_sorted = True
+
+    # Method for getting every name in the index that starts with the given (casefolded) word.
+    def names_starting_with(self, word):
+        self.sort_names()
+        start = bisect.bisect_left(self.names, word)
+        end = bisect.bisect_left(self.names, word + "\U0010ffff")  # Every name starting with the word sorts before the word followed by the highest character.
+        return self.names[start:end]
+
+    # Method for getting the groups of receipts (as {receipt number: receipt}) matching a (casefolded) word, from the indexes.
+    def word_groups(self, word, by_number):
+        groups = []
+        if word.isdecimal() and int(word) in by_number:  # "isdecimal()" rather than "isdigit()", which is also true for characters "int()" rejects (e.g. "²").
+            groups.append({int(word): by_number[int(word)]})
+        groups.extend(self.by_name[name] for name in self.names_starting_with(word))
+        groups.extend(receipts for item, receipts in self.by_item.items() if any(item_word.startswith(word) for item_word in item.casefold().split()))
+        return groups
+
+    # Method for finding the receipts matching every word of the search text, given the store's receipt number index.
+    # The receipts are collected for the word that is quickest to collect (e.g. a word matching a single name), then narrowed down
+    # by the groups matching each other word, so adding another word to the search never means collecting more receipts. Returns the matching receipts grouped by the name
+    # or item they matched (in alphabetical order) and from oldest to newest within each group.
+    def search(self, text, by_number):
+        word_groups = [self.word_groups(word, by_number) for word in text.casefold().split()]
+        if not word_groups:
+            return []
+        word_groups.sort(key=lambda groups: 0 if len(groups) == 1 else sum(len(receipts) for receipts in groups))  # A single group doesn't need collecting at all.
+        matches = join_groups(word_groups[0])
+        for groups in word_groups[1:]:
+            if len(groups) <= 8:
+                found = set()
+                for receipts in groups:
+                    found.update(receipts.keys() & matches.keys())  # Each intersection only looks through the smaller of the two groups.
+            else:
+                found = matches.keys() & itertools.chain.from_iterable(groups)  # Many small groups (e.g. every last name starting with "Smi") are checked in one go.
+            matches = {receipt_number: receipt for receipt_number, receipt in matches.items() if receipt_number in found}
+        return list(matches.values())
+
+
+# Class for the receipts sorted by each column of the receipt table, which is sorted the first time the column is sorted by
+# and then kept in order as receipts are added, changed or removed, by inserting or removing each receipt at its place found with bisect.
+class SortIndex:
+    def __init__(self):
+        self.orders = {}    # Dictionary mapping each column (a key of "SORT_KEYS") to the list of receipts sorted by it.
+
+    # Method for getting the receipts sorted by a column, sorting the given receipts if the column hasn't been sorted by before.
+    def order(self, column, receipts):
+        order = self.orders.get(column)
+        if order is None:
+            order = self.orders[column] = sorted(receipts, key=SORT_KEYS[column])
+        return order
+
+    # Method for inserting a receipt into each sorted list at its place.
+    def add(self, receipt):
+        for column, order in self.orders.items():
+            bisect.insort(order, receipt, key=SORT_KEYS[column])
+
+    # Method for removing a receipt from each sorted list, using the details it was sorted with.
+    def remove(self, receipt):
+        for column, order in self.orders.items():
+            sort_key = SORT_KEYS[column]
+            del order[bisect.bisect_left(order, sort_key(receipt), key=sort_key)]
+
+
+# Class for the stock of each item, with a running total of how many of each item are out on hire.
+# The totals are updated as each receipt is added, changed or removed, so checking what is available never looks through the receipts.
+class Inventory:
+    def __init__(self, stock_levels=None):
+        self.stock_levels = dict(DEFAULT_STOCK_LEVELS if stock_levels is None else stock_levels)  # Dictionary mapping each item to the number the store owns.
+        self.on_hire = {}   # Dictionary mapping each item to the total amount of it on the receipts.
+
+    # Method for loading the stock levels from their file, creating the file with the default levels if it doesn't exist yet so it can be edited.
+    # The default levels are used (without replacing the file) if the file is damaged.
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, "r") as file:
+                stock_levels = json.load(file)
+        except FileNotFoundError:
+            inventory = cls()
+            try:
+                write_json_atomically(path, inventory.stock_levels, keep_backup=False)
+            except IOError:
+                pass  # The default levels are still used, they just can't be edited.
+            return inventory
+        except (IOError, json.JSONDecodeError):
+            return cls()
+        if not isinstance(stock_levels, dict) or not all(isinstance(level, int) and level >= 0 for level in stock_levels.values()):
+            return cls()  # A stock level isn't a whole number.
+        return cls(stock_levels)
+
+    # Method for adding a receipt's amount to the total on hire for its item.
+    def add(self, receipt):
+        self.on_hire[receipt.item_hired] = self.on_hire.get(receipt.item_hired, 0) + receipt.amount_hired
+
+    # Method for taking a receipt's amount off the total on hire for its item.
+    def remove(self, receipt):
+        self.on_hire[receipt.item_hired] -= receipt.amount_hired
+
+    # Method for getting how many of an item are left to hire (which is negative if more are on hire than the stock level),
+    # or None if the item doesn't have a stock level.
+    def available(self, item_hired):
+        stock_level = self.stock_levels.get(item_hired)
+        if stock_level is None:
+            return None
+        return stock_level - self.on_hire.get(item_hired, 0)
+
+
+# Class for the hire statistics, with rollups of the number of receipts and the total amount hired for each item, customer and day.
+# The rollups are updated as each receipt is added, changed or removed, so showing the statistics never looks through the receipts.
+# The customers are also kept sorted by their total amount hired (found with bisect as each total changes), so the biggest customers can be read off the front.
+class HireStatistics:
+    def __init__(self):
+        self.by_item = {}           # Dictionary mapping each item to [number of receipts, total amount hired].
+        self.by_customer = {}       # Dictionary mapping each customer's (casefolded) full name to [number of receipts, total amount hired, first name, last name].
+        self.by_day = {}            # Dictionary mapping each hire date (None for receipts without a date) to [number of receipts, total amount hired].
+        self.ranking = []           # Sorted list of (-total amount hired, customer) so that the biggest customers come first.
+        self.ranking_sorted = True  # Whether "ranking" is up to date. It is left out of date while a store is loading and sorted once at the end.
+
+    # Method for adding a receipt to the rollups.
+    def add(self, receipt):
+        self.change(receipt, 1)
+
+    # Method for taking a receipt off the rollups, using its current details.
+    def remove(self, receipt):
+        self.change(receipt, -1)
+
+    # Method for adding (sign 1) or taking off (sign -1) a receipt's amount from the totals for its item, day and customer.
+    def change(self, receipt, sign):
+        amount = sign * receipt.amount_hired
+        for totals, key in ((self.by_item, receipt.item_hired), (self.by_day, receipt.hire_date)):
+            total = totals.get(key)
+            if total is None:
+                total = totals[key] = [0, 0]
+            total[0] += sign
+            total[1] += amount
+            if total[0] == 0:
+                del totals[key]  # Remove the item or day once it has no receipts left.
+
+        key = (receipt.first_name.casefold(), receipt.last_name.casefold())
+        customer = self.by_customer.get(key)
+        if customer is None:
+            customer = self.by_customer[key] = [0, 0, receipt.first_name, receipt.last_name]
+        elif self.ranking_sorted:
+            del self.ranking[bisect.bisect_left(self.ranking, (-customer[1], key))]  # Take the customer out of the ranking at their old total.
+        customer[0] += sign
+        customer[1] += amount
+        if customer[0] == 0:
+            del self.by_customer[key]
+        elif self.ranking_sorted:
+            bisect.insort(self.ranking, (-customer[1], key))
+
+    # Method for sorting the customers by their total amount hired after a store has been loaded.
+    def rank_customers(self):
+        if not self.ranking_sorted:
+            self.ranking = sorted((-customer[1], key) for key, customer in self.by_customer.items())
+            self.ranking_sorted = True
+
+    # Method for getting the customers with the biggest total amounts hired, as (first name, last name, number of receipts, total amount hired).
+    def top_customers(self, count):
+        self.rank_customers()
+        top_customers = []
+        for negative_amount, key in self.ranking[:count]:
+            receipt_count, amount, first_name, last_name = self.by_customer[key]
+            top_customers.append((first_name, last_name, receipt_count, amount))
+        return top_customers
+
+    # Method for getting each item's totals as (item, number of receipts, total amount hired), in the order of "ITEM_LIST".
+    def item_totals(self):
+        items = ITEM_LIST + [item for item in self.by_item if item not in ITEM_NAMES]  # Also include any items that aren't in the list, e.g. from an older version.
+        return [(item, *self.by_item.get(item, (0, 0))) for item in items]
+
+    # Method for getting each day's totals as (hire date, number of receipts, total amount hired), newest first, with receipts without a date last.
+    def day_totals(self):
+        days = sorted((day for day in self.by_day if day is not None), reverse=True)
+        if None in self.by_day:
+            days.append(None)
+        return [(day, *self.by_day[day]) for day in days]
+
+
+# Class for the store of receipts, which keeps them in order with indexes for finding them quickly, and saves each change through a storage backend.
+class ReceiptStore:
+    def __init__(self, storage, pool_path="customer_receipts.pool.json", receipt_digits=MIN_RECEIPT_DIGITS, stock_path="stock_levels.json"):
+        self.storage = storage                  # Storage backend (see "receipt_storage.py").
+        self.pool_path = pool_path              # File that the receipt number pool is saved to.
+        self.stock_path = stock_path            # File that the stock level of each item is read from.
+        self.receipt_digits = receipt_digits    # Number of digits in each new receipt number.
+        self.receipts = []                      # List of receipts, in the order they were added.
+        self.by_number = {}                     # Dictionary mapping each receipt number to its receipt.
+        self.by_duplicate_key = {}              # Dictionary mapping each (first name, last name, item) to its receipts from oldest to newest.
+        self.search_index = SearchIndex()       # Indexes on the names, items and receipt numbers for searching the receipts as the user types.
+        self.sort_index = SortIndex()           # Receipts sorted by each column of the receipt table that has been sorted by.
+        self.positions = None                   # Dictionary mapping each receipt to its position in the list, built when first needed.
+        self.inventory = None                   # Stock levels and the totals on hire for each item, loaded along with the receipts.
+        self.statistics = HireStatistics()      # Totals for each item, customer and day, for the statistics window.
+        self.pool = None                        # Pool of unused receipt numbers, loaded along with the receipts.
+        self.generation = 0                     # Number that goes up every time the receipts change, so the window can tell when its table is out of date.
+        self.batch_changes = None               # Changes held back to be saved together by "commit_batch()", or None if each change is saved straight away.
+        self.closed = False                     # Whether the store has been closed, so that closing it again (e.g. when the program exits) does nothing.
+
+    def __len__(self):
+        return len(self.receipts)
+
+    # Method for loading the receipts from the storage backend, raising StorageCorruptError if they can't be read.
+    def load(self):
+        self.set_receipts(self.storage.load())
+
+    # Method for loading the receipts from the storage backend's backup, raising StorageCorruptError if there is no usable backup.
+    def load_backup(self):
+        self.set_receipts(self.storage.load_backup())
+
+    # Method for replacing the stored receipts with an empty list, optionally keeping the journal so its receipts are recovered.
+    def reset(self, keep_journal=False):
+        self.storage.reset(keep_journal)
+        self.set_receipts([])
+
+    # Method for replacing the receipts with the given stored lists and rebuilding the indexes.
+    def set_receipts(self, receipt_lists):
+        receipts = []
+        by_number = {}
+        by_duplicate_key = {}
+        search_index = SearchIndex()
+        search_index.names_sorted = False  # Sort the names once on the first search, rather than inserting each new name in order.
+        if self.inventory is None:
+            self.inventory = Inventory.load(self.stock_path)
+        inventory = Inventory(self.inventory.stock_levels)  # Count the totals on hire again from the new receipts.
+        statistics = HireStatistics()
+        statistics.ranking_sorted = False  # Rank the customers once at the end, rather than moving them up the ranking with each receipt.
+        try:
+            for details in receipt_lists:
+                receipt = Receipt.from_list(details)
+                receipts.append(receipt)
+                by_number[receipt.receipt_number] = receipt
+                by_duplicate_key.setdefault(receipt.duplicate_key(), []).append(receipt)
+                search_index.add(receipt)
+                inventory.add(receipt)
+                statistics.add(receipt)
+        except (IndexError, TypeError, KeyError, AttributeError, ValueError) as error:
+            raise StorageCorruptError(f"Invalid receipt data: {error}")  # A receipt in the file doesn't have the expected layout.
+        self.receipts = receipts
+        self.by_number = by_number
+        self.by_duplicate_key = by_duplicate_key
+        search_index.sort_names()
+        self.search_index = search_index
+        self.sort_index = SortIndex()  # Each column is sorted again the next time it is sorted by.
+        self.positions = None
+        self.inventory = inventory
+        statistics.rank_customers()
+        self.statistics = statistics
+        self.generation += 1
+        if self.pool is None or self.pool.digits != self.receipt_digits:
+            self.pool = ReceiptPool.load(self.pool_path, self.receipt_digits)
+
+    # Method for getting a receipt by its receipt number, or None if it doesn't exist.
+    def get(self, receipt_number):
+        return self.by_number.get(receipt_number)
+
+    # Method for getting the newest receipt with the same customer full name and item, or None if there isn't one.
+    def newest_duplicate(self, first_name, last_name, item_hired):
+        matching_receipts = self.by_duplicate_key.get(duplicate_key(first_name, last_name, item_hired))
+        return matching_receipts[-1] if matching_receipts else None
+
+    # Method for finding the receipts matching every word of the search text (see "SearchIndex.search()").
+    def search(self, text):
+        return self.search_index.search(text, self.by_number)
+
+    # Method for getting how many of an item are left to hire, or None if the item doesn't have a stock level.
+    def available(self, item_hired):
+        return self.inventory.available(item_hired)
+
+    # Method for getting the position of a receipt in the list, e.g. to show its entry number next to a search result.
+    # The positions are kept in a dictionary that is added to as receipts are added, and only built again after receipts are removed.
+    def position(self, receipt):
+        if self.positions is None:
+            self.positions = {receipt: i for i, receipt in enumerate(self.receipts)}
+        return self.positions[receipt]
+
+    # Method for getting a page of receipts sorted by a column ("entry" for the order they were added in), starting at the given position.
+    def sorted_rows(self, column, descending, start, count):
+        order = self.receipts if column == "entry" else self.sort_index.order(column, self.receipts)
+        if not descending:
+            return order[start:start + count]
+        end = len(order) - start
+        return order[max(0, end - count):max(0, end)][::-1]  # Read the page backwards from the end of the list.
+
+    # Method for sorting some of the receipts (e.g. search results) by a column.
+    # A large share of the store is picked out of the column's sorted list instead, which is quicker than sorting them again.
+    def sort_receipts(self, receipts, column, descending):
+        if len(receipts) * 8 < len(self.receipts):
+            return sorted(receipts, key=self.position if column == "entry" else SORT_KEYS[column], reverse=descending)
+        wanted = set(receipts)
+        order = self.receipts if column == "entry" else self.sort_index.order(column, self.receipts)
+        sorted_receipts = [receipt for receipt in order if receipt in wanted]
+        if descending:
+            sorted_receipts.reverse()
+        return sorted_receipts
+
+    # Method for getting the receipts as lists in the same layout as "customer_receipts.json", e.g. for the JSON backend to write a snapshot.
+    def receipt_lists(self):
+        receipts = list(self.receipts)  # Copy the list in one step first, as the JSON backend may call this from its background writer thread.
+        return [receipt.to_list() for receipt in receipts]
+
+    # Method for getting a page of receipts, starting at the given position.
+    def rows(self, start, count):
+        return self.receipts[start:start + count]
+
+    # Method for adding a new receipt with the next unused receipt number, raising StoreFullError if there are none left.
+    # The receipt is dated today unless a hire date ("YYYY-MM-DD") is given.
+    def add(self, first_name, last_name, item_hired, amount_hired, hire_date=None):
+        receipt_number = self.pool.issue(self.by_number)
+        if receipt_number is None:
+            raise StoreFullError("No more unique receipt numbers can be generated.")
+        receipt = Receipt(receipt_number, first_name, last_name, item_hired, amount_hired, hire_date or datetime.date.today().isoformat())
+        self.index_receipt(receipt)
+        self.save("add", receipt)
+        return receipt
+
+    # Method for reserving enough receipt numbers for the given number of new receipts from the shared pool in one go.
+    def reserve_numbers(self, count):
+        self.pool.reserve_ahead(count)
+
+    # Method for changing the amount hired on an existing receipt.
+    def update_amount(self, receipt, amount_hired):
+        self.unindex_details(receipt)  # Take the receipt out of the indexes before its amount changes, then put it back with its new amount.
+        receipt.amount_hired = amount_value(amount_hired)
+        self.index_details(receipt)
+        self.generation += 1
+        self.save("update", receipt)
+
+    # Method for deleting a receipt by its receipt number, returning the deleted receipt, or None if it doesn't exist.
+    def delete(self, receipt_number):
+        receipt = self.by_number.pop(receipt_number, None)
+        if receipt is None:
+            return None
+        position = self.receipts.index(receipt)  # Find where the receipt is in the list so that the entry numbers after it can be updated.
+        del self.receipts[position]
+        self.generation += 1
+        self.unindex_duplicate(receipt)
+        self.unindex_details(receipt)
+        self.positions = None  # The receipts after it have moved up a place.
+        self.pool.give_back(receipt_number)  # Put the deleted receipt number back into the pool so that it can be used again.
+        self.save("delete", receipt)
+        return receipt
+
+    # Method for adding a receipt to the end of the list and to the indexes, as the newest receipt for its name and item.
+    def index_receipt(self, receipt):
+        self.receipts.append(receipt)
+        self.by_number[receipt.receipt_number] = receipt
+        self.by_duplicate_key.setdefault(receipt.duplicate_key(), []).append(receipt)
+        self.index_details(receipt)
+        if self.positions is not None:
+            self.positions[receipt] = len(self.receipts) - 1
+        self.generation += 1
+
+    # Method for adding a receipt to the search and sort indexes, the totals on hire and the hire statistics.
+    def index_details(self, receipt):
+        self.search_index.add(receipt)
+        self.sort_index.add(receipt)
+        self.inventory.add(receipt)
+        self.statistics.add(receipt)
+
+    # Method for removing a receipt from the search and sort indexes, the totals on hire and the hire statistics, using its current details.
+    def unindex_details(self, receipt):
+        self.search_index.remove(receipt)
+        self.sort_index.remove(receipt)
+        self.inventory.remove(receipt)
+        self.statistics.remove(receipt)
+
+    # Method for removing a receipt from the duplicate index, searching from the newest as a customer only has a few receipts for each item.
+    def unindex_duplicate(self, receipt):
+        key = receipt.duplicate_key()
+        matching_receipts = self.by_duplicate_key.get(key, [])
+        for i in reversed(range(len(matching_receipts))):
+            if matching_receipts[i] is receipt:
+                del matching_receipts[i]
+                break
+        if not matching_receipts:
+            self.by_duplicate_key.pop(key, None)  # Remove the key once the customer has no receipts left for the item.
+
+    # Method for emptying the store before its receipts are loaded a chunk at a time with "add_loaded()" and "apply_journal()".
+    def begin_loading(self):
+        self.set_receipts([])
+
+    # Method for adding a chunk of stored receipts onto the end of the store while it is loading.
+    def add_loaded(self, receipt_lists):
+        self.search_index.names_sorted = False  # Sort the names once on the next search rather than inserting each new name in order.
+        self.sort_index = SortIndex()           # Likewise, sort each column again the next time it is sorted by,
+        self.statistics.ranking_sorted = False  # and rank the customers once loading has finished.
+        try:
+            for details in receipt_lists:
+                self.index_receipt(Receipt.from_list(details))
+        except (IndexError, TypeError, KeyError, AttributeError, ValueError) as error:
+            raise StorageCorruptError(f"Invalid receipt data: {error}")
+
+    # Method for applying a list of journal changes (e.g. while the store is loading), where each change sets or removes the receipt with its receipt number.
+    # Returns the receipt numbers that changed, and whether any receipts were added or removed (which moves the receipts after them in the list).
+    def apply_journal(self, changes):
+        changed = set()
+        deleted = False
+        moved = False
+        self.generation += 1
+        try:
+            for operation, details in changes:
+                existing_receipt = self.by_number.get(details[0])
+                changed.add(details[0])
+                if operation == "delete":
+                    if existing_receipt is not None:
+                        del self.by_number[details[0]]
+                        self.unindex_duplicate(existing_receipt)
+                        self.unindex_details(existing_receipt)
+                        deleted = True  # Remove all deleted receipts from the list in one pass at the end.
+                elif existing_receipt is not None:
+                    # Replace the existing receipt's details with its latest version, keeping its place in the list.
+                    updated_receipt = Receipt.from_list(details)
+                    if updated_receipt.duplicate_key() != existing_receipt.duplicate_key():
+                        self.unindex_duplicate(existing_receipt)
+                        self.by_duplicate_key.setdefault(updated_receipt.duplicate_key(), []).append(existing_receipt)
+                    self.unindex_details(existing_receipt)  # Remove the receipt under its old details before they are replaced.
+                    existing_receipt.first_name = updated_receipt.first_name
+                    existing_receipt.last_name = updated_receipt.last_name
+                    existing_receipt.item_hired = updated_receipt.item_hired
+                    existing_receipt.amount_hired = updated_receipt.amount_hired
+                    existing_receipt.hire_date = updated_receipt.hire_date
+                    self.index_details(existing_receipt)
+                else:
+                    self.index_receipt(Receipt.from_list(details))
+                    moved = True
+        except (IndexError, TypeError, KeyError, AttributeError, ValueError) as error:
+            raise StorageCorruptError(f"Invalid receipt data: {error}")
+        if deleted:
+            # Keep only the receipts still in the receipt number index (a deleted receipt number may have been added again as a new receipt).
+            self.receipts = [receipt for receipt in self.receipts if self.by_number.get(receipt.receipt_number) is receipt]
+            self.positions = None
+            moved = True
+        return changed, moved
+
+    # Method for finishing off loading the store a chunk at a time.
+    def finish_loading(self):
+        self.search_index.sort_names()  # Sort the names of the loaded receipts now rather than on the first search.
+        self.statistics.rank_customers()
+        self.storage.finish_load(self.receipt_lists)
+
+    # Method for saving a single change through the storage backend, raising StorageWriteError if it fails.
+    def save(self, operation, receipt):
+        if self.batch_changes is not None:
+            self.batch_changes.append((operation, receipt.to_list()))  # Hold the change until the batch is committed.
+            return
+        try:
+            getattr(self.storage, operation)(receipt.to_list())
+        except Exception as error:
+            raise StorageWriteError(error)
+
+    # Method for holding back the changes made from now on, so that they are saved in a single write by "commit_batch()".
+    def begin_batch(self):
+        self.batch_changes = []
+
+    # Method for saving every change held back since "begin_batch()" in a single write, combining changes to the same receipt.
+    def commit_batch(self):
+        changes, self.batch_changes = self.batch_changes, None
+        if changes:
+            try:
+                self.storage.write_batch(coalesce_changes(changes))
+            except Exception as error:
+                raise StorageWriteError(error)
+
+    # Method for returning (and clearing) an error raised on the storage backend's background thread.
+    def take_error(self):
+        return self.storage.take_error()
+
+    # Method for checking whether another program has changed the stored receipts since they were loaded, which only looks at the files' sizes and modified times.
+    def changed_on_disk(self):
+        return self.storage.changed_externally()
+
+    # Method for bringing the store up to date with the changes another program has made, applying only those changes where the backend can read them.
+    # Returns the receipt numbers that changed and whether any receipts were added or removed, or None if every receipt had to be loaded again.
+    def merge_external_changes(self):
+        changes = self.storage.read_external_changes()
+        if changes is None:
+            self.load()
+            return None
+        if not changes:
+            return set(), False
+        return self.apply_journal(changes)
+
+    # Method for saving the receipt number pool and making sure every change is on the disk.
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.pool is not None:
+            self.pool.save(self.pool_path)
+        self.storage.close()
+
+
+# Class for loading a receipt store on a background thread, so that the window can be used while a large store is read.
+# The background thread only reads and parses the stored receipts. Each chunk is handed to the main thread through a queue,
+# and is added to the store when "poll()" is called (e.g. from a Tk "after()" callback), so the store is only ever changed on the main thread.
+class ReceiptLoader:
+    def __init__(self, store, chunk_size=5000):
+        self.store = store
+        self.chunk_size = chunk_size            # Number of receipts in each chunk.
+        self.chunks = queue.Queue(maxsize=4)    # Chunks waiting to be added to the store, limited so that the reader doesn't get too far ahead.
+        self.thread = None                      # Background thread reading the stored receipts.
+        self.cancelled = False                  # Flag telling the background thread to stop reading.
+        self.progress = 0.0                     # How far through the stored receipts the store has been loaded (0 to 1).
+        self.done = False                       # Whether loading has finished (successfully or not).
+        self.error = None                       # StorageCorruptError (or IOError) raised while loading, if loading failed.
+
+    # Method for emptying the store and starting to read the stored receipts on the background thread.
+    def start(self):
+        self.store.begin_loading()
+        self.thread = threading.Thread(target=self.read_chunks, daemon=True)
+        self.thread.start()
+
+    # Method for reading the stored receipts and queueing each chunk for the main thread (runs on the background thread).
+    def read_chunks(self):
+        try:
+            for operation, receipts, progress in self.store.storage.stream(self.chunk_size):
+                self.chunks.put((operation, receipts, progress))
+                if self.cancelled:
+                    return
+            self.chunks.put(("done", None, 1.0))
+        except (StorageCorruptError, IOError) as error:
+            self.chunks.put(("error", error, self.progress))
+        except Exception as error:
+            # Any other error still has to reach the main thread, otherwise the window would show the receipts as loading forever.
+            self.chunks.put(("error", StorageCorruptError(error), self.progress))
+
+    # Method for adding the queued chunks to the store (runs on the main thread), returning True while there is still more to load.
+    # "timeout" is how long to wait for the next chunk, so callers without an event loop can wait for loading to finish.
+    def poll(self, max_chunks=1, timeout=0):
+        for i in range(max_chunks):
+            try:
+                operation, receipts, progress = self.chunks.get(timeout=timeout) if timeout else self.chunks.get_nowait()
+            except queue.Empty:
+                return True
+
+            try:
+                if operation == "add":
+                    self.store.add_loaded(receipts)
+                elif operation == "journal":
+                    self.store.apply_journal(receipts)
+                elif operation == "done":
+                    self.store.finish_loading()
+                    self.progress = 1.0
+                    self.done = True
+                    return False
+                else:
+                    raise receipts  # The background thread couldn't read the stored receipts.
+            except (StorageCorruptError, IOError) as error:
+                self.error = error
+                self.done = True
+                self.cancel()
+                return False
+            self.progress = progress
+        return True
+
+    # Method for stopping the background thread and waiting for it to finish, e.g. before the stored receipts are loaded another way.
+    def cancel(self):
+        self.cancelled = True
+        # Empty the queue so the background thread isn't left waiting to queue a chunk, then wait for it to stop.
+        while self.thread is not None and self.thread.is_alive():
+            try:
+                self.chunks.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        self.thread = None
+
+
+# Class for the receipt business rules (validation, name formatting and duplicate handling) on top of a ReceiptStore.
+class ReceiptService:
+    def __init__(self, store):
+        self.store = store
+
+    # Method for validating and submitting a receipt.
+    # "on_duplicate" decides what happens when the customer already has a receipt for the item: "ask" returns a "duplicate" result
+    # without changing anything, "update" updates the amount on the newest matching receipt and "add" adds a new receipt anyway.
+    # A new receipt is dated today unless a hire date ("YYYY-MM-DD") is given.
+    def submit(self, first_name, last_name, item_hired, amount_hired, on_duplicate="ask", hire_date=None):
+        errors = validate_receipt_details(first_name, last_name, item_hired, amount_hired, hire_date)
+        if errors:
+            return SubmitResult("invalid", errors=errors)
+
+        formatted_firstname = format_name(first_name)
+        formatted_lastname = format_name(last_name)
+        stripped_amounthired = format_amount(amount_hired)
+
+        existing_receipt = self.store.newest_duplicate(formatted_firstname, formatted_lastname, item_hired)
+        if existing_receipt is not None and on_duplicate != "add":
+            if on_duplicate == "update":
+                stock_error = self.check_stock(item_hired, stripped_amounthired, existing_receipt)
+                if stock_error is not None:
+                    return SubmitResult("invalid", errors=[stock_error])
+                self.store.update_amount(existing_receipt, stripped_amounthired)
+                return SubmitResult("updated", existing_receipt)
+            return SubmitResult("duplicate", existing_receipt)
+
+        stock_error = self.check_stock(item_hired, stripped_amounthired)
+        if stock_error is not None:
+            return SubmitResult("invalid", errors=[stock_error])
+        try:
+            return SubmitResult("added", self.store.add(formatted_firstname, formatted_lastname, item_hired, stripped_amounthired, hire_date))
+        except StoreFullError:
+            return SubmitResult("full")
+
+    # Method for checking that there are enough of an item left in stock to hire the given amount, returning a FieldError if there aren't.
+    # When a receipt is being updated, the amount it already has on hire is counted as available, as it is replaced by the new amount.
+    def check_stock(self, item_hired, amount_hired, existing_receipt=None):
+        available = self.store.available(item_hired)
+        if available is None:
+            return None  # The item doesn't have a stock level.
+        if existing_receipt is not None:
+            available += existing_receipt.amount_hired
+        if int(amount_hired) <= available:
+            return None
+        if available <= 0:
+            return FieldError("amount_hired", "Out of Stock", f"There are no {item_hired} left in stock to hire.", False)
+        return FieldError("amount_hired", "Out of Stock", f"There are only {available} {item_hired} left in stock to hire.", False)
+
+    # Method for importing rows of (row number, [first_name, last_name, item_hired, amount_hired, hire_date]) e.g. read from a file,
+    # where the hire date may be None. Each row is checked and submitted with the same rules as a receipt typed into the window,
+    # with "on_duplicate" deciding what happens to rows matching an existing receipt ("update", "add" or "ask" to skip them).
+    # The rows are read a chunk at a time, reserving receipt numbers for each chunk in one go, and every change is saved in a single write at the end.
+    # If reading the rows fails part of the way through (e.g. the file is damaged), the rows read before that point are still imported and saved.
+    # An ImportResult can be passed in to see how many rows were imported if reading the rows fails part of the way through.
+    def import_receipts(self, rows, on_duplicate="update", chunk_size=1000, result=None):
+        if result is None:
+            result = ImportResult()
+        rows = iter(rows)
+        self.store.begin_batch()
+        try:
+            while not result.full:
+                chunk = []
+                try:
+                    chunk.extend(itertools.islice(rows, chunk_size))
+                finally:
+                    self.import_chunk(chunk, on_duplicate, result)  # Import the rows read so far even if reading the rest of the chunk failed.
+                if len(chunk) < chunk_size:
+                    break
+        finally:
+            self.store.commit_batch()
+        return result
+
+    # Method for submitting a chunk of imported rows, counting each row's result.
+    def import_chunk(self, chunk, on_duplicate, result):
+        self.store.reserve_numbers(len(chunk))
+        for row_number, details in chunk:
+            result.count(row_number, self.submit(*details[:4], on_duplicate=on_duplicate, hire_date=details[4]))
+            if result.full:
+                break  # Keep the receipts added so far.
+
+    # Method for validating a new amount hired and setting it on the receipt with the given receipt number (e.g. from the command line).
+    def update(self, receipt_number, amount_hired):
+        errors = [error for error in (validate_receipt_number(str(receipt_number), self.store.receipt_digits), validate_amount(amount_hired)) if error is not None]
+        if errors:
+            return SubmitResult("invalid", errors=errors)
+        receipt = self.store.get(int(str(receipt_number).strip().replace(" ", "")))
+        if receipt is None:
+            return SubmitResult("not_found")
+
+        stripped_amounthired = format_amount(amount_hired)
+        stock_error = self.check_stock(receipt.item_hired, stripped_amounthired, receipt)
+        if stock_error is not None:
+            return SubmitResult("invalid", errors=[stock_error])
+        self.store.update_amount(receipt, stripped_amounthired)
+        return SubmitResult("updated", receipt)
+
+    # Method for validating a typed receipt number and deleting its receipt.
+    def delete(self, receipt_number):
+        error = validate_receipt_number(str(receipt_number), self.store.receipt_digits)
+        if error is not None:
+            return DeleteResult("invalid", error=error)
+        deleted = self.store.delete(int(str(receipt_number).strip().replace(" ", "")))
+        if deleted is None:
+            return DeleteResult("not_found")
+        return DeleteResult("deleted", deleted)
+
+
+# Function for opening a receipt store from the same files as the window (e.g. for the command line), so changes show up in a window that is open at the same time.
+# If "write_delay" is given, changes are written on a background thread with the changes made within that many seconds written together.
+def open_receipt_store(engine="json", receipt_digits=MIN_RECEIPT_DIGITS, pool_path="customer_receipts.pool.json", stock_path="stock_levels.json", write_delay=None):
+    store = None
+    storage = open_storage(engine, receipts_source=lambda: store.receipt_lists(), write_delay=write_delay)  # The JSON backend copies the current receipts when compacting its journal.
+    store = ReceiptStore(storage, pool_path, receipt_digits, stock_path)
+    try:
+        store.load()
+    except StorageCorruptError:
+        store.load_backup()  # Raises StorageCorruptError again if there's no usable backup, which is left for the window to repair.
+    return store
@@ -0,0 +1,305 @@
+# Date Created: 18/10/2026
+# Author: Jack Compton
+# Purpose: Local HTTP service for Julie's party hire store, so the booking website and the warehouse tablet can add, update, delete, search and
+#          total the customer receipts as JSON. Uses the same receipt logic and files as the window, without importing tkinter.
+# Usage: python receipt_server.py --port 8080
+#        curl -X POST localhost:8080/receipts -d '{"first_name": "Jane", "last_name": "Smith", "item_hired": "Knives", "amount_hired": 3}'
+#
+# Requests:
+#   GET    /receipts?item=Knives&name=Smith&limit=100   List receipts in the order they were added (at most "limit", 100 by default).
+#   POST   /receipts                                    Add a receipt from a JSON object with first_name, last_name, item_hired, amount_hired
+#                                                       and optionally hire_date ("YYYY-MM-DD") and duplicates ("skip", "update" or "add").
+#   GET    /receipts/<receipt number>                   Get a receipt.
+#   PATCH  /receipts/<receipt number>                   Change the amount hired on a receipt from a JSON object with amount_hired.
+#   DELETE /receipts/<receipt number>                   Delete a receipt.
+#   GET    /search?q=jane+smi&limit=100                 Search the receipts as the window's search box does, where each word must match the start of
+#                                                       a first or last name, the start of a word of an item or a whole receipt number.
+#   GET    /stats?top=10&days=7                         Totals hired for each item, the biggest customers and the totals for each day.
+
+import sys
+import json
+import signal
+import traceback
+import asyncio
+import argparse
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+from receipt_core import MIN_RECEIPT_DIGITS, ReceiptService, open_receipt_store
+from receipt_storage import ChangesDroppedError, StorageCorruptError, StorageWriteError
+from receipt_transfer import DUPLICATE_CHOICES, receipt_record
+from receipt_cli import run_operation
+
+SERVER_WRITE_DELAY = 0.25   # Seconds that changes are held on the background writer thread, so that the changes from many requests are saved in one write.
+CHECK_INTERVAL = 0.5        # Seconds between checks for changes made by another program (e.g. the window), as often as the window checks.
+KEEP_ALIVE_TIMEOUT = 15     # Seconds an idle connection is kept open for its next request.
+MAX_HEADERS = 100           # Most header lines accepted in a request.
+MAX_BODY_BYTES = 65536      # Largest request body accepted, which is far more than a single receipt needs.
+DEFAULT_LIMIT = 100         # Most receipts returned by a list or search when the request doesn't give a limit.
+
+# HTTP status code for each result status from the receipt service.
+STATUS_CODES = {"added": 201, "updated": 200, "deleted": 200, "found": 200, "duplicate": 409, "invalid": 422, "not_found": 404, "full": 507}
+
+
+# Class for a request that can't be answered, with the HTTP status code to send back and whether the connection has to be closed.
+class HttpError(Exception):
+    def __init__(self, status, message, close=False):
+        super().__init__(message)
+        self.status = status
+        self.close = close
+
+
+# Class for the HTTP service, which answers each request from the receipt store on the event loop's thread.
+# Every request is answered without giving up the event loop part of the way through, so requests that change the store are naturally
+# run one after another and never see a half-made change. Saving and reading another program's changes are left to background threads,
+# so a slow disk never holds up the requests.
+class ReceiptServer:
+    def __init__(self, service):
+        self.service = service
+        self.store = service.store
+        self.requests = 0                   # Number of requests answered, shown when the server stops.
+        self.not_merging = asyncio.Event()  # Set except while another program's changes are being read, which requests that change the store wait for.
+        self.not_merging.set()
+
+    # Method for serving one connection, answering each request in turn until the client closes it or it has been idle too long.
+    async def handle_connection(self, reader, writer):
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    request = await self.read_request(reader, writer)
+                except HttpError as error:
+                    await self.send_response(writer, error.status, {"status": "error", "errors": [str(error)]}, keep_alive=False)
+                    break
+                if request is None:
+                    break  # The client closed the connection or left it idle.
+                method, target, headers, body, keep_alive = request
+                if method != "GET":
+                    # Wait for another program's changes to be merged in first, so they are applied in the same order as they were saved.
+                    await self.not_merging.wait()
+                status, output = self.answer(method, target, body)
+                await self.send_response(writer, status, output, keep_alive)
+                self.requests += 1
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # The client went away part of the way through a request or response.
+        except asyncio.CancelledError:
+            pass  # The server is stopping, which cancels the connections left open waiting for another request.
+        finally:
+            writer.close()
+
+    # Method for reading a request, returning (method, target, headers, body, keep alive), or None if the connection was closed or left idle.
+    async def read_request(self, reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+        except ValueError:
+            raise HttpError(414, "The request line is too long.", close=True)
+        if not request_line:
+            return None
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/1."):
+            raise HttpError(400, "The request line should look like 'GET /receipts HTTP/1.1'.", close=True)
+        method, target, version = parts
+
+        headers = {}
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                raise HttpError(431, "A request header is too long.", close=True)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise HttpError(431, "The request has too many headers.", close=True)
+            name, separator, value = line.decode("latin-1").partition(":")
+            if not separator:
+                raise HttpError(400, "A request header is missing its ':'.", close=True)
+            headers[name.strip().casefold()] = value.strip()
+
+        # HTTP/1.1 connections are kept open unless the client asks to close them, and HTTP/1.0 connections only if the client asks to keep them.
+        connection = headers.get("connection", "").casefold()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+        if "transfer-encoding" in headers:
+            raise HttpError(411, "Send the request body with a Content-Length header.", close=True)
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise HttpError(400, "The Content-Length header isn't a number.", close=True)
+        if length < 0 or length > MAX_BODY_BYTES:
+            raise HttpError(413, f"The request body can't be more than {MAX_BODY_BYTES} bytes.", close=True)
+        if length and headers.get("expect", "").casefold() == "100-continue":
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")  # Some clients wait for this before sending the body.
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, body, keep_alive
+
+    # Method for sending a JSON response.
+    async def send_response(self, writer, status, output, keep_alive):
+        body = json.dumps(output).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    # Method for answering a request, returning (HTTP status code, output).
+    def answer(self, method, target, body):
+        try:
+            url = urlsplit(target)
+            path = [unquote(part) for part in url.path.strip("/").split("/")]
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            output = self.route(method, path, query, body)
+        except HttpError as error:
+            return error.status, {"status": "error", "errors": [str(error)]}
+        except StorageWriteError as error:
+            return 500, {"status": "error", "errors": [f"Failed to save the customer receipts: {error}"]}
+        except Exception as error:
+            # Answer any other problem with an error rather than dropping the connection, and show it on the server's console.
+            traceback.print_exc()
+            return 500, {"status": "error", "errors": [f"The server couldn't answer the request: {error!r}"]}
+        return STATUS_CODES[output["status"]], output
+
+    # Method for running the receipt operation for a request, returning the output from "run_operation()".
+    def route(self, method, path, query, body):
+        if path == ["receipts"]:
+            if method == "GET":
+                return self.run("list", item=query.get("item"), name=query.get("name"), limit=self.number(query, "limit", DEFAULT_LIMIT))
+            if method == "POST":
+                details = self.json_body(body)
+                duplicates = details.get("duplicates", "skip")
+                if duplicates not in DUPLICATE_CHOICES:
+                    raise HttpError(400, f"'duplicates' must be one of {', '.join(DUPLICATE_CHOICES)}.")
+                return self.run("add", first_name=self.text(details, "first_name"), last_name=self.text(details, "last_name"),
+                                item_hired=self.text(details, "item_hired"), amount_hired=self.text(details, "amount_hired"),
+                                hire_date=details.get("hire_date"), duplicates=duplicates)
+            raise HttpError(405, f"{method} isn't allowed on /receipts, use GET or POST.")
+
+        if len(path) == 2 and path[0] == "receipts":
+            if method == "GET":
+                receipt = self.store.get(int(path[1])) if path[1].isdecimal() else None  # "isdigit()" is also true for characters "int()" rejects (e.g. "²").
+                if receipt is None:
+                    return {"command": "get", "status": "not_found"}
+                return {"command": "get", "status": "found", "receipt": receipt_record(receipt.to_list())}
+            if method in ("PATCH", "PUT"):
+                return self.run("update", receipt_number=path[1], amount_hired=self.text(self.json_body(body), "amount_hired"))
+            if method == "DELETE":
+                return self.run("delete", receipt_number=path[1])
+            raise HttpError(405, f"{method} isn't allowed on a receipt, use GET, PATCH or DELETE.")
+
+        if path == ["search"] and method == "GET":
+            return self.run("search", text=query.get("q", ""), limit=self.number(query, "limit", DEFAULT_LIMIT))
+        if path == ["stats"] and method == "GET":
+            return self.run("stats", top=self.number(query, "top", 10), days=self.number(query, "days", 7))
+        raise HttpError(404, f"There's nothing at /{'/'.join(path)}.")
+
+    # Method for running a receipt operation with the same arguments as the command line, so both give the same results.
+    def run(self, command, **arguments):
+        return run_operation(self.service, argparse.Namespace(command=command, **arguments))
+
+    # Method for reading a request body as a JSON object.
+    @staticmethod
+    def json_body(body):
+        try:
+            details = json.loads(body or b"{}")
+        except ValueError:
+            raise HttpError(400, "The request body isn't valid JSON.")
+        if not isinstance(details, dict):
+            raise HttpError(400, "The request body must be a JSON object.")
+        return details
+
+    # Method for reading a field of a JSON object as text, as if it was typed into the window, where a missing field is left blank.
+    @staticmethod
+    def text(details, field):
+        value = details.get(field)
+        return "" if value is None else str(value)
+
+    # Method for reading a whole number from the query string, e.g. "limit=20".
+    @staticmethod
+    def number(query, name, default):
+        try:
+            return max(0, int(query.get(name, default)))
+        except ValueError:
+            raise HttpError(400, f"'{name}' must be a whole number.")
+
+    # Method for regularly merging in changes made by another program and reporting errors from the background writer, as the window does.
+    # Waiting for this program's changes to be written and reading the files happen on a background thread, so the other requests are still answered meanwhile.
+    # The changes are then applied to the store on the event loop's thread, as "store.merge_external_changes()" does.
+    async def check_storage(self):
+        storage = self.store.storage
+        while True:
+            await asyncio.sleep(CHECK_INTERVAL)
+            background_error = self.store.take_error()
+            reload = isinstance(background_error, ChangesDroppedError)  # The store still has the changes that were left out, so load it again to match the files.
+            if reload:
+                print(f"Failed to save the customer receipts: {background_error}\nThe receipts are being loaded again to match what was saved.", file=sys.stderr)
+            elif background_error is not None:
+                print(f"Failed to save the customer receipts: {background_error}\nThe changes will be saved again once the problem is fixed.", file=sys.stderr)
+            try:
+                if not reload and not await asyncio.to_thread(self.store.changed_on_disk):
+                    continue
+                self.not_merging.clear()
+                try:
+                    changes = None if reload else await asyncio.to_thread(storage.read_external_changes)
+                    if changes is None:
+                        self.store.set_receipts(await asyncio.to_thread(storage.load))  # The changes can't be worked out, so load every receipt again.
+                    elif changes:
+                        self.store.apply_journal(changes)
+                finally:
+                    self.not_merging.set()
+            except (StorageCorruptError, StorageWriteError) as error:
+                print(f"Failed to merge in changes from another program: {error}", file=sys.stderr)
+
+
+# Function for running the service until it is stopped with Ctrl+C (or SIGTERM where the platform supports it).
+async def serve(server, host, port):
+    listener = await asyncio.start_server(server.handle_connection, host, port)
+    port = listener.sockets[0].getsockname()[1]  # The port picked by the system when 0 is given.
+    print(f"Serving the customer receipts on http://{host}:{port}", flush=True)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signal_number, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows only stops on Ctrl+C, which raises KeyboardInterrupt instead.
+
+    checker = asyncio.create_task(server.check_storage())
+    async with listener:
+        await stop.wait()
+    checker.cancel()
+
+
+# Main function for the command line.
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Serve the customer receipts of Julie's party hire store as JSON over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: only this computer).")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on, or 0 for any free port.")
+    parser.add_argument("--engine", choices=["json", "sqlite"], default="json", help="Storage backend the receipts are kept in.")
+    parser.add_argument("--digits", type=int, default=MIN_RECEIPT_DIGITS, help="Number of digits in each new receipt number.")
+    arguments = parser.parse_args(arguments)
+
+    try:
+        store = open_receipt_store(arguments.engine, arguments.digits, write_delay=SERVER_WRITE_DELAY)
+    except StorageCorruptError as error:
+        print(f"Failed to load the customer receipts: {error}\nOpen the program to restore or replace them.", file=sys.stderr)
+        return 2
+
+    server = ReceiptServer(ReceiptService(store))
+    try:
+        asyncio.run(serve(server, arguments.host, arguments.port))
+    except KeyboardInterrupt:
+        pass
+    except OSError as error:
+        print(f"Failed to start the server: {error}", file=sys.stderr)
+        return 2
+    finally:
+        try:
+            store.close()  # Save the receipt number pool and make sure every change is on the disk.
+        except StorageWriteError as error:
+            print(f"Failed to save the customer receipts: {error}", file=sys.stderr)
+    print(f"Stopped after answering {server.requests} requests.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1231 @@
+# Date Created: 18/10/2026
+# Author: Jack Compton
+# Purpose: Storage backends for saving and loading the customer receipts of Julie's party hire store.
+
+import os
+import json
+import atexit
+import shutil
+import time
+import sqlite3
+import threading
+
+try:
+    import fcntl  # Advisory file locking, which is only available on Unix-like systems.
+except ImportError:
+    fcntl = None
+
+
+# Error raised when the stored receipts can't be read because the file is corrupted or improperly formatted.
+class StorageCorruptError(Exception):
+    pass
+
+
+# Error raised when a change to the receipts can't be saved, e.g. because of file permissions or a full disk.
+class StorageWriteError(Exception):
+    pass
+
+
+# Error raised when changes to the receipts can never be saved (e.g. a new receipt clashes with one already stored), so they were left out
+# rather than tried again, and the receipts need loading again to match what was saved.
+class ChangesDroppedError(StorageWriteError):
+    pass
+
+
+# Errors from saving that go away once the problem is fixed (e.g. a full disk, a missing network drive or a database locked by another program),
+# so the changes are kept and tried again. Any other error would happen again every time.
+TRANSIENT_WRITE_ERRORS = (OSError, sqlite3.OperationalError)
+
+
+# Class for a lock shared by every program using the same receipt files, through an advisory lock (fcntl) on a lock file.
+# An advisory lock doesn't lock out other threads of the same program, so every thread shares one FileLock for each file (see "shared_file_lock()").
+# The lock file also holds a version stamp, made of a count of the changes written and a count of the JSON snapshots swapped in,
+# so that another program can tell its receipts are out of date without relying on file modification times (which can be coarse on network drives).
+# Without fcntl (e.g. on Windows) only the threads of this program are locked out.
+class FileLock:
+    stamp_size = 42  # Two 20-digit numbers separated by a space, followed by a newline.
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+        self.thread_lock = threading.Lock()     # Lock for the threads of this program.
+        self.stamp_lock = threading.Lock()      # Lock for reading and writing the stamp, which is read both with and without the file lock held.
+        self.hold_start = 0.0                   # Time the lock was last taken.
+        self.longest_hold = 0.0                 # Longest time (in seconds) the lock has been held, so that the lock hold times can be checked.
+
+    # Method for taking the lock, returning False straight away if "blocking" is False and another program or thread holds it.
+    def acquire(self, blocking=True):
+        if not self.thread_lock.acquire(blocking):
+            return False
+        if fcntl is not None:
+            try:
+                fcntl.flock(self.fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self.thread_lock.release()
+                if blocking:
+                    raise
+                return False  # Another program holds the lock.
+        self.hold_start = time.perf_counter()
+        return True
+
+    def release(self):
+        self.longest_hold = max(self.longest_hold, time.perf_counter() - self.hold_start)
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exception):
+        self.release()
+
+    # Method for reading the version stamp as (changes written, snapshots swapped in), which is (0, 0) for a new lock file.
+    def read_stamp(self):
+        with self.stamp_lock:
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            stamp = os.read(self.fd, self.stamp_size)
+        try:
+            version, snapshot = stamp.split()
+            return int(version), int(snapshot)
+        except ValueError:
+            return 0, 0
+
+    # Method for writing the version stamp, which must only be done while holding the lock.
+    def write_stamp(self, version, snapshot):
+        with self.stamp_lock:
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            os.write(self.fd, f"{version:020d} {snapshot:020d}\n".encode())  # Always the same length, so it is overwritten in place.
+
+
+file_locks = {}                         # Dictionary mapping the full path of each lock file to its FileLock.
+file_locks_lock = threading.Lock()      # Lock so that two threads don't create a FileLock for the same file.
+
+
+# Function for getting the FileLock for a lock file, which is shared by everything in this program using the same file.
+def shared_file_lock(path):
+    path = os.path.abspath(path)
+    with file_locks_lock:
+        if path not in file_locks:
+            file_locks[path] = FileLock(path)
+        return file_locks[path]
+
+
+# Base class for the storage backends, which every backend has to provide these methods for.
+# Each receipt is a list of [receipt_number, first_name, last_name, item_hired, amount_hired], followed by the hire date for receipts that have one.
+class ReceiptStorage:
+    name = "storage"
+    known_signature = None              # Modification times and sizes of the stored files when this program last loaded or saved them.
+    signature_lock = threading.Lock()   # Lock so that the signature isn't recorded by two threads at once.
+
+    # Method for loading every stored receipt, in the order they were added.
+    def load(self):
+        raise NotImplementedError
+
+    # Method for loading the receipts a chunk at a time, e.g. on a background thread so the window can be used while a large store loads.
+    # Yields ("add", receipts, progress) for each chunk of stored receipts and ("journal", changes, progress) for changes that still need
+    # applying on top of them, where progress goes from 0 to 1. Backends that can't load in pieces load everything and split it up.
+    def stream(self, chunk_size=5000):
+        receipts = self.load()
+        for start in range(0, len(receipts), chunk_size):
+            yield "add", receipts[start:start + chunk_size], min(1.0, (start + chunk_size) / len(receipts))
+
+    # Method for reading the latest version of every stored receipt a chunk at a time, in the order they were added, e.g. for exporting them
+    # without loading them into a receipt store. Backends that can read in pieces only hold one chunk in memory, others load everything and split it up.
+    def scan(self, chunk_size=5000):
+        receipts = self.load()
+        for start in range(0, len(receipts), chunk_size):
+            yield receipts[start:start + chunk_size]
+
+    # Method for finishing off anything left over once the receipts have been loaded with "stream()".
+    # "receipts_source" is a function returning the loaded receipts, only called if the backend needs them.
+    def finish_load(self, receipts_source):
+        pass
+
+    # Method for loading the receipts from the backup when the main file is corrupted, raising StorageCorruptError if there is no usable backup.
+    def load_backup(self):
+        raise StorageCorruptError("No backup is available.")
+
+    # Method for replacing the stored receipts with an empty list.
+    def reset(self, keep_journal=False):
+        raise NotImplementedError
+
+    # Methods for saving a single new, updated or deleted receipt.
+    def add(self, receipt):
+        raise NotImplementedError
+
+    def update(self, receipt):
+        raise NotImplementedError
+
+    def delete(self, receipt):
+        raise NotImplementedError
+
+    # Method for saving a list of (operation, receipt) changes in one go, where operation is "add", "update" or "delete".
+    def write_batch(self, changes):
+        for operation, receipt in changes:
+            getattr(self, operation)(receipt)
+
+    # Method for waiting until every change handed to the backend has been saved.
+    def flush(self):
+        pass
+
+    # Method for returning (and clearing) an error raised on a background thread, so it can be shown on the main thread.
+    def take_error(self):
+        return None
+
+    # Method for getting the files that the receipts are stored in, which are checked for changes made by another program.
+    def watched_paths(self):
+        return []
+
+    # Method for getting the modification time and size of each stored file (None for a file that doesn't exist).
+    def file_signature(self):
+        signature = []
+        for path in self.watched_paths():
+            try:
+                file_stat = os.stat(path)
+                signature.append((file_stat.st_mtime_ns, file_stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    # Method for recording the stored files as they are after this program has loaded or changed them.
+    def remember_files(self):
+        with self.signature_lock:
+            self.known_signature = self.file_signature()  # Checked while holding the lock, so the latest change is always the one recorded.
+
+    # Method for checking whether the stored files have been changed by another program since this program last loaded or saved them.
+    # Only the file modification times and sizes are checked, so this doesn't read the files.
+    def changed_externally(self):
+        return self.known_signature is not None and self.file_signature() != self.known_signature
+
+    # Method for reading the changes another program has made to the stored receipts as a list of (operation, receipt) pairs, oldest first.
+    # Returns None if the changes can't be worked out, in which case every receipt has to be loaded again.
+    def read_external_changes(self):
+        return None if self.changed_externally() else []
+
+    # Method for making sure every change is on the disk before the program exits.
+    def close(self):
+        pass
+
+
+# Storage backend that keeps the receipts in a JSON file, with each change appended to a journal file rather than rewriting the whole JSON file.
+# Once the journal crosses a size threshold it is folded into a new JSON snapshot on a background thread.
+# Several programs (e.g. counters sharing the files on a network drive) can use the same files. Each change is appended while holding a lock file,
+# after first reading any changes the other programs have appended, and only one program at a time compacts the journal.
+class JsonStorage(ReceiptStorage):
+    name = "json"
+
+    def __init__(self, path="customer_receipts.json", receipts_source=None, compact_size=1024 * 1024, sync_interval=0.5):
+        base_path = os.path.splitext(path)[0]
+        self.path = path                                            # JSON file that the receipts are stored in.
+        self.backup_path = path + ".bak"                            # Previous version of the JSON file, kept in case the current one is damaged.
+        self.journal_path = base_path + ".journal"                  # File that each change is appended to.
+        self.journal_compacting_path = base_path + ".journal.old"   # File that the journal is moved to while it is being folded into the JSON file.
+        self.journal_backup_path = base_path + ".journal.bak"       # Changes that were folded into the current JSON file, replayed on top of the backup.
+        self.receipts_source = receipts_source  # Function returning the program's current list of receipts, which is copied when compacting.
+        self.compact_size = compact_size        # Size of the journal (in bytes) at which it is folded into the JSON file.
+        self.sync_interval = sync_interval      # Seconds to wait before syncing the journal, so rapid changes share one disk sync.
+        self.journal_handle = None              # Journal file kept open between changes so it doesn't have to be reopened for each one.
+        self.sync_timer = None                  # Timer for the next journal sync.
+        self.compaction_thread = None           # Background thread used for compacting the journal.
+        self.background_error = None            # Error raised on the compaction or sync thread.
+        self.compaction_lock = threading.Lock() # Lock to stop the files from being read while a compaction is swapping them.
+        self.journal_lock = threading.Lock()    # Lock to stop the journal from being written, synced and closed at the same time.
+        self.journal_identity = None            # Device and inode of the journal this program has read or written up to, to tell if it has been replaced.
+        self.journal_offset = 0                 # Number of bytes of that journal that this program has read or written.
+        self.external_changes = []              # Changes found in the journal that another program wrote, along with every change written after them.
+        self.external_reload = False            # Whether another program replaced the journal, so its changes have to be found by loading everything again.
+        self.file_lock = shared_file_lock(base_path + ".lock")                      # Lock shared with other programs, held for a few milliseconds around each change.
+        self.compaction_file_lock = shared_file_lock(base_path + ".compact.lock")   # Lock held by whichever program is compacting the journal.
+        self.known_version = None               # Version stamp of the files when this program last loaded, read or wrote them.
+        self.known_snapshot = None              # Number of JSON snapshots swapped in when this program last loaded, read or wrote the files.
+
+    # Method for creating a new JSON file with an empty list if the file doesn't already exist.
+    # The check is made while holding the lock file, so two programs starting at once don't both write the new file.
+    def create_file(self):
+        if os.path.exists(self.path) or os.path.exists(self.backup_path):
+            return
+        with self.file_lock:
+            if not os.path.exists(self.path) and not os.path.exists(self.backup_path):
+                write_json_atomically(self.path, [], keep_backup=False)
+
+    # Method for loading the receipts from the JSON file and the journals.
+    def load(self):
+        self.create_file()
+        try:
+            receipts = self.read(self.path, (self.journal_compacting_path, self.journal_path))
+        except (json.JSONDecodeError, UnicodeDecodeError, FileNotFoundError) as error:  # UnicodeDecodeError is raised for bytes that aren't UTF-8 text.
+            raise StorageCorruptError(error)
+
+        # Finish off a compaction that was interrupted (e.g. the program was closed or crashed part way through).
+        if os.path.exists(self.journal_compacting_path) and not (self.compaction_thread and self.compaction_thread.is_alive()):
+            self.compact(receipts)
+        return receipts
+
+    # Method for loading the receipts from the JSON file a chunk at a time, followed by the changes from the journals.
+    # The JSON file is parsed as it is read, so the first receipts are available long before the whole file has been read.
+    # This is only used when the program starts, before anything can be compacted, so the compaction lock isn't held between chunks.
+    def stream(self, chunk_size=5000):
+        self.create_file()
+        snapshot_number = self.file_lock.read_stamp()[1]
+        try:
+            for receipts, progress in stream_json_array(self.path, chunk_size):
+                yield "add", receipts, progress
+        except (json.JSONDecodeError, UnicodeDecodeError, FileNotFoundError) as error:  # UnicodeDecodeError is raised for bytes that aren't UTF-8 text.
+            raise StorageCorruptError(error)
+
+        # Read the changes made since the JSON file was written, oldest journal first, while no other program can be writing to them.
+        with self.journal_lock, self.file_lock:
+            journal_changes = [read_journal(journal_path) for journal_path in (self.journal_compacting_path, self.journal_path)]
+            self.track_files()
+            if self.known_snapshot != snapshot_number:
+                self.external_reload = True  # Another program swapped in a new JSON file while it was being read, so load everything again once loading finishes.
+        for changes in journal_changes:
+            if changes:
+                yield "journal", changes, 1.0
+
+    # Method for reading the latest version of every receipt a chunk at a time, applying the journals' changes to each chunk of the JSON file as it is read.
+    # The JSON file is opened and the journals are read while holding the lock file, so they still match if another program compacts the journal meanwhile
+    # (the open file can still be read after it is replaced). Only a chunk of the JSON file and the journals' changes are held in memory.
+    def scan(self, chunk_size=5000):
+        self.create_file()
+        overlay = JournalOverlay()
+        with self.journal_lock, self.file_lock:
+            try:
+                file = open(self.path, "r")
+            except FileNotFoundError as error:
+                raise StorageCorruptError(error)
+            for journal_path in (self.journal_compacting_path, self.journal_path):
+                if os.path.exists(journal_path):
+                    overlay.add_changes(read_journal_tail(journal_path, 0)[0])  # Read without cutting off a partly written change, as nothing is written here.
+        with file:
+            try:
+                for receipts, progress in stream_json_file(file, chunk_size):
+                    yield overlay.apply(receipts)
+            except (json.JSONDecodeError, UnicodeDecodeError) as error:
+                raise StorageCorruptError(error)
+        yield overlay.added_receipts()
+
+    # Method for finishing off a compaction that was interrupted, once the receipts have been loaded with "stream()".
+    def finish_load(self, receipts_source):
+        if os.path.exists(self.journal_compacting_path) and not (self.compaction_thread and self.compaction_thread.is_alive()):
+            self.compact(receipts_source())
+
+    # Method for loading the previous version of the JSON file along with every journal written since it was replaced.
+    def load_backup(self):
+        try:
+            receipts = self.read(self.backup_path, (self.journal_backup_path, self.journal_compacting_path, self.journal_path))
+        except (json.JSONDecodeError, UnicodeDecodeError, IOError) as error:
+            raise StorageCorruptError(error)
+        with self.journal_lock, self.file_lock:
+            write_json_atomically(self.path, receipts, keep_backup=False)  # Replace the damaged JSON file without overwriting the good backup.
+            self.stamp_change(snapshot_replaced=True)
+            self.track_files()
+        return receipts
+
+    # Method for replacing the JSON file with an empty list, optionally keeping the journals so their receipts are recovered on the next load.
+    def reset(self, keep_journal=False):
+        self.close_journal()
+        with self.journal_lock, self.file_lock:
+            if not keep_journal:
+                for path in (self.journal_path, self.journal_compacting_path):
+                    if os.path.exists(path):
+                        os.remove(path)  # Remove the journals as well so that the invalid receipts aren't replayed.
+            write_json_atomically(self.path, [], keep_backup=False)
+            self.stamp_change(snapshot_replaced=True)
+            self.track_files()
+
+    # Method for reading a JSON snapshot file and applying the changes from the given journal files to it.
+    # The JSON file is read without the lock file so that other programs aren't held up, and is read again if another program swaps in a new one meanwhile.
+    def read(self, snapshot_path, journal_paths):
+        with self.compaction_lock:  # Hold the compaction lock so that a background compaction can't swap the files while they are being read.
+            while True:
+                snapshot_number = self.file_lock.read_stamp()[1]
+                with open(snapshot_path, "r") as file:  # Open the JSON file in read mode ("r").
+                    receipts = json.load(file)
+                with self.journal_lock, self.file_lock:
+                    if self.file_lock.read_stamp()[1] != snapshot_number:
+                        continue  # Another program compacted the journal into a new JSON file while it was being read.
+                    for journal_path in journal_paths:
+                        replay_journal(journal_path, receipts)  # Apply the changes made since the JSON file was written, oldest journal first.
+                    self.track_files()
+                return receipts
+
+    def add(self, receipt):
+        self.append("add", receipt)
+
+    def update(self, receipt):
+        self.append("update", receipt)
+
+    def delete(self, receipt):
+        self.append("delete", receipt)
+
+    # Method for appending a change to the journal file.
+    def append(self, operation, receipt):
+        self.write_batch([(operation, receipt)])
+
+    # Method for appending a list of changes to the journal file in a single write.
+    def write_batch(self, changes):
+        # Store the type of change ("add", "update" or "delete") with the receipt it applies to, writing each change as a single compact line.
+        journal_lines = "".join(json.dumps({"op": operation, "receipt": receipt}, separators=(",", ":")) + "\n" for operation, receipt in changes)
+        with self.journal_lock, self.file_lock:
+            if self.journal_handle is not None and file_identity(os.fstat(self.journal_handle.fileno())) != file_identity(self.journal_path):
+                self.journal_handle.close()  # Another program has moved the journal aside (e.g. to compact it), so open the new journal instead.
+                self.journal_handle = None
+            if self.journal_handle is None:
+                self.journal_handle = open(self.journal_path, "a")  # Open the journal file in append mode ("a") so only the changes are written rather than the whole list.
+            self.catch_up_journal(os.fstat(self.journal_handle.fileno()))
+            if self.external_changes:
+                # Another program has written changes that this program hasn't merged yet, so check these changes against them.
+                merged_changes = merge_concurrent_changes(changes, self.external_changes)
+                if len(merged_changes) != len(changes):
+                    changes = merged_changes
+                    journal_lines = "".join(json.dumps({"op": operation, "receipt": receipt}, separators=(",", ":")) + "\n" for operation, receipt in changes)
+            self.journal_handle.write(journal_lines)
+            self.journal_handle.flush()                 # Hand the change to the operating system straight away so it survives the program crashing.
+            journal_size = self.journal_handle.tell()   # Get the size of the journal so that it can be compacted once it gets too large.
+            if self.external_changes:
+                self.external_changes.extend(changes)   # Keep these changes after the other program's, so they are merged in the same order as the journal.
+            self.journal_offset = journal_size
+            self.stamp_change()
+            self.remember_files()                       # Record the journal's new size, so the change isn't mistaken for one made by another program.
+
+            # Rather than syncing to disk after every change, sync once for all the changes made within the sync interval.
+            if self.sync_timer is None:
+                self.sync_timer = threading.Timer(self.sync_interval, self.sync_journal)
+                self.sync_timer.daemon = True
+                self.sync_timer.start()
+
+        if journal_size >= self.compact_size and self.receipts_source is not None:
+            self.compact(self.receipts_source())  # Fold the journal into the JSON file in the background once it crosses the size threshold.
+
+    # Method for syncing the changes written to the journal onto the disk (runs on the sync timer thread).
+    def sync_journal(self):
+        with self.journal_lock:
+            self.sync_timer = None
+            if self.journal_handle is not None:
+                try:
+                    os.fsync(self.journal_handle.fileno())
+                except OSError as os_error:
+                    self.background_error = os_error  # Keep the error so that it can be shown from the main thread.
+
+    # Method for syncing and closing the journal file so that it can be moved or the program can exit.
+    def close_journal(self):
+        with self.journal_lock:
+            if self.sync_timer is not None:
+                self.sync_timer.cancel()
+                self.sync_timer = None
+            if self.journal_handle is not None:
+                self.journal_handle.flush()
+                os.fsync(self.journal_handle.fileno())
+                self.journal_handle.close()
+                self.journal_handle = None
+
+    # Method for starting a background compaction that folds the journal into the JSON file.
+    def compact(self, receipts):
+        if self.compaction_thread is not None and self.compaction_thread.is_alive():
+            return  # Only run one compaction at a time, the journal will be compacted again once it crosses the threshold.
+        if not self.compaction_file_lock.acquire(blocking=False):
+            return  # Another program is compacting the journal, which will include this program's changes.
+
+        try:
+            self.close_journal()  # Close the journal so that it can be moved, the next change will open a fresh one.
+            if not self.rotate_journal():
+                self.compaction_file_lock.release()
+                return
+            snapshot = [list(customer) for customer in receipts]  # Copy the receipts so that later changes don't affect the snapshot being written.
+            self.compaction_thread = threading.Thread(target=self.write_snapshot, args=(snapshot,), daemon=True)
+            self.compaction_thread.start()  # The compaction thread releases the compaction lock once the new JSON file has been swapped in.
+        except Exception:
+            if not (self.compaction_thread and self.compaction_thread.is_alive()):
+                self.compaction_file_lock.release()
+            raise
+
+    # Method for moving the journal aside so that new changes go into a fresh journal while the compaction is running.
+    # Returns False if the journal can't be compacted yet, as the receipts are missing another program's changes.
+    def rotate_journal(self):
+        with self.journal_lock, self.file_lock:
+            if os.path.exists(self.journal_path):
+                self.catch_up_journal(os.stat(self.journal_path))  # Keep any changes another program added to the journal before it is moved.
+            if self.external_changes or self.external_reload:
+                return False  # Compact once they have been merged in, rather than writing an out of date snapshot.
+
+            if os.path.exists(self.journal_path):
+                if os.path.exists(self.journal_compacting_path):
+                    # Add onto the journal left over from an unfinished compaction rather than replacing it.
+                    with open(self.journal_path, "rb") as source, open(self.journal_compacting_path, "ab") as destination:
+                        shutil.copyfileobj(source, destination)
+                        destination.flush()
+                        os.fsync(destination.fileno())
+                    os.remove(self.journal_path)
+                else:
+                    os.replace(self.journal_path, self.journal_compacting_path)
+            self.stamp_change()
+            self.track_files()  # Everything in the moved journal has been read, so carry on from the end of it.
+        return True
+
+    # Method for writing a snapshot of the receipts to the JSON file (runs on the compaction thread).
+    def write_snapshot(self, snapshot):
+        try:
+            write_temp_json(self.path, snapshot)  # Write the snapshot before taking the locks so that loading and saving aren't held up.
+            with self.compaction_lock, self.journal_lock, self.file_lock:
+                swap_in_json(self.path)  # Replace the JSON file, keeping the previous version as the backup.
+                if os.path.exists(self.journal_compacting_path):
+                    # Keep the compacted changes alongside the backup, so that the backup plus this journal gives the same receipts as the new JSON file.
+                    os.replace(self.journal_compacting_path, self.journal_backup_path)
+                elif os.path.exists(self.journal_backup_path):
+                    os.remove(self.journal_backup_path)  # No changes were compacted, so the backup already matches the new JSON file.
+                if self.journal_identity == file_identity(self.journal_backup_path):
+                    self.journal_identity, self.journal_offset = None, 0  # The journal being followed is now part of the JSON file.
+                self.stamp_change(snapshot_replaced=True)
+                self.remember_files()
+        except IOError as io_error:
+            self.background_error = io_error  # Keep the error so that it can be shown from the main thread, as message boxes can't be used here.
+        finally:
+            self.compaction_file_lock.release()
+
+    # Method for adding one to the version stamp in the lock file, which must only be done while holding the lock file.
+    def stamp_change(self, snapshot_replaced=False):
+        version, snapshot = self.file_lock.read_stamp()
+        self.known_version = version + 1
+        self.known_snapshot = snapshot + 1 if snapshot_replaced else snapshot
+        self.file_lock.write_stamp(self.known_version, self.known_snapshot)
+
+    # Method for recording the state of the files once this program has read everything in them, which must be done while holding the lock file.
+    def track_files(self):
+        self.known_version, self.known_snapshot = self.file_lock.read_stamp()
+        self.track_journal()
+        self.remember_files()
+
+    def take_error(self):
+        error, self.background_error = self.background_error, None
+        return error
+
+    def watched_paths(self):
+        return [self.path, self.journal_path, self.journal_compacting_path]
+
+    # Method for checking the stored files, holding the compaction lock so that a compaction swapping in a new JSON file isn't mistaken for another program.
+    # The version stamp catches changes made by other counters, and the file modification times catch changes made by anything else.
+    def changed_externally(self):
+        with self.compaction_lock:
+            if self.external_changes or self.external_reload:
+                return True
+            if self.known_version is not None and self.file_lock.read_stamp()[0] != self.known_version:
+                return True
+            return super().changed_externally()
+
+    # Method for recording how far through the journal this program has read, once the receipts have been loaded.
+    # If there is no journal yet, the journal being compacted is tracked instead so that its changes aren't read twice.
+    def track_journal(self):
+        self.journal_identity, self.journal_offset = None, 0
+        for journal_path in (self.journal_path, self.journal_compacting_path):
+            try:
+                file_stat = os.stat(journal_path)
+            except OSError:
+                continue
+            self.journal_identity, self.journal_offset = file_identity(file_stat), file_stat.st_size
+            break
+
+    # Method for keeping any changes another program has added to the end of the journal since this program last read or wrote it.
+    # The journal lock must be held, and "file_stat" is the current state of the journal file.
+    def catch_up_journal(self, file_stat):
+        if file_identity(file_stat) != self.journal_identity:
+            # The journal has been moved aside since this program last used it (e.g. by another program compacting it), so read the rest of the old journal as well.
+            changes = self.read_new_journal_changes()
+            if changes is None:
+                self.external_reload = True  # The old journal can't be followed, so every receipt will have to be loaded again.
+                self.journal_identity, self.journal_offset = file_identity(file_stat), file_stat.st_size
+            else:
+                self.external_changes.extend(changes)
+        elif file_stat.st_size > self.journal_offset:
+            changes, self.journal_offset = read_journal_tail(self.journal_path, self.journal_offset)
+            self.external_changes.extend(changes)
+
+    # Method for reading the changes another program has made, by reading only the end of the journal rather than the whole JSON file.
+    # The journal is followed by its inode as it is moved aside and folded into the JSON file by another program's compaction.
+    def read_external_changes(self):
+        with self.compaction_lock, self.journal_lock, self.file_lock:
+            version, snapshot = self.file_lock.read_stamp()
+            if not (self.external_changes or self.external_reload or version != self.known_version or ReceiptStorage.changed_externally(self)):
+                return []
+            changes, self.external_changes = self.external_changes, []
+            try:
+                new_changes = None if self.external_reload else self.read_new_journal_changes()
+            except OSError:
+                new_changes = None  # A journal was moved or removed while it was being read.
+            self.external_reload = False
+            if new_changes is None:
+                return None
+            self.known_version, self.known_snapshot = version, snapshot
+            self.remember_files()
+            return changes + new_changes
+
+    # Method for reading the journal changes that haven't been read yet, returning None if the JSON file was replaced in a way that can't be followed.
+    def read_new_journal_changes(self):
+        if self.known_signature is None:
+            return None
+        json_changed = self.file_lock.read_stamp()[1] != self.known_snapshot or self.file_signature()[0] != self.known_signature[0]
+        journal_paths = [self.journal_backup_path, self.journal_compacting_path, self.journal_path]  # Oldest first.
+        identities = [file_identity(journal_path) for journal_path in journal_paths]
+
+        if self.journal_identity is None:
+            first, offset = 1, 0  # There was no journal when this program last read it, so read every journal that has appeared since.
+        elif self.journal_identity in identities:
+            first, offset = identities.index(self.journal_identity), self.journal_offset
+        else:
+            return None  # The journal that was being followed has gone.
+
+        # The JSON file may only have changed if the journal being followed was folded into it, which moves that journal to the backup journal.
+        if json_changed != (first == 0 and self.journal_identity is not None):
+            return None
+
+        changes = []
+        self.journal_identity, self.journal_offset = None, 0
+        for i in range(first, len(journal_paths)):
+            if identities[i] is None:
+                continue
+            new_changes, end = read_journal_tail(journal_paths[i], offset if i == first else 0)
+            changes.extend(new_changes)
+            if i > 0:
+                self.journal_identity, self.journal_offset = identities[i], end
+        return changes
+
+    # Method for syncing the journal and waiting for a running compaction to finish replacing the JSON file.
+    def close(self):
+        try:
+            self.close_journal()
+        except IOError:
+            pass
+        if self.compaction_thread is not None:
+            self.compaction_thread.join()
+
+
+# Storage backend that keeps the receipts in an SQLite database, where each change is a single-row transaction.
+class SqliteStorage(ReceiptStorage):
+    name = "sqlite"
+
+    def __init__(self, path="customer_receipts.db"):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()  # Lock so that the connection can be shared with background threads.
+        self.known_data_version = None  # SQLite's count of commits made by other programs when the receipts were last loaded.
+        try:
+            with self.connection:
+                self.connection.execute("PRAGMA journal_mode=WAL")      # Write-ahead logging, so each change is appended rather than rewriting pages in place.
+                self.connection.execute("PRAGMA synchronous=NORMAL")    # Sync at checkpoints rather than after every change, which stays safe in WAL mode.
+
+                # The "position" column keeps the receipts in the order they were added, so entry numbers stay the same as the JSON file.
+                self.connection.execute("""CREATE TABLE IF NOT EXISTS receipts (
+                                               position INTEGER PRIMARY KEY AUTOINCREMENT,
+                                               receipt_number INTEGER NOT NULL,
+                                               first_name TEXT NOT NULL,
+                                               last_name TEXT NOT NULL,
+                                               item_hired TEXT NOT NULL,
+                                               amount_hired TEXT NOT NULL,
+                                               hire_date TEXT)""")
+                columns = [column[1] for column in self.connection.execute("PRAGMA table_info(receipts)")]
+                if "hire_date" not in columns:
+                    self.connection.execute("ALTER TABLE receipts ADD COLUMN hire_date TEXT")  # Databases created before hire dates were kept.
+                self.connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS receipts_by_number ON receipts (receipt_number)")
+                self.connection.execute("CREATE INDEX IF NOT EXISTS receipts_by_name ON receipts (last_name COLLATE NOCASE, first_name COLLATE NOCASE)")
+        except sqlite3.DatabaseError:
+            pass  # A corrupted database is reported when the receipts are loaded.
+
+    def load(self):
+        try:
+            with self.lock:
+                rows = self.connection.execute("SELECT receipt_number, first_name, last_name, item_hired, amount_hired, hire_date FROM receipts ORDER BY position").fetchall()
+                self.known_data_version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.DatabaseError as error:
+            raise StorageCorruptError(error)
+        self.remember_files()
+        return [stored_receipt(row) for row in rows]
+
+    # Method for reading the receipts a chunk at a time in the order they were added, only holding the connection's lock while each chunk is read.
+    def scan(self, chunk_size=5000):
+        position = 0
+        while True:
+            try:
+                with self.lock:
+                    rows = self.connection.execute("SELECT position, receipt_number, first_name, last_name, item_hired, amount_hired, hire_date FROM receipts "
+                                                   "WHERE position > ? ORDER BY position LIMIT ?", (position, chunk_size)).fetchall()
+            except sqlite3.DatabaseError as error:
+                raise StorageCorruptError(error)
+            if not rows:
+                return
+            position = rows[-1][0]
+            yield [stored_receipt(row[1:]) for row in rows]
+
+    def reset(self, keep_journal=False):
+        self.connection.close()
+        for path in (self.path, self.path + "-wal", self.path + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)  # Remove the damaged database so that a new one can be created.
+        self.__init__(self.path)
+        with self.lock:
+            self.known_data_version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+        self.remember_files()
+
+    # Each change is saved as its own transaction.
+    def add(self, receipt):
+        self.write_batch([("add", receipt)])
+
+    def update(self, receipt):
+        self.write_batch([("update", receipt)])
+
+    def delete(self, receipt):
+        self.write_batch([("delete", receipt)])
+
+    # Method for saving a list of changes in a single transaction, so that a burst of changes only needs one commit.
+    # SQLite locks the database against other programs for the transaction, and an update to a receipt another program has deleted changes no rows,
+    # so the delete wins as it does with the JSON backend.
+    def write_batch(self, changes):
+        with self.lock, self.connection:  # Using the connection as a context manager commits the changes as one transaction.
+            for operation, receipt in changes:
+                if operation == "add":
+                    self.connection.execute("INSERT INTO receipts (receipt_number, first_name, last_name, item_hired, amount_hired, hire_date) VALUES (?, ?, ?, ?, ?, ?)", receipt_row(receipt))
+                elif operation == "update":
+                    self.connection.execute("UPDATE receipts SET first_name = ?, last_name = ?, item_hired = ?, amount_hired = ?, hire_date = ? WHERE receipt_number = ?", (*receipt_row(receipt)[1:], receipt[0]))
+                else:
+                    self.connection.execute("DELETE FROM receipts WHERE receipt_number = ?", (receipt[0],))
+        self.remember_files()
+
+    def watched_paths(self):
+        return [self.path, self.path + "-wal"]
+
+    # Method for checking whether another program has committed changes to the database, using SQLite's count of commits by other connections as the version stamp.
+    def changed_externally(self):
+        if self.known_data_version is None:
+            return False
+        try:
+            with self.lock:
+                return self.connection.execute("PRAGMA data_version").fetchone()[0] != self.known_data_version
+        except sqlite3.DatabaseError:
+            return True  # Let loading the receipts again report the problem.
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+# Storage wrapper that hands each change to a background writer thread, so that saving never holds up the window.
+# The writer waits "write_delay" seconds after the first change so that a burst of changes (e.g. 20 quick submits) is saved in one write.
+# Changes that fail to save because of a problem that can be fixed (e.g. a full disk) are kept and tried again, with the error reported through "take_error()".
+# Changes that can never be saved are left out, so they don't hold up every change after them, and are reported as a ChangesDroppedError.
+class QueuedStorage(ReceiptStorage):
+    def __init__(self, storage, write_delay=0.25):
+        self.storage = storage                  # Storage backend that the changes are written to.
+        self.name = storage.name
+        self.write_delay = write_delay          # Seconds to wait for more changes before writing.
+        self.pending = []                       # Changes waiting to be written, oldest first.
+        self.writing = False                    # Whether the writer thread is currently writing a batch.
+        self.flush_requested = False            # Whether something is waiting for the pending changes to be written straight away.
+        self.closed = False                     # Whether the storage has been closed, which stops the writer thread.
+        self.failures = 0                       # Number of batches that have failed to write.
+        self.failing = False                    # Whether the last batch failed to write, so the error is only reported once.
+        self.last_error = None                  # Error from the last batch that failed to write.
+        self.background_error = None            # Error waiting to be shown on the main thread.
+        self.condition = threading.Condition()  # Lock and signal shared by the main thread and the writer thread.
+        self.thread = threading.Thread(target=self.write_changes, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)  # The writer thread is a daemon, so write the queued changes if the program exits without closing the storage.
+
+    # Methods for loading the receipts, which first write any pending changes so that they are included.
+    def load(self):
+        self.flush()
+        return self.storage.load()
+
+    def stream(self, chunk_size=5000):
+        self.flush()
+        return self.storage.stream(chunk_size)
+
+    def finish_load(self, receipts_source):
+        self.storage.finish_load(receipts_source)
+
+    def load_backup(self):
+        self.flush()
+        return self.storage.load_backup()
+
+    def scan(self, chunk_size=5000):
+        self.flush()
+        return self.storage.scan(chunk_size)
+
+    def reset(self, keep_journal=False):
+        with self.condition:
+            self.pending = []  # Changes to the receipts being replaced no longer need to be written.
+        self.flush()
+        self.storage.reset(keep_journal)
+
+    # Methods for queueing a single new, updated or deleted receipt to be written.
+    def add(self, receipt):
+        self.queue_change("add", receipt)
+
+    def update(self, receipt):
+        self.queue_change("update", receipt)
+
+    def delete(self, receipt):
+        self.queue_change("delete", receipt)
+
+    def write_batch(self, changes):
+        self.queue_changes(changes)
+
+    # Method for adding a change to the list of pending changes and waking up the writer thread.
+    def queue_change(self, operation, receipt):
+        self.queue_changes([(operation, receipt)])
+
+    # Method for adding a list of changes to the pending changes together, so that the writer thread writes them in the same batch.
+    def queue_changes(self, changes):
+        with self.condition:
+            if self.closed:
+                raise StorageWriteError("The storage has already been closed.")
+            self.pending.extend(changes)
+            self.condition.notify_all()
+
+    # Method for writing the pending changes in batches (runs on the writer thread).
+    def write_changes(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if not self.pending:
+                    return  # The storage was closed with nothing left to write.
+
+                # Wait for more changes to arrive, unless the changes are needed straight away.
+                write_time = time.monotonic() + self.write_delay
+                while not (self.closed or self.flush_requested) and time.monotonic() < write_time:
+                    self.condition.wait(write_time - time.monotonic())
+                changes = self.pending
+                self.pending = []
+                self.writing = True
+
+            dropped = []
+            try:
+                self.storage.write_batch(coalesce_changes(changes))
+                error = None
+            except TRANSIENT_WRITE_ERRORS as write_error:
+                error = write_error
+            except Exception:
+                # Something in the batch can never be saved, so write the changes one at a time to save all the others.
+                changes, error, dropped = self.write_separately(coalesce_changes(changes))
+
+            with self.condition:
+                self.writing = False
+                if error is None:
+                    self.failing = False
+                else:
+                    self.pending[:0] = changes  # Keep the changes so that they are tried again with the next batch.
+                    self.failures += 1
+                    self.last_error = error
+                    if not self.failing:
+                        self.background_error = StorageWriteError(error)  # Only report the first failure, rather than every retry.
+                    self.failing = True
+                if dropped:
+                    self.background_error = ChangesDroppedError(dropped_changes_text(dropped))  # Reported over any retry, as the receipts need loading again.
+                self.condition.notify_all()
+                if error is not None:
+                    if self.closed:
+                        return  # Give up once the storage is closed, the error is raised by "close()".
+                    self.condition.wait(self.write_delay)  # Wait a moment before trying again.
+
+    # Method for writing changes one at a time (runs on the writer thread), leaving out the ones that can never be saved.
+    # Returns (the changes still to write, the error to try them again after, the (change, error) pairs left out).
+    def write_separately(self, changes):
+        dropped = []
+        for position, change in enumerate(changes):
+            try:
+                self.storage.write_batch([change])
+            except TRANSIENT_WRITE_ERRORS as write_error:
+                return changes[position:], write_error, dropped  # Keep this change and the ones after it to try again.
+            except Exception as write_error:
+                dropped.append((change, write_error))
+        return [], None, dropped
+
+    # Method for writing the pending changes straight away and waiting for them to finish, raising StorageWriteError if they fail.
+    def flush(self):
+        with self.condition:
+            failures = self.failures
+            self.flush_requested = True
+            self.condition.notify_all()
+            while (self.pending or self.writing) and self.failures == failures:
+                self.condition.wait()
+            self.flush_requested = False
+            if self.pending:
+                raise StorageWriteError(self.last_error)
+        self.storage.flush()
+
+    def take_error(self):
+        with self.condition:
+            error, self.background_error = self.background_error, None
+        return error or self.storage.take_error()
+
+    def watched_paths(self):
+        return self.storage.watched_paths()
+
+    # Method for reading the changes made by another program, once this program's own changes have been written.
+    def read_external_changes(self):
+        self.flush()
+        return self.storage.read_external_changes()
+
+    # Method for checking whether the stored files have been changed by another program, which can't be told while a batch is being written.
+    def changed_externally(self):
+        with self.condition:
+            if self.writing:
+                return False
+        return self.storage.changed_externally()
+
+    # Method for writing every pending change, stopping the writer thread and closing the storage backend. Closing it again does nothing.
+    # Raises StorageWriteError if the changes can't be written, or ChangesDroppedError if changes were left out and nothing has reported it yet.
+    def close(self):
+        with self.condition:
+            if self.closed:
+                return
+        atexit.unregister(self.close)
+        try:
+            self.flush()
+            with self.condition:
+                if isinstance(self.background_error, ChangesDroppedError):
+                    dropped_error, self.background_error = self.background_error, None
+                    raise dropped_error  # Changes were left out that nothing has reported yet (e.g. the program is exiting).
+        finally:
+            with self.condition:
+                self.closed = True
+                self.condition.notify_all()
+            self.thread.join()
+            self.storage.close()
+
+
+# Function for describing the changes left out by the writer thread, e.g. "The add of receipt 1234 couldn't be saved: UNIQUE constraint failed".
+def dropped_changes_text(dropped):
+    (operation, receipt), error = dropped[0]
+    if len(dropped) == 1:
+        return f"The {operation} of receipt {receipt[0]} couldn't be saved and was left out: {error}"
+    return f"{len(dropped)} changes couldn't be saved and were left out, e.g. the {operation} of receipt {receipt[0]}: {error}"
+
+
+# Function for combining a list of changes into the fewest changes with the same result, keeping the order that new receipts were added in.
+# e.g. a receipt that is added and then updated becomes a single add, and a receipt that is added and then deleted needs no change at all.
+def coalesce_changes(changes):
+    first_operation = {}    # First change to each receipt number.
+    last_change = {}        # Latest change to each receipt number, with the position its receipt was last added at (or the position of the change).
+    deleted = set()         # Receipt numbers that were deleted at some point.
+    for position, (operation, receipt) in enumerate(changes):
+        first_operation.setdefault(receipt[0], operation)
+        if operation == "add" or receipt[0] not in last_change:
+            order = position
+        else:
+            order = last_change[receipt[0]][0]  # An update or delete keeps the position the receipt was added at.
+        last_change[receipt[0]] = (order, operation, receipt)
+        if operation == "delete":
+            deleted.add(receipt[0])
+
+    coalesced = []
+    for order, operation, receipt in sorted(last_change.values(), key=lambda change: change[0]):
+        existed_before = first_operation[receipt[0]] != "add"  # The receipt was already saved before these changes.
+        if operation == "delete":
+            if existed_before:
+                coalesced.append(("delete", receipt))
+        elif not existed_before:
+            coalesced.append(("add", receipt))
+        elif receipt[0] in deleted:
+            # The receipt was deleted and then added again, which moves it to the end of the list.
+            coalesced.append(("delete", receipt))
+            coalesced.append(("add", receipt))
+        else:
+            coalesced.append(("update", receipt))
+    return coalesced
+
+
+# Function for checking the changes this program is about to write against the changes other programs have written that it hasn't merged yet.
+# Changes to the same receipt are kept in the order they reach the journal so the later change wins, except that an update to a receipt
+# another program has deleted is dropped, as it was made before this program knew about the delete (so the delete wins).
+def merge_concurrent_changes(changes, other_changes):
+    last_operation = {}
+    for operation, receipt in other_changes:
+        last_operation[receipt[0]] = operation
+    return [(operation, receipt) for operation, receipt in changes if not (operation == "update" and last_operation.get(receipt[0]) == "delete")]
+
+
+# Function for creating the storage backend with the given name ("json" or "sqlite").
+# The first time the SQLite backend is used, the receipts are migrated from the JSON file if there is one.
+# If "write_delay" is given, changes are written on a background thread, with the changes made within that many seconds written together.
+def open_storage(engine="json", json_path="customer_receipts.json", sqlite_path="customer_receipts.db", receipts_source=None, write_delay=None):
+    if engine == "sqlite":
+        if not os.path.exists(sqlite_path) and os.path.exists(json_path):
+            migrate_json_to_sqlite(json_path, sqlite_path)
+        storage = SqliteStorage(sqlite_path)
+    else:
+        storage = JsonStorage(json_path, receipts_source)
+    if write_delay is not None:
+        storage = QueuedStorage(storage, write_delay)
+    return storage
+
+
+# Function for getting a stored receipt from a row of the "receipts" table, leaving out the hire date of receipts that don't have one.
+def stored_receipt(row):
+    if row[5] is None:
+        return list(row[:5])
+    return list(row)
+
+
+# Function for getting a receipt as a row of the "receipts" table, with None as the hire date of receipts that don't have one.
+def receipt_row(receipt):
+    if len(receipt) > 5:
+        return receipt[:6]
+    return [*receipt, None]
+
+
+# Function for copying every receipt from the JSON file (including its journals) into an SQLite database in a single transaction.
+def migrate_json_to_sqlite(json_path="customer_receipts.json", sqlite_path="customer_receipts.db"):
+    source = JsonStorage(json_path)
+    receipts = source.load()
+    source.close()
+
+    destination = SqliteStorage(sqlite_path)
+    with destination.lock, destination.connection:
+        # Replace receipts with the same number, so that running the migration again doesn't add duplicates.
+        destination.connection.executemany("INSERT OR REPLACE INTO receipts (receipt_number, first_name, last_name, item_hired, amount_hired, hire_date) VALUES (?, ?, ?, ?, ?, ?)", map(receipt_row, receipts))
+    destination.close()
+    return len(receipts)
+
+
+# Class for the changes from the journals, kept so that they can be applied to the JSON file's receipts a chunk at a time as it is read,
+# giving the same receipts in the same order as "replay_journal()" without holding the whole list in memory.
+class JournalOverlay:
+    def __init__(self):
+        self.changes = {}   # Dictionary mapping each changed receipt number to [latest receipt (None if deleted), whether its stored receipt was deleted, order it was added in].
+        self.count = 0      # Number of changes added, used as the order that new receipts were added in.
+
+    # Method for adding a list of (operation, receipt) changes, oldest first.
+    def add_changes(self, changes):
+        for operation, receipt in changes:
+            self.count += 1
+            change = self.changes.get(receipt[0])
+            if operation == "delete":
+                if change is None:
+                    self.changes[receipt[0]] = [None, True, self.count]
+                else:
+                    change[0], change[1] = None, True  # Whether it was stored or added by the journal, the receipt is gone.
+            elif change is None:
+                self.changes[receipt[0]] = [receipt, False, self.count]  # Replaces the stored receipt in place, or is added at the end if it isn't stored.
+            elif change[0] is None:
+                change[0], change[2] = receipt, self.count  # Added again after being deleted, which puts it at the end of the list.
+            else:
+                change[0] = receipt
+
+    # Method for applying the changes to a chunk of stored receipts, returning the chunk's latest receipts.
+    def apply(self, receipts):
+        if not self.changes:
+            return receipts
+        latest_receipts = []
+        for receipt in receipts:
+            change = self.changes.get(receipt[0])
+            if change is None:
+                latest_receipts.append(receipt)
+            elif not change[1]:
+                latest_receipts.append(change[0])   # Replace the stored receipt with its latest version.
+                del self.changes[receipt[0]]        # Stop it from being added again at the end.
+        return latest_receipts
+
+    # Method for getting the receipts added by the journals that weren't stored, in the order they were added, once every stored receipt has been read.
+    def added_receipts(self):
+        return [change[0] for change in sorted(self.changes.values(), key=lambda change: change[2]) if change[0] is not None]
+
+
+# Function for applying the changes stored in a journal file to a list of receipts.
+def replay_journal(journal_path, receipts):
+    changes = read_journal(journal_path)
+    if not changes:
+        return  # Nothing to replay if the journal doesn't exist or is empty.
+
+    # Map each receipt number to its position in the list so that each change can be applied without searching the whole list.
+    positions = {customer[0]: i for i, customer in enumerate(receipts)}
+    deleted = False
+
+    # Every change sets or removes the receipt with its receipt number, so replaying a change more than once gives the same result.
+    for operation, receipt in changes:
+        if operation == "delete":
+            position = positions.pop(receipt[0], None)
+            if position is not None:
+                receipts[position] = None  # Mark the receipt as deleted and remove all marked receipts at the end.
+                deleted = True
+        elif receipt[0] in positions:
+            receipts[positions[receipt[0]]] = receipt  # Replace the existing receipt with its latest version.
+        else:
+            positions[receipt[0]] = len(receipts)
+            receipts.append(receipt)
+
+    if deleted:
+        receipts[:] = [customer for customer in receipts if customer is not None]
+
+
+# Function for reading the changes stored in a journal file as a list of (operation, receipt) pairs, oldest first.
+def read_journal(journal_path):
+    if not os.path.exists(journal_path):
+        return []  # Nothing to read if the journal doesn't exist.
+
+    changes, good_length = read_journal_tail(journal_path, 0)
+
+    # Cut off a partly written change so that the next change appended to the journal starts on its own line.
+    if good_length < os.path.getsize(journal_path):
+        with open(journal_path, "r+b") as file:
+            file.truncate(good_length)
+    return changes
+
+
+# Function for reading the changes in a journal file after the given byte offset, returning them with the offset of the end of the last complete change.
+# Unlike "read_journal()" a partly written change at the end is left alone, as another program may still be writing it.
+def read_journal_tail(journal_path, offset):
+    changes = []
+    with open(journal_path, "rb") as file:  # Open the journal in binary read mode ("rb") so that byte offsets can be tracked.
+        file.seek(offset)
+        for line in file:
+            if not line.endswith(b"\n"):
+                break  # A change without a newline was only partly written (e.g. the program crashed), so it is ignored.
+            offset += len(line)
+            try:
+                journal_entry = json.loads(line)
+                changes.append((journal_entry["op"], journal_entry["receipt"]))
+            except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError):
+                continue  # Skip any damaged lines rather than losing the rest of the journal.
+    return changes, offset
+
+
+# Function for getting the device and inode of a file from its path or "os.stat()" result (None if it doesn't exist), which stays the same when the file is renamed.
+def file_identity(file):
+    if not isinstance(file, os.stat_result):
+        try:
+            file = os.stat(file)
+        except OSError:
+            return None
+    return (file.st_dev, file.st_ino)
+
+
+# Function for reading a JSON file holding a list, yielding its items a chunk at a time along with how far through the file it is (0 to 1).
+def stream_json_array(path, chunk_size=5000, block_size=64 * 1024):
+    with open(path, "r") as file:
+        yield from stream_json_file(file, chunk_size, block_size)
+
+
+# Function for reading an open JSON file holding a list, e.g. one opened while holding the lock file so that it can still be read after another program replaces it.
+# Only one block of the file is held in memory at a time, and each item is decoded as soon as all of it has been read.
+def stream_json_file(file, chunk_size=5000, block_size=64 * 1024):
+    decoder = json.JSONDecoder()
+    file_size = max(1, os.fstat(file.fileno()).st_size)
+    buffer = ""
+    index = 0               # Position in the buffer that has been read up to.
+    characters_read = 0     # Number of characters read from the file, for working out the progress.
+    at_end_of_file = False
+    expecting = "["         # What is expected next: the opening "[", an item, or the "," or "]" after an item.
+    chunk = []
+
+    # Function for adding the next block of the file onto the part of the buffer that hasn't been read yet.
+    def read_block():
+        nonlocal buffer, index, characters_read, at_end_of_file
+        block = file.read(block_size)
+        at_end_of_file = block == ""
+        buffer = buffer[index:] + block
+        index = 0
+        characters_read += len(block)
+
+    while True:
+        # Skip any whitespace between items.
+        while index < len(buffer) and buffer[index] in " \t\r\n":
+            index += 1
+        if index == len(buffer):
+            if at_end_of_file:
+                raise json.JSONDecodeError("Unexpected end of file", buffer, index)
+            read_block()
+            continue
+
+        if expecting == "[":
+            if buffer[index] != "[":
+                raise json.JSONDecodeError("Expecting '['", buffer, index)
+            index += 1
+            expecting = "item or ]"
+
+        elif buffer[index] == "]" and expecting != "item":
+            # Only whitespace may follow the end of the list.
+            if buffer[index + 1:].strip() or file.read().strip():
+                raise json.JSONDecodeError("Extra data", buffer, index + 1)
+            break
+
+        elif expecting == ", or ]":
+            if buffer[index] != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, index)
+            index += 1
+            expecting = "item"
+
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, index)
+                item_complete = end < len(buffer) or at_end_of_file  # A number at the very end of the buffer may have been cut off.
+            except json.JSONDecodeError:
+                if at_end_of_file:
+                    raise
+                item_complete = False  # The item runs past the end of the buffer.
+            if not item_complete:
+                read_block()
+                continue
+
+            chunk.append(item)
+            index = end
+            expecting = ", or ]"
+            if len(chunk) >= chunk_size:
+                yield chunk, min(1.0, (characters_read - len(buffer) + index) / file_size)
+                chunk = []
+
+    yield chunk, 1.0
+
+
+# Function for writing data to a JSON file so that a crash or full disk can never leave it half-written.
+def write_json_atomically(path, data, keep_backup=True):
+    write_temp_json(path, data)
+    swap_in_json(path, keep_backup)
+
+
+# Function for writing data into a temporary file next to the JSON file and syncing it onto the disk.
+def write_temp_json(path, data):
+    with open(path + ".tmp", "w") as file:
+        json.dump(data, file, indent=4)
+        file.flush()
+        os.fsync(file.fileno())  # Make sure the data is physically on the disk before the file is swapped in.
+
+
+# Function for swapping a synced temporary file in place of the JSON file, keeping the previous version as a backup.
+def swap_in_json(path, keep_backup=True):
+    if keep_backup and os.path.exists(path):
+        backup_path = path + ".bak"
+        if os.path.exists(backup_path):
+            os.remove(backup_path)
+        try:
+            os.link(path, backup_path)          # Hard link the current file as the backup so it never stops existing under its own name.
+        except OSError:
+            shutil.copy2(path, backup_path)     # Copy the file instead if the drive doesn't support hard links.
+
+    os.replace(path + ".tmp", path)  # Swap the new file in place of the old one in a single step.
+    sync_directory(path)
+
+
+# Function for making a rename inside a directory durable (only supported on POSIX systems).
+def sync_directory(path):
+    try:
+        directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return  # Directories can't be opened on Windows, where renames are already durable.
+    try:
+        os.fsync(directory)
+    except OSError:
+        pass
+    finally:
+        os.close(directory)
+
+
+# Run the one-shot migration from the JSON file to an SQLite database when this file is run directly.
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Migrate the customer receipts from the JSON file into an SQLite database.")
+    parser.add_argument("json_path", nargs="?", default="customer_receipts.json")
+    parser.add_argument("sqlite_path", nargs="?", default="customer_receipts.db")
+    arguments = parser.parse_args()
+    print(f"Migrated {migrate_json_to_sqlite(arguments.json_path, arguments.sqlite_path)} receipts into '{arguments.sqlite_path}'.")
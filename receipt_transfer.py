@@ -0,0 +1,272 @@
+# Date Created: 18/10/2026
+# Author: Jack Compton
+# Purpose: Importing customer receipts for Julie's party hire store in bulk from CSV and JSON files, and exporting them to CSV and JSON Lines files, without the GUI.
+# Usage: python receipt_transfer.py import paper_records.csv --duplicates update
+#        python receipt_transfer.py export nightly_report.csv --item Knives
+
+import os
+import sys
+import csv
+import json
+import argparse
+from receipt_core import MIN_RECEIPT_DIGITS, ImportResult, ReceiptService, open_receipt_store
+from receipt_storage import StorageCorruptError, StorageWriteError, open_storage, stream_json_array
+
+IMPORT_FIELDS = ("first_name", "last_name", "item_hired", "amount_hired", "hire_date")  # Fields read from each imported row, where the hire date is optional.
+DUPLICATE_CHOICES = {"update": "update", "add": "add", "skip": "ask"}  # What to do with rows matching an existing receipt, and the "on_duplicate" choice it is submitted with.
+EXPORT_FIELDS = ("receipt_number",) + IMPORT_FIELDS  # Fields written for each exported receipt, which can be imported again (the receipt number is left out when importing).
+EXPORT_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}  # Export format for each file extension.
+
+
+# Class for an imported file that can't be read, e.g. an unknown file type, a CSV file without a header row or invalid JSON.
+class ImportFileError(Exception):
+    pass
+
+
+# Function for getting the field name for a column heading, e.g. "First Name" or "first_name" for "first_name".
+def field_name(heading):
+    return str(heading).strip().casefold().replace(" ", "_")
+
+
+# Function for getting the details of an imported row as [first_name, last_name, item_hired, amount_hired, hire_date].
+# A row is either a dictionary of field names (e.g. a CSV row or a JSON object), or a list in the same layout as "customer_receipts.json",
+# whose receipt number is left out as the imported receipts are given new numbers. A missing hire date is None, which dates the receipt today.
+def import_details(record):
+    if isinstance(record, dict):
+        record = {field_name(heading): value for heading, value in record.items()}
+        values = [record.get(field) for field in IMPORT_FIELDS]
+    elif isinstance(record, list):
+        values = (record[1:] + [None] * len(IMPORT_FIELDS))[:len(IMPORT_FIELDS)]
+    else:
+        values = [None] * len(IMPORT_FIELDS)  # Not a receipt at all, so every field is reported as missing.
+    details = ["" if value is None else str(value) for value in values[:4]]
+    details.append(None if values[4] in (None, "") else str(values[4]))
+    return details
+
+
+# Function for getting the error for an import file that isn't UTF-8 text, saying how far through the file it was read, e.g. ("line", 120).
+def text_encoding_error(path, unit, number):
+    read_to = f" after {unit} {number}" if number else ""
+    return ImportFileError(f"'{path}' isn't UTF-8 text{read_to}, save it as UTF-8 (e.g. \"CSV UTF-8\" in a spreadsheet program) and import it again.")
+
+
+# Function for reading the rows of a CSV file with a header row naming its columns, yielding (line number, details) for each row.
+def read_csv_rows(path):
+    with open(path, "r", newline="", encoding="utf-8-sig") as file:  # "utf-8-sig" skips the byte order mark that spreadsheet programs add.
+        reader = csv.reader(file)
+        try:
+            headings = [field_name(heading) for heading in next(reader, [])]
+            if "first_name" not in headings:
+                raise ImportFileError(f"'{path}' needs a header row naming its columns, e.g. {','.join(IMPORT_FIELDS)}.")
+            for row in reader:
+                if any(value.strip() for value in row):  # Skip blank lines.
+                    yield reader.line_num, import_details(dict(zip(headings, row)))
+        except UnicodeDecodeError:  # Spreadsheet programs often save CSV files in another encoding unless "CSV UTF-8" is chosen.
+            raise text_encoding_error(path, "line", reader.line_num)
+
+
+# Function for reading a JSON file holding a list of receipts a chunk at a time, yielding (position in the list, details) for each receipt.
+def read_json_rows(path):
+    row_number = 0
+    try:
+        for chunk, progress in stream_json_array(path):
+            for record in chunk:
+                row_number += 1
+                yield row_number, import_details(record)
+    except json.JSONDecodeError as error:
+        raise ImportFileError(f"'{path}' isn't a valid JSON list after row {row_number}: {error.msg}")
+    except UnicodeDecodeError:
+        raise text_encoding_error(path, "row", row_number)
+
+
+# Function for reading a JSON Lines file with one receipt on each line, yielding (line number, details) for each receipt.
+def read_json_lines_rows(path):
+    with open(path, "r", encoding="utf-8") as file:
+        line_number = 0
+        try:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as error:
+                    raise ImportFileError(f"Line {line_number} of '{path}' isn't valid JSON: {error.msg}")
+                yield line_number, import_details(record)
+        except UnicodeDecodeError:
+            raise text_encoding_error(path, "line", line_number)
+
+
+# Function for reading the rows of an import file, choosing how to read it from its file extension.
+# The rows are read as they are imported, so only a chunk of the file is held in memory at a time.
+def read_import_rows(path):
+    extension = os.path.splitext(path)[1].casefold()
+    if extension == ".csv":
+        return read_csv_rows(path)
+    elif extension in (".jsonl", ".ndjson"):
+        return read_json_lines_rows(path)
+    elif extension == ".json":
+        return read_json_rows(path)
+    raise ImportFileError(f"Can't import '{path}', only .csv, .json and .jsonl files can be imported.")
+
+
+# Function for importing the receipts in a file through the receipt service, returning the ImportResult.
+# "duplicates" is "update", "add" or "skip", deciding what happens to rows for a customer who already has a receipt for the item.
+# If the file turns out to be unreadable part of the way through, the rows before that point are still imported before ImportFileError is raised,
+# and are counted in "result" if one is passed in.
+def import_file(service, path, duplicates="update", result=None):
+    return service.import_receipts(read_import_rows(path), DUPLICATE_CHOICES[duplicates], result=result)
+
+
+# Function for checking whether a stored receipt list matches the export filters, where an item or name of None matches every receipt.
+# The item and name are matched ignoring letter case, and the name can be a first name, a last name or a full name.
+def receipt_matches(receipt, item=None, name=None):
+    if item is not None and receipt[3].casefold() != item.casefold():
+        return False
+    if name is not None:
+        name = " ".join(name.casefold().split())
+        first_name, last_name = receipt[1].casefold(), receipt[2].casefold()
+        return name in (first_name, last_name, f"{first_name} {last_name}")
+    return True
+
+
+# Function for yielding the stored receipt lists from chunks of receipts (e.g. from "storage.scan()") that match the export filters.
+def export_rows(chunks, item=None, name=None):
+    for receipts in chunks:
+        for receipt in receipts:
+            if receipt_matches(receipt, item, name):
+                yield receipt
+
+
+# Function for getting the export format for a file from its extension, or None if it can't be exported to.
+def export_format(path):
+    return EXPORT_FORMATS.get(os.path.splitext(path)[1].casefold())
+
+
+# Function for writing stored receipt lists to an open file as CSV with a header row, returning how many were written.
+def write_csv(rows, file):
+    writer = csv.writer(file)
+    writer.writerow(EXPORT_FIELDS)
+    count = 0
+    for receipt in rows:
+        writer.writerow([*receipt[:5], receipt[5] if len(receipt) > 5 else ""])
+        count += 1
+    return count
+
+
+# Function for getting a stored receipt list as a dictionary of the export fields, with the amount hired as a number.
+def receipt_record(receipt):
+    return {"receipt_number": receipt[0], "first_name": receipt[1], "last_name": receipt[2], "item_hired": receipt[3],
+            "amount_hired": int(receipt[4]), "hire_date": receipt[5] if len(receipt) > 5 else None}
+
+
+# Function for writing stored receipt lists to an open file as JSON Lines, with one JSON object per receipt, returning how many were written.
+def write_json_lines(rows, file):
+    count = 0
+    for receipt in rows:
+        file.write(json.dumps(receipt_record(receipt)) + "\n")
+        count += 1
+    return count
+
+
+# Function for exporting stored receipt lists to a file (or to the standard output for "-") in the given format ("csv" or "jsonl"), returning how many were written.
+# The receipts are written as they are read, so only one receipt needs to be held at a time. A file is written to a temporary file first
+# and then swapped in, so a report being read by another program is never left half-written.
+def export_receipts(rows, path, file_format):
+    write_rows = write_csv if file_format == "csv" else write_json_lines
+    if path == "-":
+        return write_rows(rows, sys.stdout)
+    temp_path = path + ".tmp"
+    try:
+        with open(temp_path, "w", newline="", encoding="utf-8") as file:  # "newline" is left to the CSV writer, which ends each row with "\r\n".
+            count = write_rows(rows, file)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)  # Remove the partly written file if the export failed.
+    return count
+
+
+# Function for getting a FieldError's message on one line, as the messages are laid out for message boxes.
+def field_error_text(error):
+    return " ".join(word for word in error.message.split() if word != "-")
+
+
+# Function for printing the result of an import, with a line for each row that couldn't be imported.
+def print_import_result(path, result):
+    print(f"Imported '{path}': {result.added} added, {result.updated} updated, {result.skipped} skipped as duplicates, {len(result.errors)} rows with errors.")
+    for row_number, errors in result.errors:
+        for error in errors:
+            print(f"Row {row_number}: {field_error_text(error)}")
+    if result.full:
+        print("Stopped early as there are no more unique receipt numbers.")
+
+
+# Function for the "export" command, which reads the receipts straight from the storage backend a chunk at a time rather than loading them all.
+def export_command(arguments):
+    file_format = arguments.format or export_format(arguments.path)
+    if file_format is None:
+        print(f"Can't tell which format to export '{arguments.path}' in, use a .csv or .jsonl file or give --format.", file=sys.stderr)
+        return 2
+    storage = open_storage(arguments.engine)
+    try:
+        count = export_receipts(export_rows(storage.scan(), arguments.item, arguments.name), arguments.path, file_format)
+    except (StorageCorruptError, IOError) as error:
+        print(f"Failed to export the customer receipts: {error}", file=sys.stderr)
+        return 2
+    finally:
+        storage.close()
+    if arguments.path != "-":
+        print(f"Exported {count} receipts to '{arguments.path}'.")
+    return 0
+
+
+# Main function for the command line.
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Import and export the customer receipts of Julie's party hire store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="Import receipts from a .csv (with a header row), .json (a list) or .jsonl file.")
+    import_parser.add_argument("path", help="File to import.")
+    import_parser.add_argument("--duplicates", choices=list(DUPLICATE_CHOICES), default="update",
+                               help="What to do with a row for a customer who already has a receipt for the item (default: update its amount, as when submitting in the window).")
+    export_parser = commands.add_parser("export", help="Export receipts to a .csv or .jsonl file, or to the standard output with '-'.")
+    export_parser.add_argument("path", help="File to export to, or '-' for the standard output.")
+    export_parser.add_argument("--format", choices=sorted(set(EXPORT_FORMATS.values())), help="Format to export in (default: from the file extension).")
+    export_parser.add_argument("--item", help="Only export receipts for this item.")
+    export_parser.add_argument("--name", help="Only export receipts for this customer (a first, last or full name).")
+    import_parser.add_argument("--digits", type=int, default=MIN_RECEIPT_DIGITS, help="Number of digits in each new receipt number.")
+    for command_parser in (import_parser, export_parser):
+        command_parser.add_argument("--engine", choices=["json", "sqlite"], default="json", help="Storage backend the receipts are kept in.")
+    arguments = parser.parse_args(arguments)
+    if arguments.command == "export":
+        return export_command(arguments)
+
+    try:
+        store = open_receipt_store(arguments.engine, arguments.digits)
+    except StorageCorruptError as error:
+        print(f"Failed to load the customer receipts: {error}\nOpen the program to restore or replace them.", file=sys.stderr)
+        return 2
+
+    result = ImportResult()
+    try:
+        try:
+            import_file(ReceiptService(store), arguments.path, arguments.duplicates, result)
+        except StorageWriteError as error:
+            print(f"Failed to save the imported receipts: {error}", file=sys.stderr)
+            return 2
+        except (ImportFileError, IOError) as error:
+            print(error, file=sys.stderr)
+            if result.added or result.updated or result.skipped or result.errors:
+                print_import_result(arguments.path, result)  # The rows before the error were still imported, so say which.
+                print("Stopped early as the rest of the file couldn't be read.")
+            return 2
+        print_import_result(arguments.path, result)
+        return 1 if result.errors else 0
+    finally:
+        try:
+            store.close()  # Save the receipt number pool and make sure the imported receipts are on the disk.
+        except StorageWriteError as error:
+            print(f"Failed to save the customer receipts: {error}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
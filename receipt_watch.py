@@ -0,0 +1,139 @@
+# Date Created: 18/10/2026
+# Author: Jack Compton
+# Purpose: Watching the customer receipt files of Julie's party hire store for changes made by other programs (e.g. another counter sharing the files).
+
+import os
+import sys
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+
+# inotify event types that mean a watched file has been written, replaced or removed (from <sys/inotify.h>).
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")  # Each inotify event starts with its watch, event type, cookie and name length, followed by the file name.
+
+
+# Base class for the file watchers, which run on a background thread and set a flag whenever one of the files may have changed.
+# The flag is checked from the main thread with "take_change()", so the receipts are only ever changed on the main thread.
+class FileWatcher:
+    name = "watcher"
+
+    def __init__(self, paths):
+        self.paths = [os.path.abspath(path) for path in paths]  # Files to watch, which don't have to exist yet.
+        self.changed = threading.Event()    # Set when one of the files may have changed.
+        self.stopped = threading.Event()    # Set to stop the background thread.
+        self.thread = threading.Thread(target=self.watch, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    # Method for checking (and clearing) whether any of the files may have changed since the last check.
+    def take_change(self):
+        if not self.changed.is_set():
+            return False
+        self.changed.clear()
+        return True
+
+    # Method for watching the files until the watcher is stopped (runs on the background thread).
+    def watch(self):
+        raise NotImplementedError
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+
+# File watcher that checks the modification time, size and inode of each file every "interval" seconds, which works on any system.
+class PollingWatcher(FileWatcher):
+    name = "polling"
+
+    def __init__(self, paths, interval=1.0):
+        super().__init__(paths)
+        self.interval = interval
+
+    # Method for getting the modification time, size and inode of each file (None for a file that doesn't exist).
+    def file_signature(self):
+        signature = []
+        for path in self.paths:
+            try:
+                file_stat = os.stat(path)
+                signature.append((file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino))
+            except OSError:
+                signature.append(None)
+        return signature
+
+    def watch(self):
+        last_signature = self.file_signature()
+        while not self.stopped.wait(self.interval):
+            signature = self.file_signature()
+            if signature != last_signature:
+                last_signature = signature
+                self.changed.set()
+
+
+# File watcher that is told about changes by the Linux kernel through inotify, so a change is noticed straight away without checking the files.
+# The folders holding the files are watched rather than the files themselves, as the JSON file is replaced with a new file each time it is written.
+class InotifyWatcher(FileWatcher):
+    name = "inotify"
+
+    def __init__(self, paths, interval=0.5):
+        super().__init__(paths)
+        self.interval = interval  # Seconds to wait for an event before checking whether the watcher has been stopped.
+        self.names = {os.path.basename(path) for path in self.paths}
+
+        # Call inotify through the C library, as the Python standard library doesn't include it.
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "Failed to start inotify")
+        for folder in {os.path.dirname(path) for path in self.paths}:
+            if libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK) < 0:
+                error_number = ctypes.get_errno()
+                os.close(self.fd)
+                raise OSError(error_number, f"Failed to watch {folder}")
+
+    def watch(self):
+        try:
+            while not self.stopped.is_set():
+                if not select.select([self.fd], [], [], self.interval)[0]:
+                    continue  # No events yet, check whether the watcher has been stopped.
+                try:
+                    events = os.read(self.fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                if any(name in self.names for name in self.event_names(events)):
+                    self.changed.set()
+        finally:
+            os.close(self.fd)
+
+    # Method for getting the name of the file that each inotify event is about.
+    def event_names(self, events):
+        names = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(events):
+            name_length = EVENT_HEADER.unpack_from(events, offset)[3]
+            offset += EVENT_HEADER.size
+            names.append(os.fsdecode(events[offset:offset + name_length].rstrip(b"\0")))  # The name is padded with null bytes.
+            offset += name_length
+        return names
+
+
+# Function for creating a watcher for the given files, using inotify on Linux and checking the files every "interval" seconds anywhere else.
+def open_watcher(paths, interval=1.0):
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError):
+            pass  # inotify isn't available (e.g. the limit on watches has been reached), so fall back to checking the files.
+    return PollingWatcher(paths, interval)